@@ -3,13 +3,17 @@
 清理Notion数据库中的所有测试数据
 - 删除所有数据库记录
 - 删除所有详细页面
+- 清空本地Notion镜像，下次同步时全量重建
 """
 
-import requests
 import json
 import os
 import sys
 
+# 共享HTTP客户端（连接复用）
+from http_client import notion, stats_lines as http_stats_lines
+from story_index import story_index
+
 # 从环境变量读取
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
@@ -22,16 +26,9 @@ print("=" * 70)
 print("🗑️  清理Notion测试数据")
 print("=" * 70)
 
-# Notion API配置
-headers = {
-    "Authorization": f"Bearer {NOTION_API_KEY}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28"
-}
-
 # 1. 查询数据库中的所有记录
 print("\n📊 正在查询数据库记录...")
-url = f"https://api.notion.com/v1/databases/{NOTION_DATABASE_ID}/query"
+url = f"/v1/databases/{NOTION_DATABASE_ID}/query"
 
 all_records = []
 has_more = True
@@ -43,7 +40,7 @@ while has_more:
         payload["start_cursor"] = start_cursor
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = notion.post(url, json=payload, timeout=10, idempotent=True)
         response.raise_for_status()
         data = response.json()
 
@@ -59,6 +56,7 @@ print(f"✅ 找到 {len(all_records)} 条记录")
 
 if len(all_records) == 0:
     print("📭 数据库为空，无需清理")
+    story_index.clear(NOTION_DATABASE_ID)
     sys.exit(0)
 
 # 2. 删除每条记录（包含详细页面）
@@ -81,8 +79,7 @@ for i, record in enumerate(all_records, 1):
 
     # 删除页面（包含所有子内容）
     try:
-        delete_url = f"https://api.notion.com/v1/blocks/{page_id}"
-        response = requests.delete(delete_url, headers=headers, timeout=10)
+        response = notion.delete(f"/v1/blocks/{page_id}", timeout=10)
         response.raise_for_status()
         deleted_count += 1
         print(f"  ✅ 删除成功")
@@ -91,13 +88,19 @@ for i, record in enumerate(all_records, 1):
         failed_count += 1
         print(f"  ❌ 删除失败: {e}")
 
-# 3. 总结
+# 3. 清空本地镜像（否则同步时仍认为这些话题已有页面，既不重建也不更新）
+story_index.clear(NOTION_DATABASE_ID)
+print("\n🧹 已清空本地Notion镜像，下次同步时全量重建")
+
+# 4. 总结
 print("\n" + "=" * 70)
 print("📊 清理完成")
 print("=" * 70)
 print(f"✅ 成功删除: {deleted_count} 条")
 print(f"❌ 删除失败: {failed_count} 条")
 print(f"📊 总记录数: {len(all_records)} 条")
+for line in http_stats_lines():
+    print(f"🔌 {line}")
 
 if deleted_count == len(all_records):
     print("\n🎉 所有测试数据已清理完成！")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Chainbase话题详情（时间线/作者）本地缓存
+功能：
+✅ SQLite持久化，按 story_id + endpoint 缓存，zlib压缩存储
+✅ 可配置TTL，过期前直接命中，不发请求
+✅ 按总大小做LRU淘汰
+✅ stale-while-revalidate：已有过期副本时用短超时重新获取，
+   Chainbase出错或过慢时返回过期副本
+✅ 统计命中/未命中/过期兜底次数
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from state_store import open_sqlite
+
+# ============ 配置区 ============
+
+CACHE_ENABLED = os.getenv("CHAINBASE_CACHE_ENABLED", "1") != "0"
+# 缓存新鲜期（秒），默认1.5小时：短于定时任务的2小时间隔，每次定时运行都重新获取详情，
+# 缓存只用于同一周期内的重跑和Chainbase出错时兜底
+CACHE_TTL = float(os.getenv("CHAINBASE_CACHE_TTL", str(90 * 60)))
+# 过期副本最长可兜底使用的时间（秒）
+CACHE_STALE_MAX_AGE = float(os.getenv("CHAINBASE_CACHE_STALE_MAX_AGE", str(24 * 3600)))
+# 已有过期副本时重新获取的超时（秒），超时则使用过期副本
+CACHE_REVALIDATE_TIMEOUT = float(os.getenv("CHAINBASE_CACHE_REVALIDATE_TIMEOUT", "3"))
+# 缓存总大小上限（字节，压缩后）
+CACHE_MAX_BYTES = int(os.getenv("CHAINBASE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+class DetailCache:
+    """按 (story_id, endpoint) 缓存Chainbase详情响应"""
+
+    def __init__(self, db_name: str = "chainbase_cache.sqlite3",
+                 ttl: float = CACHE_TTL, stale_max_age: float = CACHE_STALE_MAX_AGE,
+                 revalidate_timeout: float = CACHE_REVALIDATE_TIMEOUT,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.db_name = db_name
+        self.ttl = ttl
+        self.stale_max_age = stale_max_age
+        self.revalidate_timeout = revalidate_timeout
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.evictions = 0
+
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_sqlite(self.db_name)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS detail_cache (
+                    story_id TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (story_id, endpoint)
+                )
+            """)
+        return self._conn
+
+    def get(self, story_id: str, endpoint: str) -> Optional[Tuple[Any, float]]:
+        """返回 (数据, 缓存年龄秒数)，不存在时返回None"""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT body, fetched_at FROM detail_cache WHERE story_id = ? AND endpoint = ?",
+                (story_id, endpoint)).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE detail_cache SET accessed_at = ? WHERE story_id = ? AND endpoint = ?",
+                (time.time(), story_id, endpoint))
+        body, fetched_at = row
+        return json.loads(zlib.decompress(body)), time.time() - fetched_at
+
+    def put(self, story_id: str, endpoint: str, value: Any):
+        body = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO detail_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (story_id, endpoint, body, len(body), now, now))
+            self._evict()
+
+    def _evict(self):
+        """删除超过兜底期限的条目，再按最近访问时间淘汰到大小上限以内"""
+        db = self._db()
+        cursor = db.execute("DELETE FROM detail_cache WHERE fetched_at < ?",
+                            (time.time() - self.stale_max_age,))
+        self.evictions += max(0, cursor.rowcount)
+
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM detail_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute(
+            "SELECT story_id, endpoint, size FROM detail_cache ORDER BY accessed_at").fetchall()
+        for story_id, endpoint, size in rows:
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM detail_cache WHERE story_id = ? AND endpoint = ?",
+                       (story_id, endpoint))
+            total -= size
+            self.evictions += 1
+
+    def fetch(self, story_id: str, endpoint: str,
+              fetcher: Callable[[Optional[float]], Any]) -> Any:
+        """
+        读缓存，必要时调用fetcher(timeout)获取并写入缓存
+
+        - 新鲜副本：直接返回
+        - 过期副本：用短超时重新获取，失败时返回过期副本
+        - 无副本：正常获取，失败时抛出异常
+        """
+        cached = self.get(story_id, endpoint)
+        if cached is not None and cached[1] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return cached[0]
+
+        with self._lock:
+            self.misses += 1
+
+        if cached is not None and cached[1] < self.stale_max_age:
+            try:
+                value = fetcher(self.revalidate_timeout)
+            except Exception:
+                with self._lock:
+                    self.stale_served += 1
+                return cached[0]
+        else:
+            value = fetcher(None)
+
+        self.put(story_id, endpoint, value)
+        return value
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+detail_cache = DetailCache()
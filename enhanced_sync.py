@@ -8,16 +8,55 @@ Chainbase TOPS → Notion 增强版同步脚本
 ✅ 数据库视图简洁，点击查看详情
 """
 
-import requests
 import json
 import os
 import sys
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
 import time
 
-# 免费翻译服务
-from deep_translator import GoogleTranslator
+import requests
+
+# 免费翻译服务（带持久化翻译记忆）
+import translation
+
+# 共享HTTP客户端（连接复用）
+from http_client import chainbase, notion, stats_lines as http_stats_lines
+
+# Chainbase榜单条件请求（ETag / Last-Modified）
+from feed_cache import fetch_feed
+
+# Chainbase详情本地缓存（跨运行复用时间线/作者）
+from detail_cache import detail_cache, CACHE_ENABLED
+
+# Chainbase详情对冲请求（可选，降低长尾延迟）
+from hedging import hedger, HEDGE_ENABLED
+
+# Notion话题数据库本地镜像（page_id + 内容哈希 + 属性，增量刷新）
+from story_index import story_index, hash_blocks, FULL_RESYNC
+from state_store import state_path
+
+# Notion写入队列（有界并发，返回Future）
+from write_queue import notion_writes
+
+# 断点续跑日志
+from journal import journal
+
+# 多阶段流水线（有界队列 + 背压）
+from pipeline import Pipeline
+
+# 运行指标（请求统计 + 阶段耗时，JSON报告 / Prometheus textfile）
+from metrics import metrics, METRICS_ENABLED
+
+# 结构化运行日志（sync.log，每行一条JSON）
+import sync_log
+
+# 性能剖析模式（--profile）
+from profiling import Profiler, PROFILE_ENABLED
+
+# 内存追踪模式（tracemalloc，按阶段统计 + 每个话题的内存阈值）
+from memory_trace import memory_tracer, MEMORY_TRACE_ENABLED
 
 # ============ 配置区 ============
 
@@ -32,21 +71,69 @@ if not NOTION_API_KEY:
     print("   请设置: export NOTION_API_KEY=your_api_key")
     sys.exit(1)
 
-# Chainbase TOPS API
-CHAINBASE_API_ZH = "https://api.chainbase.com/tops/v1/stories?lang=zh"
-CHAINBASE_API_EN = "https://api.chainbase.com/tops/v1/stories?lang=en"
-CHAINBASE_API_REALTIME = "https://api.chainbase.com/tops/v1/realtime-mining"
+# Chainbase TOPS API（相对CHAINBASE_API_BASE的路径）
+CHAINBASE_API_ZH = "/tops/v1/stories?lang=zh"
+CHAINBASE_API_EN = "/tops/v1/stories?lang=en"
+CHAINBASE_API_REALTIME = "/tops/v1/realtime-mining"
 
 # 同步配置
 TRANSLATOR_ENABLED = True
 SYNC_ZH_COUNT = 30  # 中文话题数量
 SYNC_EN_COUNT = 30  # 英文话题数量
+DETAIL_FETCH_WORKERS = int(os.getenv("SYNC_FETCH_WORKERS", "8"))  # 详情并发获取线程数
+
+# Upsert模式：已存在的话题更新页面而不是重复创建
+SYNC_UPSERT = os.getenv("SYNC_UPSERT", "1") != "0"
+EXISTING_QUERY_BATCH = 50  # 按话题ID批量查询已有页面时每批的ID数
+# 数据库中的热度数字字段（不存在时自动忽略）
+ATTENTION_PROPERTY = os.getenv("NOTION_ATTENTION_PROPERTY", "热度")
+
+# 父页面上次写入的块ID记录（用于增量更新）
+PARENT_STATE_FILE = "parent_page.json"
+# 父页面更新方式: auto（按改动量选择）/ diff（增量更新）/ swap（双缓冲整体替换）
+PARENT_UPDATE_MODE = os.getenv("PARENT_UPDATE_MODE", "auto")
+# auto模式下，增量更新需要的请求数超过该值时改用双缓冲替换
+PARENT_SWAP_THRESHOLD = int(os.getenv("PARENT_SWAP_THRESHOLD", "20"))
+
+# 两阶段模式：先写只有属性的数据库条目并更新父页面，之后再回填页面正文
+SYNC_TWO_PHASE = os.getenv("SYNC_TWO_PHASE", "0") == "1"
+# 两阶段模式下每种语言排名前N的话题与第一阶段并行获取详情，其余推迟到父页面更新之后
+DETAIL_PRIORITY_COUNT = int(os.getenv("SYNC_DETAIL_PRIORITY_COUNT", "10"))
+
+# 断点续跑：上次运行被中断时，从运行日志中已完成的步骤继续
+SYNC_RESUME = os.getenv("SYNC_RESUME", "1") != "0"
+# 同一运行最多被续跑的次数：按续跑次数而不是时间判断，被中断的定时运行总由下一次运行续跑
+# （两次运行间隔2小时）；续跑这么多次仍未完成时（例如每次都在同一处崩溃）重新开始
+SYNC_RESUME_MAX_ATTEMPTS = int(os.getenv("SYNC_RESUME_MAX_ATTEMPTS", "2"))
+
+# 幂等创建：创建页面结果不确定（超时/断连/5xx）时，先按标记查找已创建的页面再重试
+CREATE_MAX_ATTEMPTS = int(os.getenv("NOTION_CREATE_MAX_ATTEMPTS", "3"))
+CREATE_LOOKUP_DELAY = 2  # 查找前等待Notion查询索引更新（秒）
+# 数据库中保存创建标记的文本字段（不存在时按 话题ID + 创建时间 查找）
+SYNC_MARKER_PROPERTY = os.getenv("NOTION_SYNC_MARKER_PROPERTY", "同步标记")
+# Notion的created_time精度为分钟，并留出时钟偏差
+CREATE_LOOKUP_SLACK = timedelta(minutes=2)
+
+# 数据库属性定义缓存（由get_database_schema填充）
+_database_schemas: Dict[str, Dict] = {}
+
+# 中断前已记录但未确认结果的创建意图 {story_id: {"marker", "time"}}（由断点续跑填充）
+_create_intents: Dict[str, Dict] = {}
+
+# 本次运行摘要翻译失败或超时、以原文兜底的话题ID（已有页面不因此重写内容）
+_translation_fallbacks: Set[str] = set()
 
 # ============ 工具函数 ============
 
+# 控制台日志图标对应的sync.log级别
+_LOG_LEVELS = {"ℹ️ ": "info", "✅": "info", "⚠️ ": "warning", "❌": "error"}
+
 def log(level: str, message: str):
     timestamp = datetime.now().strftime("%H:%M:%S")
-    print(f"[{timestamp}] {level} {message}")
+    # 单次write，多线程写入页面时日志行不会交错
+    sys.stdout.write(f"[{timestamp}] {level} {message}\n")
+    # 同时写入sync.log（附带当前线程的run_id / 阶段 / 话题上下文）
+    sync_log.event(_LOG_LEVELS.get(level, "info"), message.strip())
 
 def log_info(message: str):
     log("ℹ️ ", message)
@@ -66,64 +153,150 @@ def get_chainbase_stories(lang: str = "zh") -> List[Dict]:
     """获取Chainbase TOPS热门话题"""
     url = CHAINBASE_API_ZH if lang == "zh" else CHAINBASE_API_EN
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        items = data.get("items", [])
-        log_info(f"获取{lang.upper()}数据: {len(items)} 个话题")
+        items, changed = fetch_feed(chainbase, url)
+        status = "" if changed else "（榜单无变化，复用上次结果）"
+        log_info(f"获取{lang.upper()}数据: {len(items)} 个话题{status}")
         return items
     except Exception as e:
         log_error(f"获取{lang.upper()}数据失败: {e}")
         return []
 
+def _fetch_story_detail(story_id: str, endpoint: str, timeout: float = None) -> List[Dict]:
+    """
+    请求Chainbase话题详情接口（timeline / authors），失败时抛出异常
+
+    指定timeout时（已有过期缓存兜底）不做退避重试，尽快返回
+    """
+    kwargs = {"timeout": timeout, "retry": False} if timeout else {}
+
+    def fetch():
+        response = chainbase.get(f"/tops/api/hotspot/{story_id}/{endpoint}", **kwargs)
+        response.raise_for_status()
+        return response
+
+    if HEDGE_ENABLED and timeout is None:
+        # 超过该接口p95仍未返回时再发一次相同请求，取先返回的结果
+        # （后台重新验证过期缓存时不对冲，避免多余请求，也不混入p95统计）。
+        # 延迟样本取成功的那次请求本身的耗时，不含重试前的退避等待和限流排队
+        return hedger.call(endpoint, fetch, latency=lambda response: response.elapsed.total_seconds()).json()
+    return fetch().json()
+
+def _get_story_detail(story_id: str, endpoint: str) -> List[Dict]:
+    """获取话题详情，启用缓存时优先读取本地缓存"""
+    if not CACHE_ENABLED:
+        return _fetch_story_detail(story_id, endpoint)
+    return detail_cache.fetch(
+        story_id, endpoint,
+        lambda timeout: _fetch_story_detail(story_id, endpoint, timeout))
+
 def get_story_timeline(story_id: str) -> List[Dict]:
     """获取故事推文时间线"""
     try:
-        url = f"https://api.chainbase.com/tops/api/hotspot/{story_id}/timeline"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        timeline = response.json()
-        log_info(f"  推文时间线: {len(timeline)} 条")
-        return timeline
+        return _get_story_detail(story_id, "timeline")
     except Exception as e:
-        log_warning(f"  获取时间线失败: {e}")
+        log_warning(f"  获取时间线失败 ({story_id}): {e}")
         return []
 
 def get_story_authors(story_id: str) -> List[Dict]:
     """获取故事相关作者"""
     try:
-        url = f"https://api.chainbase.com/tops/api/hotspot/{story_id}/authors"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        authors = response.json()
-        log_info(f"  相关作者: {len(authors)} 位")
-        return authors
+        return _get_story_detail(story_id, "authors")
     except Exception as e:
-        log_warning(f"  获取作者失败: {e}")
+        log_warning(f"  获取作者失败 ({story_id}): {e}")
         return []
 
-def translate_text_to_chinese(text: str) -> str:
-    """使用免费Google翻译API翻译英文到中文"""
-    if not TRANSLATOR_ENABLED or not text or not text.strip():
+def fetch_story_details(stories: List[Dict]) -> List[Tuple[List[Dict], List[Dict]]]:
+    """
+    并发获取多个话题的推文时间线和相关作者
+
+    每个话题的timeline和authors作为两个独立任务提交到线程池，
+    并发度由DETAIL_FETCH_WORKERS控制。返回列表与输入顺序一一对应，
+    保证后续创建页面时排名顺序不变。
+    """
+    if not stories:
+        return []
+
+    story_ids = [story.get("id", "") for story in stories]
+    workers = max(1, min(DETAIL_FETCH_WORKERS, len(story_ids) * 2))
+
+    with metrics.stage("详情获取"), ThreadPoolExecutor(max_workers=workers) as executor:
+        # executor.map按提交顺序返回结果
+        timelines = executor.map(get_story_timeline, story_ids)
+        authors = executor.map(get_story_authors, story_ids)
+        details = list(zip(timelines, authors))
+
+    for story_id in story_ids:
+        journal.record("fetched", story_id=story_id)
+    return details
+
+def fetch_story_detail(story: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """获取单个话题的推文时间线和相关作者（流水线详情阶段）"""
+    story_id = story.get("id", "")
+    details = get_story_timeline(story_id), get_story_authors(story_id)
+    journal.record("fetched", story_id=story_id)
+    return details
+
+def translate_summaries(stories: List[Dict], known: Dict[str, str] = None) -> List[str]:
+    """
+    翻译阶段：一次性收集所有英文摘要并发翻译
+
+    每次翻译调用都有硬性超时（TRANSLATION_DEADLINE），超时或失败时
+    使用原文兜底。known为断点续跑时日志中已完成的译文 {story_id: 译文}。
+    返回列表与输入顺序一一对应。
+    """
+    summaries = [story.get("summary", "") for story in stories]
+    if not TRANSLATOR_ENABLED:
+        return ["" for _ in summaries]
+
+    known = known or {}
+    results = [known.get(story.get("id", ""), "") for story in stories]
+    pending = [i for i, text in enumerate(summaries)
+               if text and text.strip() and stories[i].get("id", "") not in known]
+    if not pending:
+        return results
+
+    with metrics.stage("翻译"):
+        translated = translation.translate_many([summaries[i] for i in pending])
+    failed = 0
+    for i, text in zip(pending, translated):
+        if text is None:
+            failed += 1
+            results[i] = summaries[i]
+            _translation_fallbacks.add(stories[i].get("id", ""))
+        else:
+            results[i] = text
+            journal.record("translated", story_id=stories[i].get("id", ""), text=text)
+
+    if failed:
+        log_warning(f"{failed} 条摘要翻译失败或超时，已保留原文")
+    log_success(f"翻译阶段完成: {len(pending) - failed}/{len(pending)} 条")
+    return results
+
+def translate_summary(story: Dict, known: Dict[str, str] = None) -> str:
+    """流水线翻译阶段：翻译单条英文摘要，失败或超时时保留原文"""
+    story_id = story.get("id", "")
+    if known and story_id in known:
+        return known[story_id]
+    summary = story.get("summary", "")
+    if not TRANSLATOR_ENABLED or not summary or not summary.strip():
         return ""
     try:
-        translator = GoogleTranslator(source='auto', target='zh-CN')
-        translated_text = translator.translate(text)
-        if translated_text and translated_text.strip():
-            return translated_text.strip()
-        else:
-            return text
+        text = translation.translate_with_deadline(summary)
     except Exception as e:
-        log_warning(f"翻译失败: {str(e)[:30]}...")
-        return text
+        log_warning(f"  翻译失败或超时，保留原文 ({story_id}): {str(e)[:50]}")
+        text = None
+    if not text or not text.strip():
+        _translation_fallbacks.add(story_id)
+        return summary
+    journal.record("translated", story_id=story_id, text=text.strip())
+    return text.strip()
 
 # ============ Notion函数 ============
 
-def create_story_page(database_id: str, story: Dict, lang: str,
-                       timeline: List[Dict], authors: List[Dict],
-                       translated_summary: str = "") -> str:
+def build_story_children(story: Dict, lang: str, timeline: List[Dict],
+                         authors: List[Dict], translated_summary: str = "") -> List[Dict]:
     """
-    为故事创建详细的Notion页面(直接在数据库中创建)
+    构建话题详细页面的内容块
 
     页面结构:
     1. 标题(heading_2)
@@ -133,13 +306,6 @@ def create_story_page(database_id: str, story: Dict, lang: str,
     5. 相关作者
     """
 
-    url = "https://api.notion.com/v1/pages"
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-
     story_id = story.get("id", "")
     keyword = story.get("keyword", "")
     summary = story.get("summary", "")
@@ -339,49 +505,705 @@ def create_story_page(database_id: str, story: Dict, lang: str,
                 }
             })
 
+    return children
+
+def get_database_schema(database_id: str) -> Dict:
+    """获取数据库属性定义（每次运行只请求一次）"""
+    if database_id not in _database_schemas:
+        try:
+            response = notion.get(f"/v1/databases/{database_id}", timeout=10)
+            response.raise_for_status()
+            _database_schemas[database_id] = response.json().get("properties", {})
+        except Exception as e:
+            log_warning(f"获取数据库结构失败: {e}")
+            _database_schemas[database_id] = {}
+    return _database_schemas[database_id]
+
+def build_story_properties(database_id: str, story: Dict, lang: str) -> Dict:
+    """构建数据库条目属性（数据库有热度数字字段时一并写入）"""
+    properties = {
+        "Name": {
+            "title": [{
+                "text": {"content": story.get("keyword", "")[:100]}
+            }]
+        },
+        "语言": {
+            "select": {"name": "中文" if lang == "zh" else "英文"}
+        },
+        "话题ID": {
+            "rich_text": [{
+                "text": {"content": story.get("id", "")}
+            }]
+        },
+        "状态": {
+            "select": {"name": "🔥 热门"}
+        }
+    }
+
+    schema = get_database_schema(database_id)
+    if schema.get(ATTENTION_PROPERTY, {}).get("type") == "number":
+        properties[ATTENTION_PROPERTY] = {"number": story.get("attention_score")}
+
+    return properties
+
+def create_story_page(database_id: str, story: Dict, lang: str,
+                       timeline: List[Dict], authors: List[Dict],
+                       translated_summary: str = "", children: List[Dict] = None) -> str:
+    """为故事创建详细的Notion页面(直接在数据库中创建)"""
+    if children is None:
+        children = build_story_children(story, lang, timeline, authors, translated_summary)
+
     # 创建页面(在数据库中创建,避免被删除)
     payload = {
         "parent": {
             "type": "database_id",
             "database_id": database_id
         },
-        "properties": {
-            "Name": {
-                "title": [{
-                    "text": {"content": keyword[:100]}
-                }]
-            },
-            "语言": {
-                "select": {"name": "中文" if lang == "zh" else "英文"}
-            },
-            "话题ID": {
-                "rich_text": [{
-                    "text": {"content": story_id}
-                }]
-            },
-            "状态": {
-                "select": {"name": "🔥 热门"}
-            }
-        },
+        "properties": build_story_properties(database_id, story, lang),
         "children": children
     }
 
-    # 调试：打印parent_page_id
-
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        page_data = response.json()
+        page_data = create_page_idempotent(database_id, story.get("id", ""), payload)
         page_id = page_data["id"]
-        page_url = page_data["url"]
-        log_success(f"  页面创建成功")
+        story_index.put_page(database_id, page_data, content_hash=hash_blocks(children))
+        log_success(f"  页面创建成功: {story.get('keyword', '')[:30]}")
         return page_id
     except Exception as e:
-        log_error(f"  创建页面失败: {e}")
+        log_error(f"  创建页面失败: {story.get('keyword', '')[:30]} - {e}")
         if hasattr(e, 'response') and e.response is not None:
             log_error(f"  错误详情: {e.response.text[:200]}")
         return ""
 
+def is_ambiguous_failure(e: Exception) -> bool:
+    """请求可能已被Notion接受但没有收到结果：超时、断连、5xx、409"""
+    if isinstance(e, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(e, "response", None)
+    return response is not None and (response.status_code >= 500 or response.status_code == 409)
+
+def find_created_page(database_id: str, story_id: str, intent: Dict) -> Optional[Dict]:
+    """按创建标记查找已创建的页面（没有标记字段时按 话题ID + 创建时间 ≥ 意图时间 查找）"""
+    if get_database_schema(database_id).get(SYNC_MARKER_PROPERTY, {}).get("type") == "rich_text":
+        query_filter = {"property": SYNC_MARKER_PROPERTY, "rich_text": {"equals": intent["marker"]}}
+    else:
+        since = datetime.fromtimestamp(intent["time"], timezone.utc) - CREATE_LOOKUP_SLACK
+        query_filter = {"and": [
+            {"property": "话题ID", "rich_text": {"equals": story_id}},
+            {"timestamp": "created_time", "created_time": {"on_or_after": since.isoformat()}}
+        ]}
+
+    response = notion.post(f"/v1/databases/{database_id}/query", json={
+        "page_size": 1,
+        "filter": query_filter,
+        "sorts": [{"timestamp": "created_time", "direction": "descending"}]
+    }, timeout=30, idempotent=True)
+    response.raise_for_status()
+    results = response.json().get("results", [])
+    return results[0] if results else None
+
+def create_page_idempotent(database_id: str, story_id: str, payload: Dict) -> Dict:
+    """
+    幂等创建页面，返回页面对象，失败时抛出异常
+
+    1. 发送前把创建意图（标记 = 话题ID + 运行ID，及时间）写入运行日志；
+       数据库有标记字段时标记一并写入页面
+    2. 结果不确定的失败后，先查找带该标记的页面，找到则直接使用，否则重试
+    3. 断点续跑时，中断前未确认的意图先查找一次，避免重复创建
+    """
+    intent = _create_intents.pop(story_id, None)
+    if intent:
+        found = find_created_page(database_id, story_id, intent)
+        if found:
+            log_info(f"  找到中断前已创建的页面，不再重复创建: {story_id}")
+            return found
+    else:
+        intent = {"marker": f"{story_id}:{journal.run_id or int(time.time())}", "time": time.time()}
+        journal.record("create_intent", story_id=story_id, **intent)
+
+    if get_database_schema(database_id).get(SYNC_MARKER_PROPERTY, {}).get("type") == "rich_text":
+        payload["properties"][SYNC_MARKER_PROPERTY] = {"rich_text": [{"text": {"content": intent["marker"]}}]}
+
+    for attempt in range(1, CREATE_MAX_ATTEMPTS + 1):
+        try:
+            response = notion_writes.create_page(payload).result()
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            if not is_ambiguous_failure(e) or attempt == CREATE_MAX_ATTEMPTS:
+                raise
+            time.sleep(CREATE_LOOKUP_DELAY)
+            found = find_created_page(database_id, story_id, intent)
+            if found:
+                log_info(f"  创建请求结果不确定，但页面已存在，不再重复创建: {story_id}")
+                return found
+            log_warning(f"  创建页面失败，重试 ({attempt}/{CREATE_MAX_ATTEMPTS - 1}): {story_id} - {e}")
+
+def find_existing_pages(database_id: str, story_ids: List[str]) -> Dict[str, Dict]:
+    """
+    按话题ID查询数据库中已存在的页面（本地镜像不可用时的兜底）
+
+    使用 or 过滤条件批量查询（每批 EXISTING_QUERY_BATCH 个ID），
+    同一话题有多个页面时取最新创建的一个。返回 {story_id: page}
+    """
+    existing = {}
+    story_ids = [sid for sid in dict.fromkeys(story_ids) if sid]
+
+    for i in range(0, len(story_ids), EXISTING_QUERY_BATCH):
+        batch = story_ids[i:i + EXISTING_QUERY_BATCH]
+        payload = {
+            "page_size": 100,
+            "filter": {
+                "or": [{"property": "话题ID", "rich_text": {"equals": sid}} for sid in batch]
+            },
+            "sorts": [{"timestamp": "created_time", "direction": "descending"}]
+        }
+
+        while True:
+            response = notion.post(f"/v1/databases/{database_id}/query", json=payload,
+                                   timeout=30, idempotent=True)
+            response.raise_for_status()
+            data = response.json()
+
+            for page in data.get("results", []):
+                story_id = get_plain_text(page, "话题ID")
+                if story_id and story_id not in existing:
+                    existing[story_id] = page
+
+            if not data.get("has_more"):
+                break
+            payload["start_cursor"] = data.get("next_cursor")
+
+    return existing
+
+def refresh_page_mirror(database_id: str) -> bool:
+    """
+    增量刷新本地镜像（只查询上次同步之后编辑过的页面）
+
+    刷新失败时返回False，调用方应退回按话题ID查询
+    """
+    try:
+        result = story_index.refresh(notion, database_id, full=FULL_RESYNC)
+    except Exception as e:
+        log_warning(f"刷新本地镜像失败，改为按话题ID查询: {e}")
+        return False
+    mode = "全量" if result["mode"] == "full" else "增量"
+    log_info(f"本地镜像{mode}刷新: 查询到 {result['pages']} 个页面")
+    return True
+
+def lookup_existing_page(database_id: str, story_id: str, mirror_ok: bool = True) -> Optional[Dict]:
+    """查找单个话题已存在的页面：镜像可用时只查本地，否则查询Notion"""
+    if not story_id:
+        return None
+    if not mirror_ok:
+        page = find_existing_pages(database_id, [story_id]).get(story_id)
+        if page:
+            story_index.put_page(database_id, page)
+        return page
+    row = story_index.get(database_id, story_id)
+    if not row:
+        return None
+    return {"id": row["page_id"], "properties": row["properties"]}
+
+def load_existing_pages(database_id: str, story_ids: List[str]) -> Dict[str, Dict]:
+    """
+    从本地镜像查找已存在的页面
+
+    先增量刷新镜像，之后的查找都不消耗API请求；
+    刷新失败时退回按话题ID批量查询。返回 {story_id: {"id", "properties"}}
+    """
+    if not refresh_page_mirror(database_id):
+        existing = find_existing_pages(database_id, story_ids)
+        for page in existing.values():
+            story_index.put_page(database_id, page)
+        return existing
+
+    existing = {}
+    for story_id in story_ids:
+        page = lookup_existing_page(database_id, story_id)
+        if page:
+            existing[story_id] = page
+    return existing
+
+def is_missing_page_error(e: Exception) -> bool:
+    """页面已被删除或归档（镜像中的page_id已失效）"""
+    response = getattr(e, "response", None)
+    if response is None:
+        return False
+    return response.status_code == 404 or (
+        response.status_code == 400 and "archived" in response.text)
+
+def get_plain_text(page: Dict, property_name: str) -> str:
+    """读取页面title / rich_text属性的纯文本"""
+    prop = page.get("properties", {}).get(property_name, {})
+    parts = prop.get("title") or prop.get("rich_text") or []
+    return "".join(part.get("plain_text") or part.get("text", {}).get("content", "")
+                   for part in parts)
+
+def diff_story_properties(page: Dict, properties: Dict) -> Dict:
+    """对比已有页面属性，只返回发生变化的属性（标题、状态、热度）"""
+    current = page.get("properties", {})
+    changed = {}
+
+    if get_plain_text(page, "Name") != properties["Name"]["title"][0]["text"]["content"]:
+        changed["Name"] = properties["Name"]
+
+    current_status = (current.get("状态", {}).get("select") or {}).get("name")
+    if current_status != properties["状态"]["select"]["name"]:
+        changed["状态"] = properties["状态"]
+
+    if ATTENTION_PROPERTY in properties:
+        if current.get(ATTENTION_PROPERTY, {}).get("number") != properties[ATTENTION_PROPERTY]["number"]:
+            changed[ATTENTION_PROPERTY] = properties[ATTENTION_PROPERTY]
+
+    return changed
+
+def wait_all(futures: List) -> List:
+    """等待写入队列中的一组请求全部完成，任一失败时抛出异常"""
+    responses = [future.result() for future in futures]
+    for response in responses:
+        response.raise_for_status()
+    return responses
+
+def list_block_children(block_id: str) -> List[Dict]:
+    """分页获取块的全部子块"""
+    results = []
+    params = {"page_size": 100}
+    while True:
+        response = notion.get(f"/v1/blocks/{block_id}/children", params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        results.extend(data.get("results", []))
+        if not data.get("has_more"):
+            return results
+        params["start_cursor"] = data.get("next_cursor")
+
+def append_block_children(block_id: str, children: List[Dict]) -> List[Dict]:
+    """按每批100个追加子块，返回新建块列表"""
+    created = []
+    for i in range(0, len(children), 100):
+        response = notion_writes.append_children(block_id, children[i:i + 100]).result()
+        response.raise_for_status()
+        created.extend(response.json().get("results", []))
+    return created
+
+def replace_page_children(page_id: str, children: List[Dict]):
+    """删除页面现有内容（并发删除）后写入新内容，失败时抛出异常"""
+    wait_all([notion_writes.delete_block(block["id"]) for block in list_block_children(page_id)])
+    append_block_children(page_id, children)
+
+def keep_existing_content(story_id: str, indexed: Optional[Dict]) -> bool:
+    """
+    摘要翻译以原文兜底时是否保留已有页面的内容
+
+    否则翻译失败的运行会把页面改写成原文，下次翻译成功时再改回来；
+    已知页面正文为空（两阶段模式第一阶段新建）时仍然写入
+    """
+    if story_id not in _translation_fallbacks:
+        return False
+    return not (indexed and indexed["content_hash"] == hash_blocks([]))
+
+def upsert_story_page(database_id: str, story: Dict, lang: str,
+                      timeline: List[Dict], authors: List[Dict],
+                      translated_summary: str = "",
+                      existing_page: Dict = None,
+                      children: List[Dict] = None) -> Tuple[str, str]:
+    """
+    更新或创建话题页面
+
+    - 内容块哈希与上次写入一致且属性未变：跳过所有Notion写入
+    - 已有页面：只PATCH发生变化的属性；内容块有变化时重写页面内容
+    - 新话题：创建完整的详细页面
+
+    children为已构建好的内容块（流水线构建阶段），为空时在这里构建。
+    返回 (page_id, 动作)，动作为 created / updated / skipped / failed
+    """
+    story_id = story.get("id", "")
+    keyword = story.get("keyword", "")[:30]
+    if children is None:
+        children = build_story_children(story, lang, timeline, authors, translated_summary)
+
+    if not existing_page:
+        page_id = create_story_page(database_id, story, lang, timeline, authors,
+                                    translated_summary, children=children)
+        return page_id, ("created" if page_id else "failed")
+
+    page_id = existing_page["id"]
+    content_hash = hash_blocks(children)
+    indexed = story_index.get(database_id, story_id)
+    content_changed = not indexed or indexed["page_id"] != page_id or indexed["content_hash"] != content_hash
+    changed = diff_story_properties(existing_page, build_story_properties(database_id, story, lang))
+    if content_changed and keep_existing_content(story_id, indexed):
+        log_info(f"  摘要翻译未完成，保留页面现有内容: {keyword}")
+        content_changed = False
+
+    if not changed and not content_changed:
+        log_info(f"  页面无变化，跳过: {keyword}")
+        return page_id, "skipped"
+
+    try:
+        if changed:
+            response = notion_writes.update_page(page_id, {"properties": changed}).result()
+            response.raise_for_status()
+            story_index.put_page(database_id, response.json())
+            log_success(f"  页面属性已更新: {keyword} - {', '.join(changed)}")
+        if content_changed:
+            replace_page_children(page_id, children)
+            story_index.put(database_id, story_id, page_id, content_hash=content_hash)
+            log_success(f"  页面内容已更新: {keyword}")
+        return page_id, "updated"
+    except Exception as e:
+        if is_missing_page_error(e):
+            # 页面在Notion中已被删除：移出镜像后重新创建
+            log_warning(f"  已有页面不存在或已归档，重新创建: {keyword}")
+            story_index.remove(database_id, story_id)
+            page_id = create_story_page(database_id, story, lang, timeline, authors,
+                                        translated_summary, children=children)
+            return page_id, ("created" if page_id else "failed")
+        log_error(f"  更新页面失败: {keyword} - {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            log_error(f"  错误详情: {e.response.text[:200]}")
+        # 更新失败不影响父页面链接，页面本身仍然存在
+        return page_id, "failed"
+
+def ensure_story_row(database_id: str, story: Dict, lang: str,
+                     existing_page: Dict = None) -> Tuple[str, str]:
+    """
+    两阶段模式第一阶段：只写数据库条目属性，不写页面内容
+
+    - 新话题：创建只有属性的页面（正文留待第二阶段回填）
+    - 已有页面：只PATCH发生变化的属性
+
+    返回 (page_id, 动作)，动作为 created / updated / skipped / failed
+    """
+    story_id = story.get("id", "")
+    keyword = story.get("keyword", "")[:30]
+
+    if existing_page:
+        page_id = existing_page["id"]
+        changed = diff_story_properties(existing_page, build_story_properties(database_id, story, lang))
+        if not changed:
+            return page_id, "skipped"
+        try:
+            response = notion_writes.update_page(page_id, {"properties": changed}).result()
+            response.raise_for_status()
+            story_index.put_page(database_id, response.json())
+            log_success(f"  条目属性已更新: {keyword} - {', '.join(changed)}")
+            return page_id, "updated"
+        except Exception as e:
+            if not is_missing_page_error(e):
+                log_error(f"  更新条目失败: {keyword} - {e}")
+                return page_id, "failed"
+            log_warning(f"  已有页面不存在或已归档，重新创建: {keyword}")
+            story_index.remove(database_id, story_id)
+
+    page_id = create_story_page(database_id, story, lang, [], [], children=[])
+    return page_id, ("created" if page_id else "failed")
+
+def backfill_story_children(database_id: str, story: Dict, lang: str, page_id: str,
+                            timeline: List[Dict], authors: List[Dict],
+                            translated_summary: str = "") -> str:
+    """
+    两阶段模式第二阶段：回填页面正文（TOP QUOTES、作者、趋势callout等）
+
+    内容哈希与上次写入一致时跳过；页面为空（第一阶段新建）时直接追加，
+    否则替换原有内容。返回动作 updated / skipped / failed
+    """
+    story_id = story.get("id", "")
+    keyword = story.get("keyword", "")[:30]
+    children = build_story_children(story, lang, timeline, authors, translated_summary)
+    content_hash = hash_blocks(children)
+
+    indexed = story_index.get(database_id, story_id)
+    if indexed and indexed["page_id"] == page_id and indexed["content_hash"] == content_hash:
+        return "skipped"
+    if keep_existing_content(story_id, indexed):
+        log_info(f"  摘要翻译未完成，保留页面现有内容: {keyword}")
+        return "skipped"
+
+    try:
+        if indexed and indexed["page_id"] == page_id and indexed["content_hash"] == hash_blocks([]):
+            append_block_children(page_id, children)
+        else:
+            replace_page_children(page_id, children)
+        story_index.put(database_id, story_id, page_id, content_hash=content_hash)
+        log_success(f"  页面正文已回填: {keyword}")
+        return "updated"
+    except Exception as e:
+        if is_missing_page_error(e):
+            # 页面在两个阶段之间被删除：移出镜像，下次运行重新创建
+            log_warning(f"  页面不存在或已归档，无法回填正文: {keyword}")
+            story_index.remove(database_id, story_id)
+            return "failed"
+        log_error(f"  回填页面正文失败: {keyword} - {e}")
+        return "failed"
+
+# 视为页面已写入完成的结果
+WRITTEN_ACTIONS = ("created", "updated", "skipped")
+
+def record_page_written(lang: str, story: Dict, result: Tuple[str, str]) -> Tuple[str, str]:
+    """
+    页面写入成功后立即记入运行日志（在写入线程中调用）
+
+    写入失败（包括更新已有页面失败）时不记录，续跑时会重新写入
+    """
+    page_id, action = result
+    if page_id and action in WRITTEN_ACTIONS:
+        journal.record("page_written", lang=lang, story_id=story.get("id", ""),
+                       page_id=page_id, action=action)
+    return result
+
+def update_parent_if_needed(stories_with_pages: List[Dict], resumed: Dict, wrote_pages: bool):
+    """更新父页面并记入日志；续跑时若父页面已更新且本次没有写入页面则跳过"""
+    if not stories_with_pages:
+        return
+    print("\n📰 更新父页面新闻列表")
+    print("-" * 70)
+    if resumed["parent_updated"] and not wrote_pages:
+        log_info("父页面已在中断前更新，跳过")
+        return
+    with metrics.stage("父页面"), memory_tracer.stage("父页面"), sync_log.log_context(stage="父页面"):
+        updated = update_parent_page_with_news_list(stories_with_pages)
+    if updated:
+        journal.record("parent_updated")
+
+def sync_two_phase(zh_selected: List[Dict], en_selected: List[Dict],
+                   existing_pages: Dict[str, Dict], translation_future,
+                   sync_counts: Dict[str, int], resumed: Dict) -> List[Dict]:
+    """
+    两阶段同步
+
+    1. 并发写入所有话题的数据库条目（只有属性），拿到page_id后立即更新父页面；
+       同时在后台获取排名靠前（每种语言前DETAIL_PRIORITY_COUNT个）话题的详情
+    2. 父页面更新后，后台获取其余话题详情，按排名顺序回填页面正文
+
+    续跑时跳过日志中已写入条目 / 已回填正文的话题。返回用于父页面的 stories_with_pages
+    """
+    stories = [(story, "zh") for story in zh_selected] + [(story, "en") for story in en_selected]
+    todo = [i for i, (story, lang) in enumerate(stories) if story.get("id", "") not in resumed["backfilled"]]
+    priority = [i for i in todo
+                if (i if stories[i][1] == "zh" else i - len(zh_selected)) < DETAIL_PRIORITY_COUNT]
+    priority_set = set(priority)
+    deferred = [i for i in todo if i not in priority_set]
+
+    detail_executor = ThreadPoolExecutor(max_workers=1)
+    priority_details = detail_executor.submit(fetch_story_details, [stories[i][0] for i in priority])
+
+    # 第一阶段：数据库条目
+    print(f"\n📇 第一阶段: 写入 {len(stories)} 个话题的数据库条目 (写入并发数: {notion_writes.max_in_flight})")
+    print("-" * 70)
+    phase_start = time.time()
+    def write_row(item):
+        story, lang = item
+        with sync_log.log_context(stage="条目", story_id=story.get("id", ""), lang=lang), \
+                sync_log.timed("条目写入完成") as logged:
+            page_id = resumed["pages"].get((lang, story.get("id", "")))
+            if page_id:
+                logged["outcome"] = "resumed"
+                return page_id, "resumed"
+            result = record_page_written(lang, story, ensure_story_row(
+                NOTION_DATABASE_ID, story, lang, existing_page=existing_pages.get(story.get("id", ""))))
+            logged["outcome"] = result[1]
+            return result
+
+    with ThreadPoolExecutor(max_workers=notion_writes.max_in_flight) as story_executor:
+        rows = list(story_executor.map(write_row, stories))
+
+    stories_with_pages = []
+    page_ids = []
+    for (story, lang), (page_id, action) in zip(stories, rows):
+        sync_counts[action] += 1
+        page_ids.append(page_id)
+        if page_id:
+            stories_with_pages.append({
+                "story": story,
+                "page_id": page_id,
+                "rank": len(stories_with_pages) + 1,
+                "lang": lang
+            })
+    log_success(f"数据库条目写入完成，耗时 {time.time() - phase_start:.1f} 秒")
+
+    update_parent_if_needed(stories_with_pages, resumed,
+                            wrote_pages=any(action != "resumed" for _, action in rows))
+
+    # 第二阶段：排名靠后的话题详情推迟到父页面更新之后获取
+    deferred_details = detail_executor.submit(fetch_story_details, [stories[i][0] for i in deferred])
+    detail_executor.shutdown(wait=False)
+
+    print(f"\n📝 第二阶段: 回填页面正文 (优先 {len(priority)} 个 / 延后 {len(deferred)} 个)")
+    print("-" * 70)
+    details = dict(zip(priority, priority_details.result()))
+    details.update(zip(deferred, deferred_details.result()))
+    translations = dict(zip(range(len(zh_selected), len(stories)), translation_future.result()))
+
+    def backfill(i):
+        story, lang = stories[i]
+        with sync_log.log_context(stage="回填", story_id=story.get("id", ""), lang=lang), \
+                sync_log.timed("正文回填完成") as logged:
+            action = backfill_story_children(NOTION_DATABASE_ID, story, lang, page_ids[i],
+                                             *details[i], translations.get(i, ""))
+            logged["outcome"] = action
+        if action != "failed":
+            journal.record("backfilled", story_id=story.get("id", ""))
+        return action
+
+    backfill_counts = {"updated": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=notion_writes.max_in_flight) as story_executor:
+        futures = [story_executor.submit(backfill, i) for i in priority + deferred if page_ids[i]]
+        for future in futures:
+            backfill_counts[future.result()] += 1
+    log_success(f"正文回填: 写入 {backfill_counts['updated']} / 无变化跳过 {backfill_counts['skipped']} / "
+                f"失败 {backfill_counts['failed']}，阶段耗时 {time.time() - phase_start:.1f} 秒")
+
+    return stories_with_pages
+
+def load_resumable_run() -> Optional[Dict]:
+    """读取上次未完成的运行；未启用续跑、没有未完成的运行或已续跑SYNC_RESUME_MAX_ATTEMPTS次时返回None"""
+    if not SYNC_RESUME:
+        return None
+    resumed = journal.load()
+    if resumed and resumed["resumes"] >= SYNC_RESUME_MAX_ATTEMPTS:
+        log_warning(f"上次未完成的运行 {resumed['run_id']} 已续跑 {resumed['resumes']} 次仍未完成，"
+                    "不再续跑，重新开始")
+        return None
+    return resumed
+
+def select_stories(lang: str, resumed: Dict) -> List[Dict]:
+    """本次要同步的某语言话题：续跑时沿用中断前选中的列表，否则获取榜单并记入日志"""
+    if lang in resumed["stories"]:
+        return resumed["stories"][lang]
+    count = SYNC_ZH_COUNT if lang == "zh" else SYNC_EN_COUNT
+    stories = get_chainbase_stories(lang)[:count]
+    if stories:
+        # 榜单为空（获取失败）时不记录，续跑时重新获取
+        journal.record("selected", lang=lang, stories=stories)
+    return stories
+
+def sync_pipeline(resumed: Dict, sync_counts: Dict[str, int]) -> Tuple[Dict[str, List[Dict]], List[Dict], Pipeline]:
+    """
+    流水线同步：榜单 → 详情 → 翻译 → 构建内容块 → 写入Notion
+
+    各阶段之间是有界队列，每个阶段有各自的并发数，中英文话题同时在流水线中流动；
+    Notion写入跟不上时上游阶段自动阻塞，同时在内存中的话题数有上限。
+    本地镜像在后台刷新，写入阶段用到时才等待。
+    返回 ({lang: 选中的话题}, stories_with_pages, 流水线（用于输出各阶段统计）)
+    """
+    selected = {}
+    mirror_future = None
+    if SYNC_UPSERT:
+        mirror_executor = ThreadPoolExecutor(max_workers=1)
+        mirror_future = mirror_executor.submit(refresh_page_mirror, NOTION_DATABASE_ID)
+        mirror_executor.shutdown(wait=False)
+
+    def feed_stage(lang, emit):
+        stories = select_stories(lang, resumed)
+        selected[lang] = stories
+        for index, story in enumerate(stories):
+            emit({"lang": lang, "index": index, "story": story, "started": time.monotonic()})
+
+    def detail_stage(item, emit):
+        page_id = resumed["pages"].get((item["lang"], item["story"].get("id", "")))
+        if page_id:
+            # 中断前已写入的页面直接复用page_id，后续阶段不再处理
+            item["result"] = (page_id, "resumed")
+        else:
+            item["timeline"], item["authors"] = fetch_story_detail(item["story"])
+        emit(item)
+
+    def translate_stage(item, emit):
+        item["translated"] = ""
+        if item["lang"] == "en" and "result" not in item:
+            item["translated"] = translate_summary(item["story"], resumed["translated"])
+        emit(item)
+
+    def build_stage(item, emit):
+        if "result" not in item:
+            item["children"] = build_story_children(item["story"], item["lang"], item["timeline"],
+                                                    item["authors"], item["translated"])
+        emit(item)
+
+    def write_stage(item, emit):
+        if "result" not in item:
+            story, lang = item["story"], item["lang"]
+            existing_page = None
+            if mirror_future is not None:
+                try:
+                    existing_page = lookup_existing_page(NOTION_DATABASE_ID, story.get("id", ""),
+                                                         mirror_future.result())
+                except Exception as e:
+                    log_warning(f"  查询已有页面失败，将新建: {story.get('keyword', '')[:30]} - {e}")
+            item["result"] = record_page_written(lang, story, upsert_story_page(
+                NOTION_DATABASE_ID, story, lang, item["timeline"], item["authors"],
+                item["translated"], existing_page=existing_page, children=item.pop("children")))
+        # 整个话题从进入流水线到写入完成的耗时（含排队），便于在sync.log中查找慢话题
+        sync_log.event("error" if item["result"][1] == "failed" else "info", "话题处理完成",
+                       stage="全部", outcome=item["result"][1],
+                       duration_ms=round((time.monotonic() - item["started"]) * 1000, 1))
+        emit(item)
+
+    def traced(name, func):
+        """阶段函数包装：设置sync.log上下文，记录每个话题在该阶段的耗时与结果"""
+        def run(item, emit):
+            if not isinstance(item, dict):
+                # 榜单阶段的输入是语言
+                with sync_log.log_context(stage=name, lang=item), sync_log.timed(f"{name}阶段完成"):
+                    func(item, emit)
+                return
+            with sync_log.log_context(stage=name, story_id=item["story"].get("id", ""), lang=item["lang"]), \
+                    sync_log.timed(f"{name}阶段完成") as logged:
+                func(item, emit)
+                if "result" in item:
+                    logged["outcome"] = item["result"][1]
+        return run
+
+    pipeline = Pipeline()
+    pipeline.add_stage("榜单", traced("榜单", feed_stage), workers=2)
+    pipeline.add_stage("详情", traced("详情", detail_stage), workers=DETAIL_FETCH_WORKERS)
+    pipeline.add_stage("翻译", traced("翻译", translate_stage), workers=translation.TRANSLATION_WORKERS)
+    pipeline.add_stage("构建", traced("构建", build_stage), workers=1)
+    pipeline.add_stage("写入", traced("写入", write_stage), workers=notion_writes.max_in_flight)
+
+    print(f"\n🚚 流水线同步: 中文前 {SYNC_ZH_COUNT} 个、英文前 {SYNC_EN_COUNT} 个话题"
+          f" (详情并发 {DETAIL_FETCH_WORKERS} / 翻译并发 {translation.TRANSLATION_WORKERS} / "
+          f"写入并发 {notion_writes.max_in_flight})")
+    print("-" * 70)
+    items = pipeline.run(["zh", "en"])
+    for stage in pipeline.stats():
+        metrics.observe_stage(f"流水线{stage['name']}(忙碌)", stage["busy"])
+    # 内存追踪模式：结果仍被引用时，把存活内存归属到各阶段（构建阶段的内容块写入后已释放）
+    memory_tracer.attribute("话题页面", {"榜单": feed_stage, "详情": detail_stage, "翻译": translate_stage,
+                                     "构建": build_stage, "写入": write_stage})
+
+    # 结果按语言、排名顺序收集
+    items.sort(key=lambda item: (item["lang"] != "zh", item["index"]))
+    stories_with_pages = []
+    for item in items:
+        lang, story = item["lang"], item["story"]
+        keyword = story.get("keyword", "")
+        page_id, action = item["result"]
+        sync_counts[action] += 1
+
+        print(f"\n[{lang.upper()} {item['index'] + 1}/{len(selected[lang])}] 处理: {keyword[:40]}... ")
+        if action == "resumed":
+            log_info("  中断前已写入，沿用已有页面")
+        else:
+            log_info(f"  推文时间线: {len(item['timeline'])} 条")
+            log_info(f"  相关作者: {len(item['authors'])} 位")
+
+        if page_id:
+            # 收集故事数据,用于更新父页面
+            stories_with_pages.append({
+                "story": story,
+                "page_id": page_id,
+                "rank": len(stories_with_pages) + 1,
+                "lang": lang
+            })
+            log_success(f"✅ 完成: {keyword[:30]}")
+        else:
+            print("❌")
+
+    return selected, stories_with_pages, pipeline
+
 def create_news_column_notion_standard(stories: List[Dict], title: str, lang_emoji: str) -> List[Dict]:
     """
     创建符合Notion标准的单列新闻内容
@@ -498,100 +1320,47 @@ def create_news_column_notion_standard(stories: List[Dict], title: str, lang_emo
 
     return column_children
 
-def update_parent_page_with_news_list(stories_with_pages: List[Dict]):
-    """
-    更新父页面，创建符合Notion标准的左右两列新闻列表
-
-    Notion标准布局：
-    - 使用column_list创建左右两列
-    - 左列：中文30条
-    - 右列：英文30条（含翻译）
-    - TOP 3: heading_1（大号标题）
-    - 4-20: heading_3（中号标题）
-    - 21-30: bulleted_list（简洁列表）
-    - 使用callout、divider、emoji增强可读性
-
-    参数：
-        stories_with_pages: 包含story和page_id的字典列表
-    """
-    log_info("更新父页面新闻列表（Notion标准左右两列）...")
-
-    url = f"https://api.notion.com/v1/blocks/{NOTION_PARENT_PAGE_ID}/children"
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-
-    # 1. 先获取并删除父页面的所有现有内容
-    try:
-        get_url = f"https://api.notion.com/v1/blocks/{NOTION_PARENT_PAGE_ID}/children"
-        response = requests.get(get_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        # 删除所有现有block
-        for block in data.get("results", []):
-            block_id = block.get("id")
-            if block_id:
-                delete_url = f"https://api.notion.com/v1/blocks/{block_id}"
-                try:
-                    requests.delete(delete_url, headers=headers, timeout=5)
-                except:
-                    pass  # 忽略删除失败
-
-        log_info("  清空父页面旧内容")
-    except Exception as e:
-        log_warning(f"  清空父页面失败: {e}")
-
-    # 2. 分离中英文新闻
-    zh_stories = [s for s in stories_with_pages if s.get("lang") == "zh"]
-    en_stories = [s for s in stories_with_pages if s.get("lang") == "en"]
-
-    log_info(f"  中文新闻: {len(zh_stories)} 条")
-    log_info(f"  英文新闻: {len(en_stories)} 条")
-
-    # 3. 准备新的页面内容（遵循Notion标准）
-    children = []
-
-    # 主标题区 - 使用heading_1
+def build_parent_callout(total: int) -> Dict:
+    """父页面更新时间callout"""
     beijing_tz = timezone(timedelta(hours=8))
     current_time = datetime.now(beijing_tz).strftime("%Y-%m-%d %H:%M:%S")
 
-    children.append({
-        "object": "block",
-        "type": "heading_1",
-        "heading_1": {
-            "rich_text": [{"type": "text", "text": {"content": "🌐 WEB3 新闻热点 (中英双语)"}}]
-        }
-    })
-
-    # 更新信息 - 使用callout突出显示
-    children.append({
+    return {
         "object": "block",
         "type": "callout",
         "callout": {
             "rich_text": [
                 {"type": "text", "text": {"content": f"⏰ 最后更新: "}},
                 {"type": "text", "text": {"content": f"{current_time} (北京时间) | "}},
-                {"type": "text", "text": {"content": f"共{len(stories_with_pages)}条新闻"}}
+                {"type": "text", "text": {"content": f"共{total}条新闻"}}
             ]
         }
-    })
-
-    # 分隔线
-    children.append({
-        "object": "block",
-        "type": "divider",
-        "divider": {}
-    })
+    }
 
-    # 创建符合Notion标准的左右两列
-    left_column_children = create_news_column_notion_standard(zh_stories, "中文热点", "🇨🇳")
-    right_column_children = create_news_column_notion_standard(en_stories, "英文热点", "🇺🇸")
+def build_parent_header(total: int) -> List[Dict]:
+    """父页面顶部：主标题 + 更新时间callout + 分隔线"""
+    return [
+        # 主标题区 - 使用heading_1
+        {
+            "object": "block",
+            "type": "heading_1",
+            "heading_1": {
+                "rich_text": [{"type": "text", "text": {"content": "🌐 WEB3 新闻热点 (中英双语)"}}]
+            }
+        },
+        # 更新信息 - 使用callout突出显示
+        build_parent_callout(total),
+        # 分隔线
+        {
+            "object": "block",
+            "type": "divider",
+            "divider": {}
+        }
+    ]
 
-    # 构建column_list结构（Notion标准两列布局）
-    children.append({
+def build_column_list(left_column_children: List[Dict], right_column_children: List[Dict]) -> Dict:
+    """构建column_list结构（Notion标准两列布局）"""
+    return {
         "object": "block",
         "type": "column_list",
         "column_list": {
@@ -612,30 +1381,283 @@ def update_parent_page_with_news_list(stories_with_pages: List[Dict]):
                 }
             ]
         }
-    })
+    }
+
+def load_parent_state() -> Dict:
+    """读取上次写入父页面时记录的块ID（不存在或损坏时返回空字典）"""
+    try:
+        with open(state_path(PARENT_STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_parent_state(state: Dict):
+    """原子写入父页面块ID记录"""
+    path = state_path(PARENT_STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def block_record(block: Dict, block_id: str) -> Dict:
+    return {"id": block_id, "type": block["type"], "hash": hash_blocks([block])}
+
+def diff_column(column_id: str, old_blocks: List[Dict], new_blocks: List[Dict],
+                op_counts: Dict[str, int]) -> List[Dict]:
+    """
+    按位置对比一列的新旧内容块，只发出必要的请求
 
-    # 4. 批量添加到父页面
-    batch_size = 100
-    for i in range(0, len(children), batch_size):
-        batch = children[i:i+batch_size]
-        payload = {"children": batch}
+    - 内容相同：不动
+    - 类型相同内容不同：PATCH原地更新
+    - 类型不同或新增：在前一个块之后插入（连续插入合并为一次请求）
+    - 多余的旧块：删除
 
+    原地更新和删除互不依赖，并发提交到写入队列；插入依赖前一个块，按顺序执行。
+    返回新的块记录列表，任一请求失败时抛出异常。
+    """
+    records = []
+    pending = []
+    futures = []
+    anchor_id = None
+
+    def flush():
+        nonlocal anchor_id
+        if not pending:
+            return
+        if anchor_id is None:
+            # Notion只能在某个块之后插入，无法插到列首
+            raise RuntimeError("无法在列首插入内容块")
+        response = notion_writes.append_children(column_id, pending, after=anchor_id).result()
+        response.raise_for_status()
+        for block, created in zip(pending, response.json().get("results", [])):
+            records.append(block_record(block, created["id"]))
+        op_counts["inserted"] += len(pending)
+        anchor_id = records[-1]["id"]
+        pending.clear()
+
+    for i, block in enumerate(new_blocks):
+        old = old_blocks[i] if i < len(old_blocks) else None
+        record = block_record(block, old["id"]) if old else None
+
+        if old and old["type"] == block["type"]:
+            flush()
+            if old["hash"] != record["hash"]:
+                futures.append(notion_writes.update_block(old["id"], {block["type"]: block[block["type"]]}))
+                op_counts["updated"] += 1
+            records.append(record)
+            anchor_id = old["id"]
+            continue
+
+        if old:
+            futures.append(notion_writes.delete_block(old["id"]))
+            op_counts["deleted"] += 1
+        pending.append(block)
+        if len(pending) == 100:
+            flush()
+
+    flush()
+
+    for old in old_blocks[len(new_blocks):]:
+        futures.append(notion_writes.delete_block(old["id"]))
+        op_counts["deleted"] += 1
+
+    wait_all(futures)
+    return records
+
+def update_parent_page_incremental(state: Dict, total: int,
+                                   columns: Dict[str, List[Dict]]) -> Dict:
+    """根据上次记录的块ID增量更新父页面，返回新的记录"""
+    op_counts = {"updated": 0, "inserted": 0, "deleted": 0}
+
+    # 更新时间callout每次都会变化（与两列的更新并发进行）
+    callout = build_parent_callout(total)
+    callout_future = notion_writes.update_block(state["callout_id"], {"callout": callout["callout"]})
+
+    new_state = dict(state)
+    new_state["columns"] = {}
+    for lang, blocks in columns.items():
+        column = state["columns"][lang]
+        new_state["columns"][lang] = {
+            "id": column["id"],
+            "blocks": diff_column(column["id"], column["blocks"], blocks, op_counts)
+        }
+    wait_all([callout_future])
+
+    log_info(f"  增量更新: 原地更新 {op_counts['updated']} / 插入 {op_counts['inserted']} / "
+             f"删除 {op_counts['deleted']} 个块")
+    return new_state
+
+def estimate_diff_ops(state: Dict, columns: Dict[str, List[Dict]]) -> int:
+    """估算增量更新需要的请求数（不发请求）"""
+    ops = 0
+    for lang, blocks in columns.items():
+        old_blocks = state["columns"][lang]["blocks"]
+        for i, block in enumerate(blocks):
+            old = old_blocks[i] if i < len(old_blocks) else None
+            if not old or old["hash"] != hash_blocks([block]):
+                ops += 1
+        ops += max(0, len(old_blocks) - len(blocks))
+    return ops
+
+def record_column_list(column_list_id: str, columns: Dict[str, List[Dict]]) -> Dict:
+    """读取新建column_list下两列及其内容块的ID"""
+    record = {"column_list_id": column_list_id, "columns": {}}
+    for lang, column in zip(("zh", "en"), list_block_children(column_list_id)):
+        column_children = list_block_children(column["id"])
+        record["columns"][lang] = {
+            "id": column["id"],
+            "blocks": [block_record(block, created_block["id"])
+                       for block, created_block in zip(columns[lang], column_children)]
+        }
+    return record
+
+def delete_blocks(block_ids: List[str]) -> List[str]:
+    """并发删除块，返回删除失败的块ID（留待下次运行重试）"""
+    futures = [notion_writes.delete_block(block_id) for block_id in block_ids]
+    failed = []
+    for block_id, future in zip(block_ids, futures):
         try:
-            response = requests.patch(url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
+            response = future.result()
+            if response.status_code != 404:
+                response.raise_for_status()
+        except Exception:
+            failed.append(block_id)
+    return failed
+
+def swap_parent_column_list(state: Dict, total: int, columns: Dict[str, List[Dict]]) -> Dict:
+    """
+    双缓冲替换新闻列表
+
+    1. 在旧column_list之后一次性创建完整的新column_list（旧列表保持可见）
+    2. 新列表创建成功后，一次DELETE删除旧column_list（连同其所有子块）
+
+    读者任何时候都能看到一份完整的列表；新列表创建失败时旧列表保持不变。
+    """
+    callout = build_parent_callout(total)
+    callout_future = notion_writes.update_block(state["callout_id"], {"callout": callout["callout"]})
+
+    response = notion_writes.append_children(
+        NOTION_PARENT_PAGE_ID, [build_column_list(columns["zh"], columns["en"])],
+        after=state["column_list_id"]).result()
+    response.raise_for_status()
+    wait_all([callout_future])
+    new_column_list_id = response.json()["results"][0]["id"]
+
+    new_state = dict(state)
+    new_state.update(record_column_list(new_column_list_id, columns))
+    new_state["pending_deletes"] = delete_blocks([state["column_list_id"]])
+    log_info("  双缓冲替换: 新列表已就位，旧列表已移除")
+    return new_state
+
+def rebuild_parent_page(total: int, columns: Dict[str, List[Dict]]) -> Dict:
+    """
+    整页重建父页面，返回新写入块的ID记录
+
+    先在页面末尾写入完整的新内容，成功后再删除旧内容（分页获取，
+    超过100个块也能删干净），页面不会出现空白或写了一半的状态。
+    """
+    old_blocks = list_block_children(NOTION_PARENT_PAGE_ID)
+
+    header = build_parent_header(total)
+    children = header + [build_column_list(columns["zh"], columns["en"])]
+    created = append_block_children(NOTION_PARENT_PAGE_ID, children)
+
+    state = {
+        "parent_id": NOTION_PARENT_PAGE_ID,
+        "callout_id": created[1]["id"],
+    }
+    state.update(record_column_list(created[-1]["id"], columns))
+    state["pending_deletes"] = delete_blocks([block["id"] for block in old_blocks])
+    log_info(f"  已替换父页面旧内容（{len(old_blocks)} 个块）")
+    return state
+
+def update_parent_page_with_news_list(stories_with_pages: List[Dict]):
+    """
+    更新父页面，创建符合Notion标准的左右两列新闻列表
+
+    Notion标准布局：
+    - 使用column_list创建左右两列
+    - 左列：中文30条
+    - 右列：英文30条（含翻译）
+    - TOP 3: heading_1（大号标题）
+    - 4-20: heading_3（中号标题）
+    - 21-30: bulleted_list（简洁列表）
+    - 使用callout、divider、emoji增强可读性
+
+    更新方式（PARENT_UPDATE_MODE）：
+    - diff: 根据本地记录的块ID做增量更新（原地更新/插入/删除），
+      排名不变时只更新时间callout
+    - swap: 双缓冲，在旧列表旁一次性建好新列表后再整体删除旧列表
+    - auto: 改动较少时增量更新，超过PARENT_SWAP_THRESHOLD个请求时双缓冲替换
+    - 没有记录或更新失败时整页重建（先写新内容再删旧内容）
+
+    参数：
+        stories_with_pages: 包含story和page_id的字典列表
+    """
+    log_info("更新父页面新闻列表（Notion标准左右两列）...")
+
+    # 1. 分离中英文新闻
+    zh_stories = [s for s in stories_with_pages if s.get("lang") == "zh"]
+    en_stories = [s for s in stories_with_pages if s.get("lang") == "en"]
+
+    log_info(f"  中文新闻: {len(zh_stories)} 条")
+    log_info(f"  英文新闻: {len(en_stories)} 条")
+
+    # 2. 创建符合Notion标准的左右两列
+    columns = {
+        "zh": create_news_column_notion_standard(zh_stories, "中文热点", "🇨🇳"),
+        "en": create_news_column_notion_standard(en_stories, "英文热点", "🇺🇸")
+    }
+    total = len(stories_with_pages)
+
+    # 3. 优先增量更新 / 双缓冲替换
+    state = load_parent_state()
+    if state.get("pending_deletes"):
+        state["pending_deletes"] = delete_blocks(state["pending_deletes"])
+        save_parent_state(state)
+
+    if (state.get("parent_id") == NOTION_PARENT_PAGE_ID and state.get("column_list_id")
+            and state.get("columns", {}).keys() == {"zh", "en"}):
+        mode = PARENT_UPDATE_MODE
+        if mode == "auto":
+            mode = "swap" if estimate_diff_ops(state, columns) > PARENT_SWAP_THRESHOLD else "diff"
+        try:
+            if mode == "swap":
+                save_parent_state(swap_parent_column_list(state, total, columns))
+            else:
+                save_parent_state(update_parent_page_incremental(state, total, columns))
+            mode_name = "双缓冲替换" if mode == "swap" else "增量更新"
+            log_success(f"父页面新闻列表已{mode_name}（Notion标准左右两列）")
+            return True
         except Exception as e:
-            log_error(f"  添加内容到父页面失败: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_detail = e.response.json()
-                    log_error(f"  错误详情: {error_detail}")
-                except:
-                    log_error(f"  响应内容: {e.response.text[:500]}")
-            return False
+            log_warning(f"  增量更新失败，改为整页重建: {e}")
+
+    # 4. 整页重建
+    try:
+        save_parent_state(rebuild_parent_page(total, columns))
+    except Exception as e:
+        log_error(f"  添加内容到父页面失败: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            try:
+                error_detail = e.response.json()
+                log_error(f"  错误详情: {error_detail}")
+            except:
+                log_error(f"  响应内容: {e.response.text[:500]}")
+        return False
 
     log_success("父页面新闻列表已更新（Notion标准左右两列）")
     return True
 
+def export_metrics(extra: Dict = None):
+    """写出本次运行的指标报告（JSON + Prometheus textfile），失败不影响同步结果"""
+    if not METRICS_ENABLED:
+        return
+    try:
+        paths = metrics.export(extra=extra)
+        log_info(f"运行指标已写入: {', '.join(paths)}")
+    except OSError as e:
+        log_warning(f"写入运行指标失败: {e}")
+
 def main():
     """主函数"""
     print("\n" + "=" * 70)
@@ -654,137 +1676,162 @@ def main():
         log_error("NOTION_PARENT_PAGE_ID 未设置！")
         return
 
-    # 存储所有同步的故事和page_id
-    stories_with_pages = []
-
-    # 1. 获取中文热门话题
-    print("\n🇨🇳 获取中文热门话题")
-    print("-" * 70)
-    zh_stories = get_chainbase_stories("zh")
-    if not zh_stories:
-        log_error("没有获取到数据")
-        return
-
-    # 2. 为每个话题创建详细页面
-    print(f"\n📄 为前 {min(len(zh_stories), SYNC_ZH_COUNT)} 个话题创建详细页面")
-    print("-" * 70)
-
-    for i, story in enumerate(zh_stories[:SYNC_ZH_COUNT], 1):
-        keyword = story.get("keyword", "")
-        story_id = story.get("id", "")
-
-        print(f"\n[{i}/{min(len(zh_stories), SYNC_ZH_COUNT)}] 处理: {keyword[:40]}... ")
-
-        # 获取详细数据
-        timeline = get_story_timeline(story_id)
-        authors = get_story_authors(story_id)
-
-        # 创建详细页面(直接在数据库中创建,避免被删除)
-        page_id = create_story_page(NOTION_DATABASE_ID, story, "zh",
-                                     timeline, authors)
-
-        if page_id:
-            # 不再需要单独创建数据库条目,页面已经在数据库中
-            # 收集故事数据,用于更新父页面
-            stories_with_pages.append({
-                "story": story,
-                "page_id": page_id,
-                "rank": len(stories_with_pages) + 1,
-                "lang": "zh"
-            })
-            log_success(f"✅ 完成: {keyword[:30]}")
-        else:
-            print("❌")
-
-        time.sleep(2)  # 避免API限流
-
-    # 3. 获取英文热门话题
-    print("\n🇺🇸 获取英文热门话题")
-    print("-" * 70)
-    en_stories = get_chainbase_stories("en")
-    if not en_stories:
-        log_warning("没有获取到英文数据")
-        en_stories = []
-
-    # 4. 为每个英文话题创建详细页面（带翻译）
-    if en_stories:
-        print(f"\n📄 为前 {min(len(en_stories), SYNC_EN_COUNT)} 个英文话题创建详细页面")
-        print("-" * 70)
-
-        for i, story in enumerate(en_stories[:SYNC_EN_COUNT], 1):
-            keyword = story.get("keyword", "")
-            story_id = story.get("id", "")
-            summary = story.get("summary", "")
-
-            print(f"\n[{i}/{min(len(en_stories), SYNC_EN_COUNT)}] 处理: {keyword[:40]}... ")
-
-            # 翻译摘要
-            translated_summary = ""
-            if TRANSLATOR_ENABLED and summary:
-                print("  🌐 翻译中...", end="", flush=True)
-                translated_summary = translate_text_to_chinese(summary)
-                print(" ✅")
-
-            # 获取详细数据
-            timeline = get_story_timeline(story_id)
-            authors = get_story_authors(story_id)
-
-            # 创建详细页面(直接在数据库中创建,避免被删除)
-            page_id = create_story_page(NOTION_DATABASE_ID, story, "en",
-                                         timeline, authors, translated_summary)
-
-            if page_id:
-                # 不再需要单独创建数据库条目,页面已经在数据库中
-                # 收集故事数据,用于更新父页面
-                stories_with_pages.append({
-                    "story": story,
-                    "page_id": page_id,
-                    "rank": len(stories_with_pages) + 1,
-                    "lang": "en"
-                })
-                log_success(f"✅ 完成: {keyword[:30]}")
-            else:
-                print("❌")
-
-            time.sleep(3)  # 英文话题需要翻译，延迟更长
-
-    # 5. 更新父页面新闻列表
-    if stories_with_pages:
-        print("\n📰 更新父页面新闻列表")
+    # 0. 断点续跑：上次运行被中断时，沿用其话题列表并跳过已完成的步骤
+    resumed = load_resumable_run()
+    if resumed:
+        journal.resume(resumed["run_id"])
+        sync_log.set_run_id(resumed["run_id"])
+        _create_intents.update(resumed["intents"])
+        log_info(f"检测到未完成的运行 {resumed['run_id']}"
+                 f"（{(time.time() - resumed['started']) / 60:.0f} 分钟前开始），从断点继续: "
+                 f"已写入 {len(resumed['pages'])} 个页面 / 已翻译 {len(resumed['translated'])} 条")
+    else:
+        journal.start(datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+        sync_log.set_run_id(journal.run_id)
+        resumed = {"stories": {}, "pages": {}, "translated": {}, "backfilled": set(), "intents": {},
+                   "parent_updated": False}
+
+    sync_counts = {"created": 0, "updated": 0, "skipped": 0, "failed": 0, "resumed": 0}
+    pipeline = None
+
+    # 预先获取数据库结构，避免并发写入时重复请求
+    with metrics.stage("数据库结构"), memory_tracer.stage("数据库结构"):
+        get_database_schema(NOTION_DATABASE_ID)
+    pages_stage_start = time.monotonic()
+
+    if SYNC_TWO_PHASE:
+        # 1. 获取中英文热门话题
+        print("\n📥 获取中英文热门话题")
         print("-" * 70)
-        update_parent_page_with_news_list(stories_with_pages)
+        zh_selected = select_stories("zh", resumed)
+        if not zh_selected:
+            log_error("没有获取到数据")
+            return
+        en_selected = select_stories("en", resumed)
+        if not en_selected:
+            log_warning("没有获取到英文数据")
+
+        # 翻译阶段在后台运行，与条目写入并行
+        translation_executor = ThreadPoolExecutor(max_workers=1)
+        translation_future = translation_executor.submit(translate_summaries, en_selected,
+                                                         resumed["translated"])
+        translation_executor.shutdown(wait=False)
+
+        # 查询已存在的话题页面（upsert模式，通过本地镜像）
+        existing_pages = {}
+        if SYNC_UPSERT:
+            try:
+                existing_pages = load_existing_pages(
+                    NOTION_DATABASE_ID, [s.get("id", "") for s in zh_selected + en_selected])
+                log_info(f"数据库中已有 {len(existing_pages)} 个话题页面，将直接更新")
+            except Exception as e:
+                log_warning(f"查询已有页面失败，本次全部新建: {e}")
+
+        # 2. 两阶段：条目 → 父页面 → 正文回填
+        with memory_tracer.stage("话题页面"):
+            stories_with_pages = sync_two_phase(zh_selected, en_selected, existing_pages,
+                                                translation_future, sync_counts, resumed)
+        metrics.observe_stage("话题页面", time.monotonic() - pages_stage_start)
+    else:
+        # 2. 流水线：榜单 → 详情 → 翻译 → 构建 → 写入，中英文同时进行
+        with memory_tracer.stage("话题页面"):
+            selected, stories_with_pages, pipeline = sync_pipeline(resumed, sync_counts)
+        metrics.observe_stage("话题页面", time.monotonic() - pages_stage_start)
+        zh_selected, en_selected = selected.get("zh", []), selected.get("en", [])
+        if not en_selected:
+            log_warning("没有获取到英文数据")
+
+        # 3. 更新父页面新闻列表
+        # 中文榜单为空时英文页面已经写入，不能提前返回：仍要完成运行日志和指标输出，
+        # 否则下次运行会把本次当作中断的运行续跑；只是不更新父页面，避免清空中文列表
+        if zh_selected:
+            update_parent_if_needed(stories_with_pages, resumed,
+                                    wrote_pages=sync_counts["resumed"] < len(zh_selected) + len(en_selected))
+        else:
+            log_error("没有获取到中文数据，父页面新闻列表保持不变")
 
-    # 6. 统计
+    # 4. 统计
     print("\n" + "=" * 70)
     print("📈 同步统计")
     print("=" * 70)
-    log_success(f"中文话题: {min(len(zh_stories), SYNC_ZH_COUNT)} 个")
-    if en_stories:
-        log_success(f"英文话题: {min(len(en_stories), SYNC_EN_COUNT)} 个（含免费翻译）")
+    log_success(f"中文话题: {len(zh_selected)} 个")
+    if en_selected:
+        log_success(f"英文话题: {len(en_selected)} 个（含免费翻译）")
     log_info(f"每个话题包含:")
     log_info(f"  - 详细页面（元数据、摘要、推文、作者）")
     log_info(f"  - 数据库条目（快速访问）")
     log_info(f"  - 父页面新闻列表（TOP 20排行）")
+    log_success(f"页面: 新建 {sync_counts['created']} / 更新 {sync_counts['updated']} / "
+                f"无变化跳过 {sync_counts['skipped']} / 失败 {sync_counts['failed']}")
+    if sync_counts["resumed"]:
+        log_info(f"断点续跑: {sync_counts['resumed']} 个页面沿用中断前的写入结果")
+    if pipeline:
+        for line in pipeline.stats_lines():
+            log_info(line)
+    if CACHE_ENABLED:
+        cache_stats = detail_cache.stats()
+        log_info(f"详情缓存: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']} "
+                 f"(命中率 {cache_stats['hit_rate']:.0%}) / "
+                 f"过期兜底 {cache_stats['stale_served']} / 淘汰 {cache_stats['evictions']}")
+    translation_stats = translation.stats_line()
+    if translation_stats:
+        log_info(translation_stats)
+    if HEDGE_ENABLED and hedger.stats_line():
+        log_info(f"详情{hedger.stats_line()}")
+    for line in notion_writes.stats_lines():
+        log_info(line)
+    for line in http_stats_lines():
+        log_info(line)
+    for line in metrics.summary_lines():
+        log_info(line)
+    memory_error = memory_tracer.check_budget("话题页面", len(zh_selected) + len(en_selected))
+    for line in memory_tracer.summary_lines():
+        log_info(line)
+    export_metrics({"run_id": journal.run_id, "pages": sync_counts,
+                    "pipeline": pipeline.stats() if pipeline else [],
+                    "memory": memory_tracer.report() if MEMORY_TRACE_ENABLED else {}})
 
     print("\n" + "=" * 70)
     print("🎉 增强版同步完成！")
     print("=" * 70)
     print(f"\n💡 查看数据库: https://www.notion.so/{NOTION_DATABASE_ID.replace('-', '')}")
     print(f"   每个话题都有详细页面，包含推文和作者信息")
-    print(f"   ✅ 父页面已更新：新闻列表TOP {len(stories_with_pages)}")
-    if en_stories and TRANSLATOR_ENABLED:
+    if zh_selected:
+        print(f"   ✅ 父页面已更新：新闻列表TOP {len(stories_with_pages)}")
+    if en_selected and TRANSLATOR_ENABLED:
         print(f"   ✅ 英文话题已使用Google免费翻译\n")
     else:
         print()
 
+    journal.complete()
+
+    if memory_error:
+        # 同步本身已完成；内存超过阈值时以非0退出，让基准测试失败
+        log_error(memory_error)
+        sys.exit(1)
+
 if __name__ == "__main__":
+    if PROFILE_ENABLED and MEMORY_TRACE_ENABLED:
+        # tracemalloc会让运行慢一个数量级，采样线程也几乎拿不到GIL，剖析结果没有参考价值
+        log_error("性能剖析（--profile / SYNC_PROFILE）不能与内存追踪（SYNC_MEMORY_TRACE）同时启用，请分开运行")
+        sys.exit(2)
+    sync_log.setup()
+    memory_tracer.start()
     try:
-        main()
+        if PROFILE_ENABLED:
+            # cProfile + 调用栈采样，结束时输出剖析结果（异常退出时同样输出）
+            with Profiler(log=log_info):
+                main()
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断")
+        export_metrics({"run_id": journal.run_id, "outcome": "interrupted"})
         sys.exit(1)
     except Exception as e:
         log_error(f"程序异常: {e}")
         import traceback
         traceback.print_exc()
+        # 异常退出时同样导出已收集的指标，便于定位是哪个服务拖慢或出错
+        export_metrics({"run_id": journal.run_id, "outcome": "error"})
         sys.exit(1)
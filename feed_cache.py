@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Chainbase话题榜单（/tops/v1/stories）条件请求
+功能：
+✅ 按URL保存ETag / Last-Modified和响应体哈希
+✅ 请求时携带If-None-Match / If-Modified-Since
+✅ 304或响应体哈希相同时直接复用已解析的话题列表，跳过JSON解析
+✅ 返回榜单是否变化，供后续阶段判断
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from state_store import open_sqlite
+
+FEED_CACHE_ENABLED = os.getenv("CHAINBASE_FEED_CACHE_ENABLED", "1") != "0"
+
+_conn = None
+_lock = threading.Lock()
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_sqlite("chainbase_cache.sqlite3")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS feed_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                items BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+    return _conn
+
+def _load(url: str) -> Optional[Dict]:
+    with _lock:
+        row = _db().execute(
+            "SELECT etag, last_modified, body_hash, items FROM feed_cache WHERE url = ?",
+            (url,)).fetchone()
+    if row is None:
+        return None
+    etag, last_modified, body_hash, items = row
+    return {
+        "etag": etag,
+        "last_modified": last_modified,
+        "body_hash": body_hash,
+        "items": items,
+    }
+
+def _save(url: str, etag: Optional[str], last_modified: Optional[str],
+          body_hash: str, items: bytes):
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO feed_cache VALUES (?, ?, ?, ?, ?, ?)",
+                      (url, etag, last_modified, body_hash, items, time.time()))
+
+def _decode_items(blob: bytes) -> List[Dict]:
+    return json.loads(zlib.decompress(blob))
+
+def fetch_feed(client, url: str) -> Tuple[List[Dict], bool]:
+    """
+    条件请求话题榜单
+
+    返回 (话题列表, 是否有变化)。请求失败时抛出异常。
+    """
+    stored = _load(url) if FEED_CACHE_ENABLED else None
+
+    headers = {}
+    if stored:
+        if stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    response = client.get(url, headers=headers)
+    if response.status_code == 304 and stored:
+        return _decode_items(stored["items"]), False
+    response.raise_for_status()
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    body_hash = hashlib.sha256(response.content).hexdigest()
+
+    if stored and stored["body_hash"] == body_hash:
+        # 服务端不支持条件请求，但内容没变：只刷新验证器
+        _save(url, etag, last_modified, body_hash, stored["items"])
+        return _decode_items(stored["items"]), False
+
+    items = response.json().get("items", [])
+    if FEED_CACHE_ENABLED:
+        blob = zlib.compress(json.dumps(items, ensure_ascii=False).encode("utf-8"))
+        _save(url, etag, last_modified, body_hash, blob)
+    return items, True
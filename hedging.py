@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+对冲请求（hedged requests），降低Chainbase详情接口的长尾延迟
+功能：
+✅ 按接口维护滚动延迟窗口（只记录成功请求本身的耗时，不含重试退避），计算p95
+✅ 请求超过p95仍未返回时再发一个相同请求，取先返回的结果，丢弃另一个
+✅ 对冲次数占总请求数的比例有上限，限制额外负载
+✅ 样本不足时不对冲；统计对冲次数与对冲请求胜出次数
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+# ============ 配置区 ============
+
+HEDGE_ENABLED = os.getenv("CHAINBASE_HEDGE_ENABLED", "0") == "1"
+# 对冲请求数占总请求数的比例上限
+HEDGE_MAX_RATIO = float(os.getenv("CHAINBASE_HEDGE_MAX_RATIO", "0.1"))
+# 每个接口至少积累多少个延迟样本后才开始对冲
+HEDGE_MIN_SAMPLES = int(os.getenv("CHAINBASE_HEDGE_MIN_SAMPLES", "20"))
+# 滚动窗口大小
+HEDGE_WINDOW = 200
+
+T = TypeVar("T")
+
+class Hedger:
+    """按接口统计延迟并在超过p95时发出对冲请求"""
+
+    def __init__(self, max_ratio: float = HEDGE_MAX_RATIO, min_samples: int = HEDGE_MIN_SAMPLES,
+                 window: int = HEDGE_WINDOW, workers: int = 16):
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+
+    def _record(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def threshold(self, endpoint: str) -> Optional[float]:
+        """接口当前的p95延迟（秒），样本不足时返回None"""
+        with self._lock:
+            samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(0.95 * len(samples))) - 1)]
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, endpoint: str, fn: Callable[[], T],
+               latency: Optional[Callable[[T], float]]) -> Callable[[], T]:
+        """只记录成功调用的延迟：失败的请求（快速拒绝或超时）会把p95拉偏"""
+        def run():
+            started = time.monotonic()
+            result = fn()
+            self._record(endpoint, latency(result) if latency else time.monotonic() - started)
+            return result
+        return run
+
+    def call(self, endpoint: str, fn: Callable[[], T],
+             latency: Optional[Callable[[T], float]] = None) -> T:
+        """
+        执行fn，超过该接口p95仍未完成时（在比例上限内）并发再执行一次，
+        返回先成功的结果；两次都失败时抛出第一个异常
+
+        fn内部有重试时应传入latency，从结果中取出成功的那次请求本身的耗时；
+        否则按fn的总耗时记录，p95会被重试前的退避等待拉长，对冲触发过晚或不触发
+        """
+        with self._lock:
+            self.calls += 1
+
+        threshold = self.threshold(endpoint)
+        if threshold is None:
+            return self._timed(endpoint, fn, latency)()
+
+        primary = self._executor.submit(self._timed(endpoint, fn, latency))
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._allow_hedge():
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed(endpoint, fn, latency))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # 落后的请求无法中断，结果直接丢弃
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def stats_line(self) -> str:
+        if not self.calls:
+            return ""
+        return (f"对冲请求: {self.hedges}/{self.calls} 次 "
+                f"({self.hedges / self.calls:.0%}，上限 {self.max_ratio:.0%}) / "
+                f"对冲胜出 {self.hedge_wins} 次")
+
+hedger = Hedger()
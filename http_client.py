@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+共享HTTP客户端（Chainbase + Notion）
+功能：
+✅ 每个域名一个keep-alive Session，复用TCP+TLS连接
+✅ 统一的默认请求头和默认超时
+✅ 可调的连接池大小（适配并发获取）
+✅ 按域名令牌桶限流，自动处理429 + Retry-After
+✅ 可重试错误指数退避重试（带抖动和总时间预算），按域名熔断
+✅ 运行结束时输出连接复用和限流统计
+✅ 每次实际发出的请求记入运行指标（状态码、字节数、延迟）
+
+用法：
+    from http_client import chainbase, notion
+    response = chainbase.get("/tops/v1/stories?lang=zh")
+    response = notion.post("/v1/pages", json=payload)
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import metrics
+from rate_limit import TokenBucket, parse_retry_after
+from retry_policy import (CircuitBreaker, RetryPolicy, is_retryable_error,
+                          is_retryable_status)
+
+# ============ 配置区 ============
+
+CHAINBASE_API_BASE = os.getenv("CHAINBASE_API_BASE", "https://api.chainbase.com")
+NOTION_API_BASE = os.getenv("NOTION_API_BASE", "https://api.notion.com")
+NOTION_VERSION = "2022-06-28"
+
+# 每个域名的连接池大小（应不小于并发线程数）
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+# 每个域名的请求速率上限（次/秒），Notion官方限制约为3次/秒
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+CHAINBASE_RATE_LIMIT = float(os.getenv("CHAINBASE_RATE_LIMIT", "10"))
+
+# 收到429后最多重试次数
+MAX_THROTTLE_RETRIES = int(os.getenv("HTTP_MAX_THROTTLE_RETRIES", "5"))
+
+# 超时/断连/5xx的最多重试次数，以及单次调用（含重试和等待）的总时间预算（秒）
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+RETRY_BUDGET = float(os.getenv("HTTP_RETRY_BUDGET", "30"))
+
+# 连续失败多少次后熔断，熔断后多少秒再放行试探请求
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", "30"))
+
+# 默认可安全重试的方法；POST / PATCH需调用方用idempotent=True声明
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+# ============ 客户端 ============
+
+def _counting_pool_classes(on_connect):
+    """
+    构造会统计真实建连次数的urllib3连接池类
+
+    urllib3在连接被服务端关闭后会复用同一个连接对象重新connect，
+    pool.num_connections不会增加，因此在connect()处计数才准确。
+    """
+    class CountingHTTPConnection(HTTPConnection):
+        def connect(self):
+            super().connect()
+            on_connect()
+
+    class CountingHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            super().connect()
+            on_connect()
+
+    class CountingHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = CountingHTTPConnection
+
+    class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = CountingHTTPSConnection
+
+    return {"http": CountingHTTPConnectionPool, "https": CountingHTTPSConnectionPool}
+
+class HostClient:
+    """单个域名的HTTP客户端，内部持有一个带连接池的Session"""
+
+    def __init__(self, name: str, base_url: str, headers: Optional[Dict] = None,
+                 timeout: float = 10, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 rate_limit: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=MAX_RETRIES, budget=RETRY_BUDGET)
+        self.breaker = breaker or CircuitBreaker(threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN)
+        self.request_count = 0
+        self.retry_count = 0
+        self.connect_count = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        # pool_block=True: 并发超过池大小时等待空闲连接，而不是新建后丢弃
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                                   pool_block=True)
+        self.adapter.poolmanager.pool_classes_by_scheme = _counting_pool_classes(self._on_connect)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def _on_connect(self):
+        with self._lock:
+            self.connect_count += 1
+
+    def url(self, path: str) -> str:
+        """相对路径拼接base_url，完整URL原样返回"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, idempotent: Optional[bool] = None,
+                retry: bool = True, **kwargs) -> requests.Response:
+        """
+        发送请求
+
+        - 熔断中直接抛出CircuitOpenError，不发请求
+        - 先从令牌桶取令牌；收到429时按Retry-After等待后重试，并通知限流器降速
+        - 超时/断连/5xx按指数退避重试（idempotent=False时只重试连接失败），
+          总时间不超过重试策略的预算；retry=False时不做这类重试
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        timeout = kwargs["timeout"]
+        started = time.monotonic()
+
+        attempt = 0
+        retries = 0
+        while True:
+            self.breaker.before_request()
+            if retries and isinstance(timeout, (int, float)):
+                # 重试时单次超时不超过剩余预算
+                remaining = self.retry_policy.budget - (time.monotonic() - started)
+                kwargs["timeout"] = max(1.0, min(timeout, remaining))
+
+            sent = time.monotonic()
+            try:
+                if self.limiter:
+                    self.limiter.acquire()
+                sent = time.monotonic()
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                metrics.observe_request(self.name, method, url, type(e).__name__,
+                                        time.monotonic() - sent)
+                self.breaker.on_failure()
+                delay = None
+                if retry and is_retryable_error(e, idempotent):
+                    delay = self.retry_policy.next_delay(retries, started)
+                if delay is None:
+                    raise
+                self._count_retry()
+                retries += 1
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # 其他异常同样计为失败，释放半开状态的试探名额，否则熔断器会一直拒绝请求
+                self.breaker.on_failure()
+                raise
+
+            with self._lock:
+                self.request_count += 1
+            body = response.request.body or b""
+            metrics.observe_request(self.name, method, url, response.status_code,
+                                    time.monotonic() - sent, bytes_out=len(body),
+                                    bytes_in=len(response.content))
+
+            if is_retryable_status(response.status_code):
+                self.breaker.on_failure()
+                delay = None
+                if retry and idempotent:
+                    retry_after = response.headers.get("Retry-After")
+                    delay = self.retry_policy.next_delay(
+                        retries, started, parse_retry_after(retry_after) if retry_after else None)
+                if delay is None:
+                    return response
+                response.close()
+                self._count_retry()
+                retries += 1
+                time.sleep(delay)
+                continue
+
+            # 收到非5xx响应说明服务可用
+            self.breaker.on_success()
+
+            if response.status_code == 429 and self.limiter and attempt < MAX_THROTTLE_RETRIES:
+                self.limiter.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+                response.close()
+                attempt += 1
+                continue
+
+            if self.limiter and response.status_code < 400:
+                self.limiter.on_success()
+            return response
+
+    def _count_retry(self):
+        with self._lock:
+            self.retry_count += 1
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def connection_stats(self) -> Dict:
+        """统计请求数与真实建连（TCP+TLS握手）次数"""
+        connections = self.connect_count
+        requests_sent = self.request_count
+        reused = max(0, requests_sent - connections)
+        return {
+            "name": self.name,
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": reused,
+            "reuse_rate": (reused / requests_sent) if requests_sent else 0.0,
+        }
+
+# ============ 共享实例 ============
+
+chainbase = HostClient("chainbase", CHAINBASE_API_BASE, timeout=10,
+                       rate_limit=CHAINBASE_RATE_LIMIT)
+
+notion = HostClient("notion", NOTION_API_BASE, headers={
+    "Authorization": f"Bearer {os.getenv('NOTION_API_KEY', '')}",
+    "Content-Type": "application/json",
+    "Notion-Version": NOTION_VERSION
+}, timeout=30, rate_limit=NOTION_RATE_LIMIT)
+
+def all_clients() -> List[HostClient]:
+    return [chainbase, notion]
+
+def connection_stats() -> List[Dict]:
+    """返回所有客户端的连接复用统计（跳过未使用的客户端）"""
+    return [c.connection_stats() for c in all_clients() if c.request_count]
+
+def format_connection_stats(stats: Dict) -> str:
+    return (f"{stats['name']}: {stats['requests']} 次请求 / "
+            f"{stats['connections']} 个新连接 "
+            f"(复用率 {stats['reuse_rate']:.0%})")
+
+def stats_lines() -> List[str]:
+    """运行结束时输出的HTTP统计（连接复用 + 限流 + 重试/熔断）"""
+    lines = []
+    for client in all_clients():
+        if not client.request_count and not client.retry_count and not client.breaker.trips:
+            continue
+        lines.append(f"HTTP连接 {format_connection_stats(client.connection_stats())}")
+        if client.limiter:
+            limit = client.limiter.stats()
+            lines.append(f"HTTP限流 {client.name}: 等待 {limit['wait_seconds']:.1f} 秒 / "
+                         f"429 {limit['throttled']} 次 / "
+                         f"当前速率 {limit['rate']:.2f}/{limit['max_rate']:.2f} 次/秒")
+        breaker = client.breaker.stats()
+        lines.append(f"HTTP重试 {client.name}: 重试 {client.retry_count} 次 / "
+                     f"熔断 {breaker['trips']} 次 / 快速失败 {breaker['fast_failures']} 次 / "
+                     f"熔断器 {breaker['state']}")
+    return lines
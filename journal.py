@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+同步运行日志（断点续跑）
+功能：
+✅ 追加写入JSONL，每条记录写入后立即fsync，进程被中断也不会丢失已完成的步骤
+✅ 按话题记录完成的步骤：fetched / translated / page_written / backfilled，
+   以及 parent_updated / run_completed
+✅ 各语言选中的话题可以在运行开始时一次性记录，也可以在榜单获取后分别记录（selected）
+✅ 创建页面前记录意图（create_intent），中断后可据此查找已创建的页面
+✅ 启动时回放日志：上次运行未完成时返回已完成的步骤，从断点继续，
+   已写入的页面直接复用page_id，不会重复创建
+✅ 末尾写了一半的记录（被中断时）自动忽略，续跑前截断
+✅ 写入失败的页面不记为已完成，续跑时重新写入
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from state_store import state_path
+
+class RunJournal:
+    """单次运行的追加式日志，只保留最近一次运行"""
+
+    def __init__(self, name: str = "run_journal.jsonl"):
+        self.path = state_path(name)
+        self.run_id = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Dict]:
+        """
+        回放日志，上次运行未完成时返回其状态，否则返回None
+
+        返回 {"run_id", "started", "resumes": 已续跑次数, "stories": {"zh": [...], "en": [...]}, "fetched": set,
+              "translated": {story_id: 译文}, "pages": {(lang, story_id): page_id},
+              "backfilled": set, "intents": {story_id: {"marker", "time"}},
+              "parent_updated": bool}
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+
+        state = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 被中断时写了一半的最后一行
+                continue
+            step = record.get("step")
+            if step == "run_started":
+                state = {
+                    "run_id": record["run_id"],
+                    "started": record.get("time", 0),
+                    "resumes": 0,
+                    "stories": dict(record.get("stories") or {}),
+                    "fetched": set(),
+                    "translated": {},
+                    "pages": {},
+                    "backfilled": set(),
+                    "intents": {},
+                    "parent_updated": False,
+                }
+            elif state is None:
+                continue
+            elif step == "run_resumed":
+                state["resumes"] += 1
+            elif step == "selected":
+                state["stories"][record["lang"]] = record["stories"]
+            elif step == "fetched":
+                state["fetched"].add(record["story_id"])
+            elif step == "translated":
+                state["translated"][record["story_id"]] = record["text"]
+            elif step == "create_intent":
+                state["intents"][record["story_id"]] = {"marker": record["marker"],
+                                                        "time": record["time"]}
+            elif step == "page_written" and record.get("action") != "failed":
+                state["pages"][(record["lang"], record["story_id"])] = record["page_id"]
+                state["intents"].pop(record["story_id"], None)
+            elif step == "backfilled":
+                state["backfilled"].add(record["story_id"])
+            elif step == "parent_updated":
+                state["parent_updated"] = True
+            elif step == "run_completed":
+                state = None
+        return state
+
+    def start(self, run_id: str, stories: Optional[Dict[str, List[Dict]]] = None):
+        """
+        开始新的运行：清空旧日志并记录本次选中的话题
+
+        流水线模式下榜单尚未获取，stories留空，之后按语言记录selected
+        """
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self.run_id = run_id
+        self.record("run_started", stories=stories or {})
+
+    def resume(self, run_id: str):
+        """从未完成的运行继续：去掉末尾写了一半的记录，在原日志后追加"""
+        with self._lock:
+            self._truncate_partial_line()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.run_id = run_id
+        self.record("run_resumed")
+
+    def _truncate_partial_line(self):
+        """被中断时最后一行可能没有写完，截断到最后一个完整行，避免与新记录拼成一行"""
+        try:
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except OSError:
+            pass
+
+    def record(self, step: str, **fields):
+        """追加一条记录并fsync（未开始运行时忽略）"""
+        with self._lock:
+            if self._file is None:
+                return
+            record = {"run_id": self.run_id, "step": step, "time": time.time()}
+            record.update(fields)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def complete(self):
+        self.record("run_completed")
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+journal = RunJournal()
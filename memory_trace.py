@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+内存追踪模式（SYNC_MEMORY_TRACE=1）
+功能：
+✅ 基于tracemalloc，在每个阶段的边界做快照，统计阶段内净增内存、峰值内存，
+   以及阶段开始 / 结束时的进程RSS（阶段内RSS变化）；进程峰值RSS单独列出
+✅ 列出每个阶段新增内存最多的分配位置（文件:行号）
+✅ 流水线结束时按调用栈把仍存活的内存归属到各流水线阶段（榜单 / 详情 / 翻译 / 构建 / 写入）
+✅ 计算每个话题的峰值内存，超过阈值时判定本次运行失败（用于基准测试，评估加大话题数量后的内存）
+
+用法：
+    with memory_tracer.stage("话题页面"):
+        ...
+    memory_tracer.attribute("话题页面", {"详情": detail_stage, ...})
+    error = memory_tracer.check_budget("话题页面", story_count)
+"""
+
+import dis
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ============ 配置区 ============
+
+MEMORY_TRACE_ENABLED = os.getenv("SYNC_MEMORY_TRACE", "0") == "1"
+# 每次分配保存的调用栈深度（归属流水线阶段需要足够深的调用栈）
+MEMORY_TRACE_FRAMES = int(os.getenv("SYNC_MEMORY_TRACE_FRAMES", "30"))
+# 每个话题允许的峰值内存（MB），0表示不检查
+MEMORY_PER_STORY_LIMIT_MB = float(os.getenv("SYNC_MEMORY_PER_STORY_LIMIT_MB", "0"))
+# 每个阶段列出的分配位置个数
+MEMORY_TOP_SITES = 5
+
+def peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值RSS（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    # Linux下ru_maxrss单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def current_rss_mb() -> Optional[float]:
+    """当前RSS（MB），只支持有/proc的平台（Linux），其余返回None"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+def _mb(size: int) -> float:
+    return size / 1024 / 1024
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _site(frame: tracemalloc.Frame) -> str:
+    """分配位置：项目内文件用相对路径，库文件保留最后两级路径"""
+    filename = frame.filename
+    if filename.startswith(_PROJECT_DIR):
+        filename = os.path.relpath(filename, _PROJECT_DIR)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f"{filename}:{frame.lineno}"
+
+def _code_range(func: Callable):
+    code = func.__code__
+    last = max((line for _, line in dis.findlinestarts(code)), default=code.co_firstlineno)
+    return code.co_filename, code.co_firstlineno, last
+
+class MemoryTracer:
+    """按阶段记录tracemalloc快照；未启用时所有方法都是空操作"""
+
+    def __init__(self, enabled: bool = MEMORY_TRACE_ENABLED, frames: int = MEMORY_TRACE_FRAMES):
+        self.enabled = enabled
+        self.frames = frames
+        self.stages: Dict[str, Dict] = {}
+        self._open: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        # 排除tracemalloc自身的开销
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        记录一个阶段的内存：净增、峰值（tracemalloc）、开始 / 结束时的RSS、新增最多的分配位置
+
+        支持嵌套；只应在主线程的阶段边界调用
+        """
+        if not self.enabled or not tracemalloc.is_tracing():
+            yield
+            return
+
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in self._open:
+                outer["peak"] = max(outer["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"name": name, "start": current, "peak": current,
+                     "rss": current_rss_mb(), "snapshot": self._take_snapshot()}
+            self._open.append(frame)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._open.remove(frame)
+                current, peak = tracemalloc.get_traced_memory()
+                for outer in self._open:
+                    outer["peak"] = max(outer["peak"], peak)
+                snapshot = self._take_snapshot()
+                top = snapshot.compare_to(frame["snapshot"], "lineno")[:MEMORY_TOP_SITES]
+                rss = current_rss_mb()
+                self.stages.setdefault(name, {}).update({
+                    "start_mb": round(_mb(frame["start"]), 2),
+                    "end_mb": round(_mb(current), 2),
+                    "peak_mb": round(_mb(max(frame["peak"], peak)), 2),
+                    "rss_start_mb": round(frame["rss"], 1) if frame["rss"] is not None else None,
+                    "rss_end_mb": round(rss, 1) if rss is not None else None,
+                    "top_sites": [{"site": _site(stat.traceback[0]),
+                                   "size_diff_kb": round(stat.size_diff / 1024, 1),
+                                   "count_diff": stat.count_diff} for stat in top],
+                })
+
+    def attribute(self, name: str, functions: Dict[str, Callable]):
+        """
+        按分配调用栈把当前仍存活的内存归属到给定函数（流水线各阶段函数）
+
+        结果记在阶段name下的"retained_by"：{函数名: MB}
+        """
+        if not self.enabled or not tracemalloc.is_tracing():
+            return
+        ranges = {label: _code_range(func) for label, func in functions.items()}
+        retained = {label: 0 for label in functions}
+        for stat in self._take_snapshot().statistics("traceback"):
+            for frame in stat.traceback:
+                label = next((label for label, (filename, first, last) in ranges.items()
+                              if frame.filename == filename and first <= frame.lineno <= last), None)
+                if label:
+                    retained[label] += stat.size
+                    break
+        self.stages.setdefault(name, {})["retained_by"] = {
+            label: round(_mb(size), 3) for label, size in retained.items()}
+
+    def check_budget(self, name: str, stories: int,
+                     limit_mb: float = MEMORY_PER_STORY_LIMIT_MB) -> Optional[str]:
+        """阶段内每个话题的峰值内存超过limit_mb时返回错误说明，否则返回None"""
+        stage = self.stages.get(name)
+        if not self.enabled or not stage or "peak_mb" not in stage or not stories:
+            return None
+        per_story = (stage["peak_mb"] - stage["start_mb"]) / stories
+        stage["per_story_mb"] = round(per_story, 3)
+        if limit_mb and per_story > limit_mb:
+            return (f"每个话题峰值内存 {per_story:.2f}MB 超过阈值 {limit_mb:.2f}MB"
+                    f"（阶段 {name}，{stories} 个话题）")
+        return None
+
+    def report(self) -> Dict:
+        peak_rss = peak_rss_mb()
+        return {"stages": dict(self.stages),
+                "process_peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None}
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, stage in self.stages.items():
+            if "peak_mb" in stage:
+                line = (f"内存 {name}: 开始 {stage['start_mb']:.1f}MB / 结束 {stage['end_mb']:.1f}MB / "
+                        f"峰值 {stage['peak_mb']:.1f}MB")
+                if stage["rss_start_mb"] is not None and stage["rss_end_mb"] is not None:
+                    line += (f" / RSS {stage['rss_start_mb']:.0f}MB → {stage['rss_end_mb']:.0f}MB "
+                             f"({stage['rss_end_mb'] - stage['rss_start_mb']:+.1f}MB)")
+                if "per_story_mb" in stage:
+                    line += f" / 每个话题 {stage['per_story_mb'] * 1024:.0f}KB"
+                lines.append(line)
+                for site in stage["top_sites"]:
+                    lines.append(f"  {site['size_diff_kb']:+.1f}KB ({site['count_diff']:+d} 个对象) "
+                                 f"{site['site']}")
+            if "retained_by" in stage:
+                lines.append(f"  {name}结束时仍存活的内存: " + " / ".join(
+                    f"{label} {size * 1024:.0f}KB" for label, size in stage["retained_by"].items()))
+        peak_rss = peak_rss_mb()
+        if lines and peak_rss is not None:
+            lines.append(f"进程峰值RSS（运行至今）: {peak_rss:.0f}MB")
+        return lines
+
+memory_tracer = MemoryTracer()
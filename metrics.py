@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+运行指标（每次同步结束时导出）
+功能：
+✅ 按 域名 + 接口 + 方法 统计请求次数、状态码分布、上下行字节数、延迟p50 / p95 / 最大值
+✅ 接口路径中的ID自动归一为{id}，同一接口的请求合并统计
+✅ 按阶段计时（获取数据、写入页面、更新父页面等）
+✅ 运行结束时写出JSON报告和Prometheus textfile（node_exporter textfile collector格式），
+   便于逐次对比同步成本
+
+用法：
+    from metrics import metrics
+    with metrics.stage("父页面"):
+        ...
+    metrics.export()
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+# ============ 配置区 ============
+
+# 报告输出目录，文件名为 sync_metrics.json / sync_metrics.prom
+METRICS_DIR = os.getenv("METRICS_DIR", ".")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Prometheus指标名前缀
+METRICS_PREFIX = "tops_sync"
+
+_ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-fA-F-]{16,})$")
+# 这些路径段之后的一段是资源ID（Chainbase话题、Notion页面 / 块 / 数据库）
+_ID_PARENTS = {"hotspot", "pages", "blocks", "databases"}
+
+def normalize_endpoint(url: str) -> str:
+    """URL转为接口名：去掉域名和查询参数，路径中的资源ID替换为{id}"""
+    path = urlsplit(url).path or "/"
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        if segment and ((i and segments[i - 1] in _ID_PARENTS) or _ID_SEGMENT_RE.match(segment)):
+            segments[i] = "{id}"
+    return "/".join(segments)
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class Metrics:
+    """进程内的请求 / 阶段指标，线程安全"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._requests: Dict[tuple, Dict] = {}
+        self._stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    # ============ 记录 ============
+
+    def observe_request(self, host: str, method: str, url: str, status: Union[int, str],
+                        seconds: float, bytes_out: int = 0, bytes_in: int = 0):
+        """
+        记录一次对外请求（每次实际发出的请求都记录，重试分别计数）
+
+        status为HTTP状态码，请求未拿到响应时为异常类型名（如 ReadTimeout）
+        """
+        key = (host, normalize_endpoint(url), method)
+        with self._lock:
+            entry = self._requests.setdefault(key, {
+                "count": 0, "bytes_out": 0, "bytes_in": 0, "status": {}, "latencies": []})
+            entry["count"] += 1
+            entry["bytes_out"] += bytes_out
+            entry["bytes_in"] += bytes_in
+            entry["status"][str(status)] = entry["status"].get(str(status), 0) + 1
+            entry["latencies"].append(seconds)
+
+    def observe_stage(self, name: str, seconds: float):
+        with self._lock:
+            self._stages.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """对一个阶段计时（异常时同样记录）"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.monotonic() - started)
+
+    # ============ 导出 ============
+
+    def report(self, extra: Optional[Dict] = None) -> Dict:
+        """汇总为可JSON序列化的报告"""
+        with self._lock:
+            requests_report = []
+            for (host, endpoint, method), entry in sorted(self._requests.items()):
+                latencies = entry["latencies"]
+                requests_report.append({
+                    "host": host,
+                    "endpoint": endpoint,
+                    "method": method,
+                    "count": entry["count"],
+                    "bytes_out": entry["bytes_out"],
+                    "bytes_in": entry["bytes_in"],
+                    "status": dict(sorted(entry["status"].items())),
+                    "latency_p50": round(_percentile(latencies, 0.50), 4),
+                    "latency_p95": round(_percentile(latencies, 0.95), 4),
+                    "latency_max": round(max(latencies), 4),
+                    "latency_sum": round(sum(latencies), 4),
+                })
+            stages_report = {name: {"count": len(durations),
+                                    "seconds": round(sum(durations), 4),
+                                    "max": round(max(durations), 4)}
+                             for name, durations in self._stages.items()}
+
+        hosts = {}
+        for entry in requests_report:
+            host = hosts.setdefault(entry["host"], {"count": 0, "bytes_out": 0, "bytes_in": 0,
+                                                    "latency_sum": 0.0})
+            for field in ("count", "bytes_out", "bytes_in", "latency_sum"):
+                host[field] += entry[field]
+
+        report = {
+            "started": self.started,
+            "duration": round(time.time() - self.started, 3),
+            "hosts": hosts,
+            "requests": requests_report,
+            "stages": stages_report,
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def prometheus_text(self, report: Dict) -> str:
+        """报告转为Prometheus文本格式"""
+        p = METRICS_PREFIX
+        lines = [
+            f"# HELP {p}_requests_total Outbound requests by host, endpoint, method and status.",
+            f"# TYPE {p}_requests_total counter",
+        ]
+        for entry in report["requests"]:
+            labels = (f'host="{_escape_label(entry["host"])}",'
+                      f'endpoint="{_escape_label(entry["endpoint"])}",'
+                      f'method="{entry["method"]}"')
+            for status, count in entry["status"].items():
+                lines.append(f'{p}_requests_total{{{labels},status="{_escape_label(status)}"}} {count}')
+
+        for metric, field, help_text in (
+                ("request_bytes_sent_total", "bytes_out", "Request body bytes sent."),
+                ("request_bytes_received_total", "bytes_in", "Response body bytes received."),
+                ("request_latency_p50_seconds", "latency_p50", "Median request latency."),
+                ("request_latency_p95_seconds", "latency_p95", "95th percentile request latency."),
+                ("request_latency_max_seconds", "latency_max", "Slowest request latency."),
+                ("request_latency_seconds_sum", "latency_sum", "Total time spent in requests.")):
+            kind = "counter" if metric.endswith("_total") else "gauge"
+            lines.append(f"# HELP {p}_{metric} {help_text}")
+            lines.append(f"# TYPE {p}_{metric} {kind}")
+            for entry in report["requests"]:
+                labels = (f'host="{_escape_label(entry["host"])}",'
+                          f'endpoint="{_escape_label(entry["endpoint"])}",'
+                          f'method="{entry["method"]}"')
+                lines.append(f"{p}_{metric}{{{labels}}} {entry[field]}")
+
+        lines.append(f"# HELP {p}_stage_seconds Wall time spent in each sync stage.")
+        lines.append(f"# TYPE {p}_stage_seconds gauge")
+        for name, stage in report["stages"].items():
+            lines.append(f'{p}_stage_seconds{{stage="{_escape_label(name)}"}} {stage["seconds"]}')
+
+        lines.append(f"# HELP {p}_run_duration_seconds Wall time of the whole run.")
+        lines.append(f"# TYPE {p}_run_duration_seconds gauge")
+        lines.append(f"{p}_run_duration_seconds {report['duration']}")
+        lines.append(f"# HELP {p}_last_run_timestamp_seconds Unix time the run finished.")
+        lines.append(f"# TYPE {p}_last_run_timestamp_seconds gauge")
+        lines.append(f"{p}_last_run_timestamp_seconds {round(time.time())}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = METRICS_DIR, extra: Optional[Dict] = None) -> List[str]:
+        """
+        写出 sync_metrics.json 和 sync_metrics.prom，返回写出的文件路径
+
+        先写临时文件再原子替换，textfile collector不会读到写了一半的文件
+        """
+        report = self.report(extra)
+        os.makedirs(directory, exist_ok=True)
+        outputs = {
+            "sync_metrics.json": json.dumps(report, ensure_ascii=False, indent=2) + "\n",
+            "sync_metrics.prom": self.prometheus_text(report),
+        }
+        paths = []
+        for name, content in outputs.items():
+            path = os.path.join(directory, name)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+    def summary_lines(self) -> List[str]:
+        """运行结束时输出的按域名汇总"""
+        report = self.report()
+        lines = []
+        for host, totals in report["hosts"].items():
+            entries = [e for e in report["requests"] if e["host"] == host]
+            slowest = max(entries, key=lambda e: e["latency_p95"])
+            lines.append(f"请求指标 {host}: {totals['count']} 次 / "
+                         f"上行 {totals['bytes_out'] / 1024:.1f}KB / 下行 {totals['bytes_in'] / 1024:.1f}KB / "
+                         f"累计耗时 {totals['latency_sum']:.1f}s / "
+                         f"p95最慢接口 {slowest['method']} {slowest['endpoint']} "
+                         f"({slowest['latency_p95'] * 1000:.0f}ms)")
+        if report["stages"]:
+            lines.append("阶段耗时: " + " / ".join(f"{name} {stage['seconds']:.1f}s"
+                                                 for name, stage in report["stages"].items()))
+        return lines
+
+metrics = Metrics()
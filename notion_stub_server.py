@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+"""
+本地Notion API替身（离线端到端运行 / 基准测试 / 压测）
+功能：
+✅ 实现本项目用到的Notion API子集，数据全部保存在内存中：
+   - POST /v1/pages、GET / PATCH /v1/pages/{id}
+   - GET /v1/databases/{id}、POST /v1/databases/{id}/query（过滤、排序、真实游标分页）
+   - GET / PATCH /v1/blocks/{id}/children（支持after插入位置）
+   - PATCH / DELETE /v1/blocks/{id}（删除即归档，之后再编辑返回400 archived）
+✅ 按Notion的限制校验请求：每次最多100个子块、单段富文本最多2000字符、
+   单次请求最多两层嵌套、每次请求最多1000个块、请求体最大500KB，错误格式与Notion一致
+✅ 按令牌桶限流（默认平均3次/秒），超出时返回429 + Retry-After
+✅ 首次访问的数据库 / 父页面自动创建（数据库使用本项目的字段结构）
+✅ 可选注入随机延迟，模拟真实API耗时；GET /_stub/stats 查看各接口请求数与429次数
+
+用法：
+    python notion_stub_server.py            # 监听 127.0.0.1:8787
+    NOTION_API_BASE=http://127.0.0.1:8787 NOTION_API_KEY=stub python enhanced_sync.py
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# ============ 配置区 ============
+
+STUB_HOST = os.getenv("NOTION_STUB_HOST", "127.0.0.1")
+STUB_PORT = int(os.getenv("NOTION_STUB_PORT", "8787"))
+# 平均请求速率上限（次/秒）与突发容量，0表示不限流
+STUB_RATE_LIMIT = float(os.getenv("NOTION_STUB_RATE_LIMIT", "3"))
+STUB_BURST = float(os.getenv("NOTION_STUB_BURST", "3"))
+# 每个请求注入的平均延迟（秒），实际延迟在0.5~1.5倍之间随机
+STUB_LATENCY = float(os.getenv("NOTION_STUB_LATENCY", "0"))
+
+# Notion的请求限制
+MAX_CHILDREN = 100
+MAX_RICH_TEXT_LENGTH = 2000
+MAX_RICH_TEXT_ITEMS = 100
+MAX_NESTING_DEPTH = 2
+MAX_BLOCKS_PER_REQUEST = 1000
+MAX_PAYLOAD_BYTES = 500 * 1000
+MAX_PAGE_SIZE = 100
+
+# 自动创建的数据库使用的字段结构（与README中的数据库结构一致）
+DEFAULT_SCHEMA = {
+    "Name": "title",
+    "语言": "select",
+    "原文标题": "rich_text",
+    "摘要": "rich_text",
+    "翻译摘要": "rich_text",
+    "话题ID": "rich_text",
+    "创建时间": "created_time",
+    "状态": "select",
+    "热度": "number",
+    "同步标记": "rich_text",
+}
+
+# ============ 错误 ============
+
+class NotionError(Exception):
+    """以Notion错误格式返回给客户端"""
+
+    def __init__(self, status: int, code: str, message: str, headers: Optional[Dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.headers = headers or {}
+
+    def body(self) -> Dict:
+        return {"object": "error", "status": self.status, "code": self.code, "message": self.message}
+
+def validation_error(message: str) -> NotionError:
+    return NotionError(400, "validation_error", message)
+
+def not_found(object_id: str) -> NotionError:
+    return NotionError(404, "object_not_found",
+                       f"Could not find block with ID: {object_id}. "
+                       "Make sure the relevant pages and databases are shared with your integration.")
+
+# ============ 工具函数 ============
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+def normalize_id(object_id: str) -> str:
+    """Notion ID可带或不带连字符，统一为带连字符的形式"""
+    raw = object_id.replace("-", "")
+    if re.fullmatch(r"[0-9a-fA-F]{32}", raw):
+        return str(uuid.UUID(raw))
+    return object_id
+
+def notion_time() -> str:
+    """Notion的created_time / last_edited_time精度为分钟"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+def parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def normalize_rich_text(items: List[Dict], path: str) -> List[Dict]:
+    """校验富文本长度并补全Notion返回的字段（plain_text、annotations等）"""
+    if not isinstance(items, list):
+        raise validation_error(f"body failed validation: {path} should be an array.")
+    if len(items) > MAX_RICH_TEXT_ITEMS:
+        raise validation_error(f"body failed validation: {path}.length should be ≤ `{MAX_RICH_TEXT_ITEMS}`, "
+                               f"instead was `{len(items)}`.")
+    result = []
+    for i, item in enumerate(items):
+        text = item.get("text") or {}
+        content = text.get("content", "")
+        if len(content) > MAX_RICH_TEXT_LENGTH:
+            raise validation_error(f"body failed validation: {path}[{i}].text.content.length should be "
+                                   f"≤ `{MAX_RICH_TEXT_LENGTH}`, instead was `{len(content)}`.")
+        link = text.get("link")
+        result.append({
+            "type": "text",
+            "text": {"content": content, "link": link},
+            "annotations": {"bold": False, "italic": False, "strikethrough": False, "underline": False,
+                            "code": False, "color": "default", **item.get("annotations", {})},
+            "plain_text": content,
+            "href": (link or {}).get("url"),
+        })
+    return result
+
+def _normalize_block_content(value, path: str):
+    """递归处理块内容中的rich_text / caption字段"""
+    if isinstance(value, dict):
+        return {key: (normalize_rich_text(item, f"{path}.{key}") if key in ("rich_text", "caption")
+                      else _normalize_block_content(item, f"{path}.{key}"))
+                for key, item in value.items()}
+    return value
+
+def check_children(children: List[Dict], path: str = "body.children", depth: int = 0) -> int:
+    """校验子块数量、嵌套深度和富文本长度（写入任何数据之前），返回块总数"""
+    if not isinstance(children, list):
+        raise validation_error(f"body failed validation: {path} should be an array.")
+    if len(children) > MAX_CHILDREN:
+        raise validation_error(f"body failed validation: {path}.length should be ≤ `{MAX_CHILDREN}`, "
+                               f"instead was `{len(children)}`.")
+    total = len(children)
+    for i, block in enumerate(children):
+        block_type = block.get("type") or next((key for key in block if key != "object"), None)
+        content = block.get(block_type) if block_type else None
+        if not isinstance(content, dict):
+            raise validation_error(f"body failed validation: {path}[{i}] should be a block object.")
+        _normalize_block_content({key: value for key, value in content.items() if key != "children"},
+                                 f"{path}[{i}].{block_type}")
+        nested = content.get("children")
+        if nested:
+            if depth + 1 > MAX_NESTING_DEPTH:
+                raise validation_error(f"body failed validation: {path}[{i}].{block_type}.children "
+                                       f"should be not present (maximum nesting depth is {MAX_NESTING_DEPTH}).")
+            total += check_children(nested, f"{path}[{i}].{block_type}.children", depth + 1)
+    return total
+
+# ============ 内存存储 ============
+
+class NotionStore:
+    """页面、数据库、块的内存存储；所有方法在调用方持有锁时执行"""
+
+    def __init__(self):
+        self.databases: Dict[str, Dict] = {}
+        self.pages: Dict[str, Dict] = {}
+        self.blocks: Dict[str, Dict] = {}
+        self.children: Dict[str, List[str]] = {}
+
+    # ---------- 数据库 ----------
+
+    def database(self, database_id: str) -> Dict:
+        database_id = normalize_id(database_id)
+        if database_id not in self.databases:
+            now = notion_time()
+            self.databases[database_id] = {
+                "object": "database",
+                "id": database_id,
+                "created_time": now,
+                "last_edited_time": now,
+                "title": [],
+                "archived": False,
+                "properties": {name: {"id": name, "name": name, "type": prop_type, prop_type: {}}
+                               for name, prop_type in DEFAULT_SCHEMA.items()},
+            }
+        return self.databases[database_id]
+
+    def query(self, database_id: str, body: Dict) -> Dict:
+        database = self.database(database_id)
+        page_size = body.get("page_size", MAX_PAGE_SIZE)
+        if not isinstance(page_size, int) or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise validation_error(f"body failed validation: body.page_size should be ≤ `{MAX_PAGE_SIZE}`.")
+
+        results = [page for page in self.pages.values()
+                   if page["parent"].get("database_id") == database["id"] and not page["archived"]
+                   and self._match(page, body.get("filter"))]
+        for sort in reversed(body.get("sorts") or [{"timestamp": "created_time", "direction": "descending"}]):
+            results.sort(key=lambda page: self._sort_key(page, sort),
+                         reverse=sort.get("direction") == "descending")
+        return self._paginate(results, body.get("start_cursor"), page_size)
+
+    def _match(self, page: Dict, condition: Optional[Dict]) -> bool:
+        if not condition:
+            return True
+        if "and" in condition:
+            return all(self._match(page, c) for c in condition["and"])
+        if "or" in condition:
+            return any(self._match(page, c) for c in condition["or"])
+        if "timestamp" in condition:
+            value = parse_time(page[condition["timestamp"]])
+            return self._compare(value, condition[condition["timestamp"]], parse_time)
+
+        prop = page["properties"].get(condition.get("property"))
+        if prop is None:
+            raise validation_error(f"Could not find property with name or id: {condition.get('property')}")
+        for prop_type in ("title", "rich_text"):
+            if prop_type in condition:
+                text = "".join(part["plain_text"] for part in prop.get(prop["type"], []))
+                return self._compare_text(text, condition[prop_type])
+        if "select" in condition:
+            name = (prop.get("select") or {}).get("name")
+            if "equals" in condition["select"]:
+                return name == condition["select"]["equals"]
+            return (name is None) == bool(condition["select"].get("is_empty"))
+        if "number" in condition:
+            return self._compare(prop.get("number"), condition["number"], float)
+        raise validation_error(f"body failed validation: unsupported filter {json.dumps(condition)}")
+
+    @staticmethod
+    def _compare_text(text: str, rule: Dict) -> bool:
+        if "equals" in rule:
+            return text == rule["equals"]
+        if "contains" in rule:
+            return rule["contains"] in text
+        if "is_empty" in rule:
+            return not text
+        if "is_not_empty" in rule:
+            return bool(text)
+        raise validation_error(f"body failed validation: unsupported text filter {json.dumps(rule)}")
+
+    @staticmethod
+    def _compare(value, rule: Dict, convert) -> bool:
+        if value is None:
+            return bool(rule.get("is_empty"))
+        ops = {
+            "equals": lambda a, b: a == b,
+            "after": lambda a, b: a > b, "greater_than": lambda a, b: a > b,
+            "before": lambda a, b: a < b, "less_than": lambda a, b: a < b,
+            "on_or_after": lambda a, b: a >= b, "greater_than_or_equal_to": lambda a, b: a >= b,
+            "on_or_before": lambda a, b: a <= b, "less_than_or_equal_to": lambda a, b: a <= b,
+        }
+        for op, target in rule.items():
+            if op in ops:
+                return ops[op](value, convert(target))
+        raise validation_error(f"body failed validation: unsupported filter {json.dumps(rule)}")
+
+    @staticmethod
+    def _sort_key(page: Dict, sort: Dict):
+        if "timestamp" in sort:
+            return page[sort["timestamp"]]
+        prop = page["properties"].get(sort.get("property"), {})
+        value = prop.get(prop.get("type"))
+        if isinstance(value, list):
+            return "".join(part["plain_text"] for part in value)
+        if isinstance(value, dict):
+            return value.get("name") or ""
+        return value if value is not None else ""
+
+    def _paginate(self, items: List[Dict], start_cursor: Optional[str], page_size: int) -> Dict:
+        """游标为下一页第一个对象的ID"""
+        start = 0
+        if start_cursor:
+            ids = [item["id"] for item in items]
+            if start_cursor not in ids:
+                raise validation_error(f"The start_cursor provided is invalid: {start_cursor}")
+            start = ids.index(start_cursor)
+        chunk = items[start:start + page_size]
+        has_more = start + page_size < len(items)
+        return {
+            "object": "list",
+            "results": chunk,
+            "next_cursor": items[start + page_size]["id"] if has_more else None,
+            "has_more": has_more,
+            "type": "page_or_database" if items and items[0]["object"] == "page" else "block",
+        }
+
+    # ---------- 页面 ----------
+
+    def _normalize_properties(self, properties: Dict, schema: Optional[Dict]) -> Dict:
+        result = {}
+        for name, value in properties.items():
+            if schema is not None and name not in schema:
+                raise validation_error(f"{name} is not a property that exists.")
+            prop_type = schema[name]["type"] if schema is not None else next(iter(value), "title")
+            if prop_type not in value:
+                raise validation_error(f"{name} is expected to be {prop_type}.")
+            if prop_type in ("title", "rich_text"):
+                content = normalize_rich_text(value[prop_type], f"body.properties.{name}.{prop_type}")
+            elif prop_type == "select":
+                content = dict(value["select"], color="default") if value["select"] else None
+            else:
+                content = value[prop_type]
+            result[name] = {"id": name, "type": prop_type, prop_type: content}
+        return result
+
+    def create_page(self, body: Dict) -> Dict:
+        parent = body.get("parent") or {}
+        children = body.get("children") or []
+        check_children(children)
+        schema = None
+        if "database_id" in parent:
+            database = self.database(parent["database_id"])
+            schema = database["properties"]
+            parent = {"type": "database_id", "database_id": database["id"]}
+        elif "page_id" in parent:
+            parent = {"type": "page_id", "page_id": self.page_or_block(parent["page_id"])["id"]}
+        else:
+            raise validation_error("body failed validation: body.parent should be defined.")
+
+        now = notion_time()
+        page_id = new_id()
+        properties = self._normalize_properties(body.get("properties") or {}, schema)
+        if schema is not None:
+            for name, prop in schema.items():
+                if prop["type"] == "created_time":
+                    properties[name] = {"id": name, "type": "created_time", "created_time": now}
+                elif name not in properties:
+                    properties[name] = {"id": name, "type": prop["type"],
+                                        prop["type"]: [] if prop["type"] in ("title", "rich_text") else None}
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "parent": parent,
+            "properties": properties,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        }
+        self.pages[page_id] = page
+        self.append_children(page_id, children)
+        return page
+
+    def update_page(self, page_id: str, body: Dict) -> Dict:
+        page = self.page(page_id)
+        if "archived" in body:
+            page["archived"] = bool(body["archived"])
+        elif page["archived"]:
+            raise validation_error("Can't edit page that is archived. You must unarchive the page before editing.")
+        schema = None
+        if page["parent"].get("database_id"):
+            schema = self.database(page["parent"]["database_id"])["properties"]
+        page["properties"].update(self._normalize_properties(body.get("properties") or {}, schema))
+        page["last_edited_time"] = notion_time()
+        return page
+
+    def page(self, page_id: str) -> Dict:
+        page = self.pages.get(normalize_id(page_id))
+        if page is None:
+            raise not_found(page_id)
+        return page
+
+    def page_or_block(self, object_id: str, create: bool = False) -> Dict:
+        """
+        查找页面或块
+
+        create=True时，未知ID视为已存在的空页面（例如首次运行时的父页面）
+        """
+        object_id = normalize_id(object_id)
+        if object_id in self.pages:
+            return self.pages[object_id]
+        if object_id in self.blocks:
+            return self.blocks[object_id]
+        if not create:
+            raise not_found(object_id)
+        now = notion_time()
+        page = {"object": "page", "id": object_id, "created_time": now, "last_edited_time": now,
+                "archived": False, "parent": {"type": "workspace", "workspace": True},
+                "properties": {}, "url": f"https://www.notion.so/{object_id.replace('-', '')}"}
+        self.pages[object_id] = page
+        return page
+
+    # ---------- 块 ----------
+
+    def append_children(self, parent_id: str, children: List[Dict], after: Optional[str] = None) -> List[Dict]:
+        parent = self.page_or_block(parent_id, create=True)
+        if parent["archived"]:
+            raise validation_error("Can't edit block that is archived. You must unarchive the block before editing.")
+        siblings = self.children.setdefault(parent["id"], [])
+        position = len(siblings)
+        if after:
+            after = normalize_id(after)
+            if after not in siblings:
+                raise validation_error(f"body failed validation: body.after should be a child of {parent['id']}.")
+            position = siblings.index(after) + 1
+
+        created = []
+        for block in children:
+            block_type = block.get("type") or next(key for key in block if key != "object")
+            content = dict(block[block_type])
+            nested = content.pop("children", None) or []
+            now = notion_time()
+            stored = {
+                "object": "block",
+                "id": new_id(),
+                "parent": ({"type": "page_id", "page_id": parent["id"]} if parent["object"] == "page"
+                           else {"type": "block_id", "block_id": parent["id"]}),
+                "created_time": now,
+                "last_edited_time": now,
+                "has_children": bool(nested),
+                "archived": False,
+                "type": block_type,
+                block_type: _normalize_block_content(content, f"body.children.{block_type}"),
+            }
+            self.blocks[stored["id"]] = stored
+            siblings.insert(position, stored["id"])
+            position += 1
+            if nested:
+                self.append_children(stored["id"], nested)
+            created.append(stored)
+        if parent["object"] == "block" and created:
+            parent["has_children"] = True
+        parent["last_edited_time"] = notion_time()
+        return created
+
+    def list_children(self, parent_id: str, start_cursor: Optional[str], page_size: int) -> Dict:
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise validation_error(f"page_size should be ≤ `{MAX_PAGE_SIZE}`.")
+        parent = self.page_or_block(parent_id, create=True)
+        blocks = [self.blocks[block_id] for block_id in self.children.get(parent["id"], [])
+                  if not self.blocks[block_id]["archived"]]
+        result = self._paginate(blocks, start_cursor, page_size)
+        result["type"] = "block"
+        return result
+
+    def update_block(self, block_id: str, body: Dict) -> Dict:
+        block = self.page_or_block(block_id)
+        if block["object"] == "page":
+            return self.update_page(block_id, body)
+        if "archived" in body:
+            block["archived"] = bool(body["archived"])
+        elif block["archived"]:
+            raise validation_error("Can't edit block that is archived. You must unarchive the block before editing.")
+        content = body.get(block["type"])
+        if content is not None:
+            if "children" in content:
+                raise validation_error(f"body failed validation: body.{block['type']}.children should be not present.")
+            block[block["type"]].update(_normalize_block_content(content, f"body.{block['type']}"))
+        block["last_edited_time"] = notion_time()
+        return block
+
+    def delete_block(self, block_id: str) -> Dict:
+        """删除即归档（页面同样适用）"""
+        block = self.page_or_block(block_id)
+        if block["archived"]:
+            raise validation_error("Can't edit block that is archived. You must unarchive the block before editing.")
+        block["archived"] = True
+        block["last_edited_time"] = notion_time()
+        return block
+
+# ============ 限流 ============
+
+class RateLimiter:
+    """令牌桶；取不到令牌时返回需要等待的秒数"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> Optional[float]:
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+# ============ HTTP服务 ============
+
+class NotionStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], rate_limit: float = STUB_RATE_LIMIT,
+                 burst: float = STUB_BURST, latency: float = STUB_LATENCY):
+        super().__init__(address, NotionStubHandler)
+        self.store = NotionStore()
+        self.limiter = RateLimiter(rate_limit, burst)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.throttled = 0
+
+def _route_pattern(endpoint: str) -> "re.Pattern":
+    return re.compile("^" + endpoint.replace("{id}", r"([\w-]+)") + "$")
+
+class NotionStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: NotionStubServer
+
+    # (方法, 接口, 处理函数)；接口中的{id}匹配页面 / 块 / 数据库ID
+    ROUTES = [
+        ("POST", "/v1/pages", "create_page"),
+        ("GET", "/v1/pages/{id}", "get_page"),
+        ("PATCH", "/v1/pages/{id}", "update_page"),
+        ("GET", "/v1/databases/{id}", "get_database"),
+        ("POST", "/v1/databases/{id}/query", "query_database"),
+        ("GET", "/v1/blocks/{id}/children", "list_children"),
+        ("PATCH", "/v1/blocks/{id}/children", "append_children"),
+        ("GET", "/v1/blocks/{id}", "get_block"),
+        ("PATCH", "/v1/blocks/{id}", "update_block"),
+        ("DELETE", "/v1/blocks/{id}", "delete_block"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_PAYLOAD_BYTES:
+            self.rfile.read(length)
+            raise NotionError(413, "payload_too_large",
+                              f"Request body too large: {length} bytes (maximum {MAX_PAYLOAD_BYTES}).")
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            raise NotionError(400, "invalid_json", "Error parsing JSON body.")
+
+    def dispatch(self, method: str):
+        url = urlsplit(self.path)
+        try:
+            body = self.read_body() if method in ("POST", "PATCH") else {}
+            if url.path.startswith("/_stub/"):
+                return self.send_json(200, self.stub_endpoint(url.path))
+
+            for route_method, endpoint, handler in self.ROUTES:
+                match = _route_pattern(endpoint).match(url.path)
+                if match and route_method == method:
+                    break
+            else:
+                raise NotionError(400, "invalid_request_url", f"Invalid request URL: {method} {url.path}")
+
+            with self.server.lock:
+                key = f"{method} {endpoint}"
+                self.server.counts[key] = self.server.counts.get(key, 0) + 1
+            self.check_headers()
+            retry_after = self.server.limiter.try_acquire()
+            if retry_after is not None:
+                with self.server.lock:
+                    self.server.throttled += 1
+                raise NotionError(429, "rate_limited",
+                                  "You have been rate limited. Please try again in a few minutes.",
+                                  headers={"Retry-After": str(max(1, round(retry_after)))})
+            if self.server.latency:
+                time.sleep(self.server.latency * random.uniform(0.5, 1.5))
+
+            with self.server.lock:
+                result = getattr(self, handler)(match.group(1) if match.groups() else None,
+                                                body, parse_qs(url.query))
+            self.send_json(200, result)
+        except NotionError as e:
+            self.send_json(e.status, e.body(), e.headers)
+
+    def check_headers(self):
+        if not (self.headers.get("Authorization") or "").startswith("Bearer ") \
+                or not self.headers["Authorization"][len("Bearer "):].strip():
+            raise NotionError(401, "unauthorized", "API token is invalid.")
+        if not self.headers.get("Notion-Version"):
+            raise NotionError(400, "missing_version", "Notion-Version header failed validation: "
+                                                      "Notion-Version header should be defined.")
+
+    def stub_endpoint(self, path: str) -> Dict:
+        """替身自身的管理接口（不限流、不鉴权）"""
+        with self.server.lock:
+            if path == "/_stub/stats":
+                store = self.server.store
+                return {"requests": dict(self.server.counts), "throttled": self.server.throttled,
+                        "pages": len(store.pages), "blocks": len(store.blocks)}
+            if path == "/_stub/reset":
+                self.server.store = NotionStore()
+                self.server.counts.clear()
+                self.server.throttled = 0
+                return {"reset": True}
+        raise NotionError(404, "object_not_found", f"Unknown stub endpoint: {path}")
+
+    # ---------- 路由处理（持有server.lock时调用） ----------
+
+    def create_page(self, _, body: Dict, query: Dict) -> Dict:
+        self.check_block_count(body.get("children") or [])
+        return self.server.store.create_page(body)
+
+    def get_page(self, page_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.page(page_id)
+
+    def update_page(self, page_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.update_page(page_id, body)
+
+    def get_database(self, database_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.database(database_id)
+
+    def query_database(self, database_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.query(database_id, body)
+
+    def list_children(self, block_id: str, body: Dict, query: Dict) -> Dict:
+        page_size = int((query.get("page_size") or [MAX_PAGE_SIZE])[0])
+        start_cursor = (query.get("start_cursor") or [None])[0]
+        return self.server.store.list_children(block_id, start_cursor, page_size)
+
+    def append_children(self, block_id: str, body: Dict, query: Dict) -> Dict:
+        children = body.get("children")
+        if children is None:
+            raise validation_error("body failed validation: body.children should be defined.")
+        self.check_block_count(children)
+        created = self.server.store.append_children(block_id, children, body.get("after"))
+        return {"object": "list", "results": created, "next_cursor": None, "has_more": False,
+                "type": "block"}
+
+    def get_block(self, block_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.page_or_block(block_id)
+
+    def update_block(self, block_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.update_block(block_id, body)
+
+    def delete_block(self, block_id: str, body: Dict, query: Dict) -> Dict:
+        return self.server.store.delete_block(block_id)
+
+    @staticmethod
+    def check_block_count(children: List[Dict]):
+        total = check_children(children)
+        if total > MAX_BLOCKS_PER_REQUEST:
+            raise validation_error(f"body failed validation: a request may contain at most "
+                                   f"{MAX_BLOCKS_PER_REQUEST} blocks, instead was {total}.")
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else STUB_PORT
+    server = NotionStubServer((STUB_HOST, port))
+    rate = f"限流 {STUB_RATE_LIMIT:g} 次/秒" if STUB_RATE_LIMIT > 0 else "不限流"
+    print(f"🧪 Notion API替身已启动: http://{STUB_HOST}:{port} ({rate}，延迟 {STUB_LATENCY:g} 秒)")
+    print(f"   使用方法: NOTION_API_BASE=http://{STUB_HOST}:{port} NOTION_API_KEY=stub python enhanced_sync.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️  已停止")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+多阶段流水线
+功能：
+✅ 各阶段之间是有界队列，下游处理不过来时上游阻塞（背压），内存占用有上限
+✅ 每个阶段独立设置并发线程数
+✅ 阶段函数通过emit向下游输出0个或多个结果，最后一个阶段的输出作为流水线结果
+✅ 统计每个阶段的处理数、忙碌 / 空闲 / 背压阻塞时间，用于定位真正的瓶颈
+
+用法：
+    pipeline = Pipeline(queue_size=8)
+    pipeline.add_stage("fetch", fetch_func, workers=8)
+    pipeline.add_stage("write", write_func, workers=3)
+    results = pipeline.run(inputs)
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 阶段之间队列的容量
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+_DONE = object()
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name: str, func: Callable[[Any, Callable[[Any], None]], None],
+                 workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+        self.items = 0
+        self.errors = 0
+        self.first_error: Optional[Exception] = None
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _add(self, busy: float = 0.0, idle: float = 0.0, blocked: float = 0.0,
+             items: int = 0, error: Optional[Exception] = None):
+        with self._lock:
+            self.busy_seconds += busy
+            self.idle_seconds += idle
+            self.blocked_seconds += blocked
+            self.items += items
+            if error is not None:
+                self.errors += 1
+                self.first_error = self.first_error or error
+
+class Pipeline:
+    """由有界队列串联的多阶段流水线"""
+
+    def __init__(self, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages: List[Stage] = []
+        self.wall_seconds = 0.0
+
+    def add_stage(self, name: str, func: Callable[[Any, Callable[[Any], None]], None],
+                  workers: int = 1) -> Stage:
+        """func(item, emit)：处理一个输入，调用emit(结果)向下游输出"""
+        stage = Stage(name, func, workers)
+        self.stages.append(stage)
+        return stage
+
+    def run(self, inputs: Iterable[Any]) -> List[Any]:
+        """运行流水线直到所有输入处理完毕，返回最后一个阶段输出的结果（完成顺序）"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = []
+        results_lock = threading.Lock()
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        started = time.monotonic()
+
+        def worker(index: int):
+            stage = self.stages[index]
+            in_queue = queues[index]
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+
+            # 本线程向下游阻塞等待的累计时间：阶段的blocked_seconds是所有线程的总和，
+            # 忙碌时间只能扣减本线程自己的阻塞时间
+            blocked = 0.0
+
+            def emit(value):
+                nonlocal blocked
+                if out_queue is None:
+                    with results_lock:
+                        results.append(value)
+                    return
+                wait_start = time.monotonic()
+                out_queue.put(value)
+                waited = time.monotonic() - wait_start
+                blocked += waited
+                stage._add(blocked=waited)
+
+            while True:
+                wait_start = time.monotonic()
+                item = in_queue.get()
+                stage._add(idle=time.monotonic() - wait_start)
+                if item is _DONE:
+                    break
+
+                work_start = time.monotonic()
+                blocked_before = blocked
+                error = None
+                try:
+                    stage.func(item, emit)
+                except Exception as e:
+                    # 阶段函数应自行处理错误，这里兜底，丢弃该条目
+                    error = e
+                # 忙碌时间不含向下游阻塞等待的时间
+                elapsed = time.monotonic() - work_start
+                stage._add(busy=elapsed - (blocked - blocked_before),
+                           items=1, error=error)
+
+            # 本阶段最后一个退出的线程通知下游阶段的所有线程
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and out_queue is not None:
+                for _ in range(self.stages[index + 1].workers):
+                    out_queue.put(_DONE)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=worker, args=(index,), daemon=True,
+                                          name=f"pipeline-{stage.name}-{n}")
+                thread.start()
+                threads.append(thread)
+
+        for item in inputs:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.monotonic() - started
+        return results
+
+    def stats(self) -> List[Dict]:
+        result = []
+        for stage in self.stages:
+            capacity = stage.workers * self.wall_seconds
+            result.append({
+                "name": stage.name,
+                "workers": stage.workers,
+                "items": stage.items,
+                "errors": stage.errors,
+                "busy": stage.busy_seconds,
+                "idle": stage.idle_seconds,
+                "blocked": stage.blocked_seconds,
+                "utilization": (stage.busy_seconds / capacity) if capacity else 0.0,
+            })
+        return result
+
+    def stats_lines(self) -> List[str]:
+        lines = [f"流水线总耗时 {self.wall_seconds:.1f} 秒（队列容量 {self.queue_size}）"]
+        for s in self.stats():
+            lines.append(f"  阶段 {s['name']}: {s['items']} 条 / 线程 {s['workers']} / "
+                         f"忙碌 {s['busy']:.1f}s / 空闲 {s['idle']:.1f}s / "
+                         f"背压阻塞 {s['blocked']:.1f}s / 利用率 {s['utilization']:.0%}"
+                         + (f" / 异常 {s['errors']}" if s['errors'] else ""))
+        return lines
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+性能剖析模式（--profile 或 SYNC_PROFILE=1）
+功能：
+✅ cProfile覆盖主线程和运行期间新建的所有线程（线程池、流水线），合并输出 sync.prof
+   （Python 3.12+ 的cProfile本身覆盖所有线程，不再逐线程启用）
+✅ 后台采样线程定时抓取所有线程的调用栈，输出火焰图可用的折叠栈文件 sync.collapsed
+   （flamegraph.pl / speedscope 可直接打开）
+✅ 按函数统计墙钟时间与CPU时间（包含子调用），并把墙钟时间拆分为：
+   CPU运行 / 阻塞在网络 / time.sleep / 等待其他线程（队列、Future、Event） /
+   其他阻塞（磁盘I/O、fsync、锁竞争、等待GIL）
+✅ 区分限流等待、退避等"节奏控制"开销与真正的计算和网络耗时，判断加并发是否有效
+
+不能与内存追踪（SYNC_MEMORY_TRACE=1）同时使用：tracemalloc记录每次分配的调用栈，
+会让运行慢一个数量级，采样线程也几乎拿不到GIL，剖析结果没有参考价值
+
+用法：
+    python enhanced_sync.py --profile
+    with Profiler(log=print):
+        main()
+"""
+
+import cProfile
+import linecache
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ============ 配置区 ============
+
+PROFILE_ENABLED = os.getenv("SYNC_PROFILE", "0") == "1" or "--profile" in sys.argv
+# 输出目录：sync.prof / sync.collapsed / sync_profile.txt
+PROFILE_DIR = os.getenv("SYNC_PROFILE_DIR", "profile")
+# 采样间隔（秒）
+PROFILE_INTERVAL = float(os.getenv("SYNC_PROFILE_INTERVAL", "0.01"))
+# 汇总中列出的函数个数
+PROFILE_TOP = 40
+
+CATEGORIES = ("running", "network", "sleep", "waiting", "blocked")
+CATEGORY_NAMES = {"running": "CPU运行", "network": "网络阻塞", "sleep": "sleep",
+                  "waiting": "等待线程", "blocked": "其他阻塞"}
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_NETWORK_FILES = ("socket.py", "ssl.py", "selectors.py")
+_WAITING_FILES = ("threading.py", "queue.py", os.path.join("concurrent", "futures", "_base.py"))
+_THREAD_SUFFIX_RE = re.compile(r"[-_]\d+$")
+# Python 3.12起cProfile基于sys.monitoring，对整个进程生效：一个Profile已覆盖所有线程，
+# 且同时只能启用一个（再启用会抛出ValueError），因此只在旧版本上为每个线程单独启用
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+FrameKey = Tuple[str, str, int]  # (函数名, 文件, 首行号)
+
+def _frame_key(frame) -> FrameKey:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+def _frame_label(key: FrameKey) -> str:
+    name, filename, line = key
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def classify(frame, cpu_ratio: Optional[float] = None) -> str:
+    """
+    按最内层Python栈帧判断线程当前在做什么
+
+    阻塞中的线程停在调用C函数的那一行（socket.recv_into、time.sleep、lock.acquire），
+    因此按所在文件和该行源码判断；其余情况按采样间隔内该线程实际使用的CPU比例
+    区分真正在运行还是阻塞在其他调用上（cpu_ratio未知时视为运行）
+    """
+    filename = frame.f_code.co_filename
+    if filename.endswith(_NETWORK_FILES):
+        return "network"
+    if "sleep(" in linecache.getline(filename, frame.f_lineno):
+        return "sleep"
+    if filename.endswith(_WAITING_FILES):
+        return "waiting"
+    if cpu_ratio is not None and cpu_ratio < 0.5:
+        return "blocked"
+    return "running"
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    """线程累计CPU时间（只在支持pthread_getcpuclockid的平台可用）"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+class Profiler:
+    """剖析一段代码的执行：cProfile + 调用栈采样，退出时写出结果"""
+
+    def __init__(self, directory: str = PROFILE_DIR, interval: float = PROFILE_INTERVAL,
+                 log: Callable[[str], None] = print):
+        self.directory = directory
+        self.interval = interval
+        self.log = log
+        self.samples = 0
+        self.wall_seconds = 0.0
+        self._profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._stacks: Dict[str, float] = defaultdict(float)
+        self._functions: Dict[FrameKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._categories: Dict[str, float] = defaultdict(float)
+        self._cpu_seen: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    # ============ cProfile ============
+
+    def _thread_hook(self, *args):
+        # 新线程的第一个事件：为该线程启用独立的cProfile（会替换掉这个钩子）
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 已有其他剖析工具启用：放弃剖析该线程，不能影响线程本身的执行
+            sys.setprofile(None)
+            return
+        self._thread_profiles.append(profile)
+
+    # ============ 采样 ============
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self._record_sample(ident, names.get(ident, "thread"), frame, elapsed)
+            self.samples += 1
+
+    def _record_sample(self, ident: int, thread_name: str, frame, elapsed: float):
+        cpu_delta = 0.0
+        cpu_ratio = None
+        cpu = _thread_cpu_time(ident)
+        if cpu is not None:
+            if ident in self._cpu_seen:
+                cpu_delta = max(0.0, cpu - self._cpu_seen[ident])
+                cpu_ratio = cpu_delta / elapsed if elapsed else None
+            self._cpu_seen[ident] = cpu
+        category = classify(frame, cpu_ratio)
+
+        keys = []
+        while frame is not None:
+            keys.append(_frame_key(frame))
+            frame = frame.f_back
+        keys.reverse()
+
+        # 线程池中的线程按名字前缀合并（pipeline-详情-3 → pipeline-详情）
+        root = _THREAD_SUFFIX_RE.sub("", thread_name)
+        stack = ";".join([root] + [_frame_label(key) for key in keys] + [f"[{CATEGORY_NAMES[category]}]"])
+        self._stacks[stack] += elapsed
+        self._categories[category] += elapsed
+
+        # 包含子调用的时间，递归调用只计一次
+        for key in set(keys):
+            stats = self._functions[key]
+            stats["wall"] += elapsed
+            stats["cpu"] += cpu_delta
+            stats[category] += elapsed
+
+    # ============ 开始 / 结束 ============
+
+    def __enter__(self) -> "Profiler":
+        os.makedirs(self.directory, exist_ok=True)
+        self._started = time.monotonic()
+        # 采样线程先启动，不受cProfile影响
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+        if _PER_THREAD_PROFILES:
+            threading.setprofile(self._thread_hook)
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.disable()
+        if _PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        self._stop.set()
+        self._sampler.join()
+        self.wall_seconds = time.monotonic() - self._started
+        try:
+            for path in self.write():
+                self.log(f"性能剖析结果已写入: {path}")
+            for line in self.summary_lines(limit=10):
+                self.log(line)
+        except OSError as e:
+            self.log(f"写入性能剖析结果失败: {e}")
+        return False
+
+    # ============ 输出 ============
+
+    def write(self) -> List[str]:
+        prof_path = os.path.join(self.directory, "sync.prof")
+        stats = pstats.Stats(self._profile)
+        for profile in self._thread_profiles:
+            try:
+                stats.add(profile)
+            except (TypeError, ValueError):
+                # 还没有记录到任何调用的线程
+                continue
+        stats.dump_stats(prof_path)
+
+        collapsed_path = os.path.join(self.directory, "sync.collapsed")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(self._stacks.items()):
+                # 折叠栈格式：以分号分隔的栈 + 空格 + 权重（毫秒）
+                weight = int(round(seconds * 1000))
+                if weight:
+                    f.write(f"{stack} {weight}\n")
+
+        summary_path = os.path.join(self.directory, "sync_profile.txt")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.summary_lines(limit=PROFILE_TOP)) + "\n")
+        return [prof_path, collapsed_path, summary_path]
+
+    def summary_lines(self, limit: int = PROFILE_TOP) -> List[str]:
+        """墙钟 / CPU时间汇总；时间为各线程累加（线程·秒）"""
+        total = sum(self._categories.values())
+        lines = [f"性能剖析: 墙钟 {self.wall_seconds:.1f} 秒 / 采样 {self.samples} 次 "
+                 f"(间隔 {self.interval * 1000:.0f}ms) / 线程累计 {total:.1f} 线程·秒"]
+        if total:
+            lines.append("  时间分布: " + " / ".join(
+                f"{CATEGORY_NAMES[c]} {self._categories[c]:.1f}s ({self._categories[c] / total:.0%})"
+                for c in CATEGORIES))
+
+        # 只列出本项目的函数（库函数的时间已包含在调用它们的项目函数中）
+        project = [(key, stats) for key, stats in self._functions.items()
+                   if key[1].startswith(_PROJECT_DIR) and key[0] != "<module>"]
+        project.sort(key=lambda item: item[1]["wall"], reverse=True)
+        if project:
+            lines.append(f"  {'函数':<48} {'墙钟':>8} {'CPU':>8} {'网络':>8} {'sleep':>8} "
+                         f"{'等待':>8} {'其他阻塞':>8}")
+        for key, stats in project[:limit]:
+            lines.append(f"  {_frame_label(key):<48} {stats['wall']:>7.1f}s {stats['cpu']:>7.1f}s "
+                         f"{stats['network']:>7.1f}s {stats['sleep']:>7.1f}s {stats['waiting']:>7.1f}s "
+                         f"{stats['blocked']:>7.1f}s")
+        return lines
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+按域名的令牌桶限流器
+功能：
+✅ 令牌桶平滑限速（Notion默认约3次/秒）
+✅ 遵守429响应的Retry-After头
+✅ 被限流时乘性降速，之后逐次成功加性恢复（AIMD）
+✅ 统计等待时间和被限流次数
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# 被限流时速率乘以该系数
+DECREASE_FACTOR = 0.5
+# 每次成功请求后速率增加量（次/秒）
+RECOVERY_STEP = 0.05
+# 没有Retry-After头时的默认等待秒数
+DEFAULT_RETRY_AFTER = 1.0
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """解析Retry-After头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+
+    rate: 目标速率（次/秒），也是恢复的上限
+    burst: 桶容量，允许的瞬时突发请求数
+    min_rate: 降速的下限
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.wait_seconds = 0.0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def acquire(self) -> float:
+        """取一个令牌，必要时阻塞等待；返回本次等待的秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.wait_seconds += waited
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_throttled(self, retry_after: float):
+        """收到429：暂停到Retry-After之后，并乘性降速"""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled_count += 1
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.tokens = 0.0
+            self.updated = now
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+
+    def on_success(self):
+        """请求成功：加性恢复速率，直到目标速率"""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RECOVERY_STEP)
+
+    def stats(self) -> Dict:
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "wait_seconds": self.wait_seconds,
+            "throttled": self.throttled_count,
+        }
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+重试策略与按域名熔断器
+功能：
+✅ 区分可重试错误（超时、断连、502/503/504等）与不可重试错误（4xx）
+✅ 指数退避 + 全抖动（full jitter），单次调用有总时间预算
+✅ 按域名熔断：连续失败达到阈值后熔断，冷却期内直接快速失败，
+   冷却后放行一次试探请求，成功则恢复
+✅ 统计重试次数、熔断次数、快速失败次数
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+# 可重试的HTTP状态码（429由限流器单独处理）
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    """熔断中，请求未发送"""
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS
+
+def is_retryable_error(e: Exception, idempotent: bool) -> bool:
+    """
+    判断网络异常是否可重试
+
+    非幂等请求（创建页面、追加子块）只在连接建立失败（请求肯定没有发出）时重试，
+    读超时等结果不确定的情况交给调用方处理。
+    """
+    if isinstance(e, CircuitOpenError):
+        return False
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    if idempotent:
+        return isinstance(e, (requests.Timeout, requests.ConnectionError))
+    return False
+
+class RetryPolicy:
+    """
+    指数退避重试策略
+
+    max_retries: 最多重试次数（不含首次请求）
+    base_delay / max_delay: 第n次重试前等待 random(0, min(max_delay, base_delay * 2^n)) 秒
+    budget: 单次调用（含所有重试与等待）的总时间预算（秒）
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, budget: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """第retry次重试（从0开始）前的等待秒数；服务端给了Retry-After时不少于该值"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_delay(self, retry: int, started: float,
+                   retry_after: Optional[float] = None) -> Optional[float]:
+        """返回下次重试前的等待秒数，超过次数或时间预算时返回None"""
+        if retry >= self.max_retries:
+            return None
+        delay = self.backoff(retry, retry_after)
+        if time.monotonic() - started + delay > self.budget:
+            return None
+        return delay
+
+class CircuitBreaker:
+    """
+    按域名的熔断器
+
+    closed: 正常放行
+    open: 连续失败达到threshold后熔断，cooldown秒内的请求直接失败
+    half_open: 冷却结束后只放行一个试探请求，成功则closed，失败则重新open
+
+    before_request放行后，调用方必须以on_success或on_failure结束该请求（任何异常都算失败），
+    否则试探名额不会释放
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.fast_failures = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """请求前检查，熔断中时抛出CircuitOpenError"""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.fast_failures += 1
+        raise CircuitOpenError("服务暂时不可用（熔断中），请求未发送")
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self._probing = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self._probing = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "fast_failures": self.fast_failures,
+        }
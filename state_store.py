@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+本地状态目录（缓存、索引等跨运行持久化的数据）
+
+默认位于 ./.sync_state，可通过 SYNC_STATE_DIR 修改。
+GitHub Actions 中通过 actions/cache 在多次运行之间保留。
+"""
+
+import os
+import sqlite3
+
+STATE_DIR = os.getenv("SYNC_STATE_DIR", ".sync_state")
+
+def state_path(name: str) -> str:
+    """返回状态目录下的文件路径（目录不存在时自动创建）"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
+
+def open_sqlite(name: str) -> sqlite3.Connection:
+    """
+    打开状态目录下的SQLite数据库
+
+    - 自动提交模式，调用方无需显式commit
+    - WAL日志，写入中断不会损坏数据库
+    - 允许跨线程使用，调用方需自行加锁串行化访问
+    """
+    conn = sqlite3.connect(state_path(name), timeout=30,
+                           check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
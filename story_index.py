@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Notion话题数据库本地镜像（SQLite）
+功能：
+✅ 记录 story_id → page_id、语言、内容哈希、页面属性、last_edited_time、last_synced
+✅ 按last_edited_time增量刷新：只查询上次同步之后编辑过的页面
+✅ 显式全量重同步（分页游标正确传递），并清理已不存在的页面；
+   增量查询看不到已归档/删除的页面，超过FULL_RESYNC_MAX_AGE未全量同步时自动全量同步
+✅ 内容块树规范化序列化后计算哈希，内容未变时跳过所有Notion写入
+✅ 去重/查找页面都在本地完成，不消耗API请求
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from state_store import open_sqlite
+
+# 全量重同步：环境变量 NOTION_FULL_RESYNC=1 或命令行参数 --full-resync
+FULL_RESYNC = os.getenv("NOTION_FULL_RESYNC", "0") == "1" or "--full-resync" in sys.argv
+# 距上次全量同步超过该时间（秒）时自动全量同步，清理在Notion中归档/删除的页面
+FULL_RESYNC_MAX_AGE = float(os.getenv("NOTION_FULL_RESYNC_MAX_AGE", str(12 * 3600)))
+
+# Notion的last_edited_time精度为分钟，增量查询时向前多取一段时间
+REFRESH_OVERLAP = timedelta(minutes=2)
+
+def hash_blocks(blocks: List[Dict]) -> str:
+    """对Notion内容块树做规范化序列化（键排序、无多余空白）后计算sha256"""
+    canonical = json.dumps(blocks, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _plain_text(prop: Dict) -> str:
+    parts = prop.get("title") or prop.get("rich_text") or []
+    return "".join(part.get("plain_text") or part.get("text", {}).get("content", "")
+                   for part in parts)
+
+def _page_lang(page: Dict) -> Optional[str]:
+    name = (page.get("properties", {}).get("语言", {}).get("select") or {}).get("name")
+    return {"中文": "zh", "英文": "en"}.get(name)
+
+class StoryIndex:
+    """话题数据库的本地镜像，按 (database_id, story_id) 存储"""
+
+    def __init__(self, db_name: str = "story_index.sqlite3",
+                 full_resync_max_age: float = FULL_RESYNC_MAX_AGE):
+        self.db_name = db_name
+        self.full_resync_max_age = full_resync_max_age
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_sqlite(self.db_name)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS notion_mirror (
+                    database_id TEXT NOT NULL,
+                    story_id TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    lang TEXT,
+                    content_hash TEXT,
+                    properties TEXT,
+                    last_edited_time TEXT,
+                    last_synced REAL NOT NULL,
+                    PRIMARY KEY (database_id, story_id)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mirror_meta (
+                    database_id TEXT PRIMARY KEY,
+                    last_edited_time TEXT,
+                    last_full_sync REAL
+                )
+            """)
+        return self._conn
+
+    # ============ 查询 ============
+
+    def get(self, database_id: str, story_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db().execute("""
+                SELECT page_id, lang, content_hash, properties, last_edited_time
+                FROM notion_mirror WHERE database_id = ? AND story_id = ?
+            """, (database_id, story_id)).fetchone()
+        if row is None:
+            return None
+        return {
+            "page_id": row[0],
+            "lang": row[1],
+            "content_hash": row[2],
+            "properties": json.loads(row[3]) if row[3] else {},
+            "last_edited_time": row[4],
+        }
+
+    def story_ids(self, database_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT story_id FROM notion_mirror WHERE database_id = ?", (database_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    # ============ 写入 ============
+
+    def put(self, database_id: str, story_id: str, page_id: str, lang: Optional[str] = None,
+            content_hash: Optional[str] = None, properties: Optional[Dict] = None,
+            last_edited_time: Optional[str] = None):
+        """
+        写入/合并一条记录：未传入的字段沿用已有值；
+        page_id变化时不沿用旧页面的内容哈希
+        """
+        if not story_id:
+            return
+        current = self.get(database_id, story_id)
+        if current:
+            same_page = current["page_id"] == page_id
+            lang = lang or current["lang"]
+            if content_hash is None and same_page:
+                content_hash = current["content_hash"]
+            if properties is None and same_page:
+                properties = current["properties"]
+            last_edited_time = last_edited_time or (current["last_edited_time"] if same_page else None)
+
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO notion_mirror VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (database_id, story_id, page_id, lang, content_hash,
+                 json.dumps(properties, ensure_ascii=False) if properties else None,
+                 last_edited_time, time.time()))
+
+    def remove(self, database_id: str, story_id: str):
+        with self._lock:
+            self._db().execute("DELETE FROM notion_mirror WHERE database_id = ? AND story_id = ?",
+                               (database_id, story_id))
+
+    def clear(self, database_id: str):
+        """清空一个数据库的镜像（包括同步进度），下次刷新时全量同步"""
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM notion_mirror WHERE database_id = ?", (database_id,))
+            db.execute("DELETE FROM mirror_meta WHERE database_id = ?", (database_id,))
+
+    def put_page(self, database_id: str, page: Dict, content_hash: Optional[str] = None):
+        """用Notion返回的页面对象更新镜像"""
+        props = page.get("properties", {})
+        story_id = _plain_text(props.get("话题ID", {}))
+        current = self.get(database_id, story_id)
+        if current and current["page_id"] != page["id"] and current["last_edited_time"] \
+                and (page.get("last_edited_time") or "") < current["last_edited_time"]:
+            # 同一话题有多个页面时保留最近编辑的那个
+            return
+        self.put(database_id, story_id, page["id"], lang=_page_lang(page),
+                 content_hash=content_hash,
+                 properties=props,
+                 last_edited_time=page.get("last_edited_time"))
+
+    # ============ 同步 ============
+
+    def refresh(self, client, database_id: str, full: bool = False) -> Dict:
+        """
+        从Notion刷新镜像
+
+        - 增量：按last_edited_time升序，只查询上次同步之后编辑过的页面
+        - 全量（full=True、从未同步过或距上次全量同步超过full_resync_max_age）：
+          查询全部页面，并删除已不存在的记录（增量查询不会返回已归档的页面）
+
+        返回 {"mode": "full"/"incremental", "pages": 查询到的页面数}
+        """
+        with self._lock:
+            meta = self._db().execute(
+                "SELECT last_edited_time, last_full_sync FROM mirror_meta WHERE database_id = ?",
+                (database_id,)).fetchone()
+        since, last_full_sync = meta if meta else (None, None)
+        full = full or not since or not last_full_sync \
+            or time.time() - last_full_sync > self.full_resync_max_age
+        started = datetime.now(timezone.utc).isoformat()
+
+        payload = {
+            "page_size": 100,
+            "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]
+        }
+        if not full:
+            since_time = datetime.fromisoformat(since.replace("Z", "+00:00")) - REFRESH_OVERLAP
+            payload["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": since_time.isoformat()}
+            }
+
+        seen = set()
+        latest = since
+        count = 0
+        while True:
+            response = client.post(f"/v1/databases/{database_id}/query", json=payload,
+                                   timeout=30, idempotent=True)
+            response.raise_for_status()
+            data = response.json()
+
+            for page in data.get("results", []):
+                count += 1
+                self.put_page(database_id, page)
+                seen.add(_plain_text(page.get("properties", {}).get("话题ID", {})))
+                edited = page.get("last_edited_time")
+                if edited and (not latest or edited > latest):
+                    latest = edited
+
+            if not data.get("has_more") or not data.get("next_cursor"):
+                break
+            payload["start_cursor"] = data["next_cursor"]
+
+        with self._lock:
+            db = self._db()
+            if full:
+                rows = db.execute("SELECT story_id FROM notion_mirror WHERE database_id = ?",
+                                  (database_id,)).fetchall()
+                for (story_id,) in rows:
+                    if story_id not in seen:
+                        db.execute("DELETE FROM notion_mirror WHERE database_id = ? AND story_id = ?",
+                                   (database_id, story_id))
+            # 数据库为空时以本次查询开始时间作为下次增量的起点
+            latest = latest or started
+            db.execute("""
+                INSERT INTO mirror_meta VALUES (?, ?, ?)
+                ON CONFLICT(database_id) DO UPDATE SET
+                    last_edited_time = excluded.last_edited_time,
+                    last_full_sync = COALESCE(excluded.last_full_sync, mirror_meta.last_full_sync)
+            """, (database_id, latest, time.time() if full else None))
+
+        return {"mode": "full" if full else "incremental", "pages": count}
+
+story_index = StoryIndex()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+结构化运行日志（sync.log）
+功能：
+✅ 每条事件写为一行JSON：时间（含日期）、级别、消息，以及 run_id / stage / story_id /
+   lang / duration_ms / outcome 等上下文字段
+✅ 按线程设置上下文（当前阶段、话题、语言），该线程内的日志自动带上
+✅ 经QueueHandler写入内存队列，由后台线程写文件，不阻塞同步线程
+✅ 按大小轮转（sync.log → sync.log.1 …）
+✅ 只写文件，控制台输出保持不变
+
+用法：
+    sync_log.setup()
+    sync_log.set_run_id(run_id)
+    with sync_log.log_context(stage="写入", story_id=sid, lang="zh"):
+        sync_log.event("info", "页面已创建", outcome="created")
+    with sync_log.timed("话题处理完成") as result:
+        ...
+        result["outcome"] = "skipped"
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# ============ 配置区 ============
+
+SYNC_LOG_ENABLED = os.getenv("SYNC_LOG_ENABLED", "1") != "0"
+SYNC_LOG_FILE = os.getenv("SYNC_LOG_FILE", "sync.log")
+SYNC_LOG_MAX_BYTES = int(os.getenv("SYNC_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SYNC_LOG_BACKUPS = int(os.getenv("SYNC_LOG_BACKUPS", "3"))
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+_logger = logging.getLogger("tops_sync")
+_logger.propagate = False
+_logger.setLevel(logging.DEBUG)
+
+_context = threading.local()
+_run_id: Optional[str] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_file_handler: Optional[logging.Handler] = None
+
+class JsonFormatter(logging.Formatter):
+    """把日志记录格式化为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "msg": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+def setup(path: str = SYNC_LOG_FILE):
+    """启动后台写日志线程（重复调用无副作用）"""
+    global _listener, _file_handler
+    if _listener is not None or not SYNC_LOG_ENABLED:
+        return
+    _file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=SYNC_LOG_MAX_BYTES, backupCount=SYNC_LOG_BACKUPS, encoding="utf-8")
+    _file_handler.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(-1)
+    _logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, _file_handler)
+    _listener.start()
+    atexit.register(shutdown)
+
+def shutdown():
+    """写完队列中剩余的日志并关闭文件"""
+    global _listener, _file_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    _file_handler.close()
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+    _listener = None
+    _file_handler = None
+
+def set_run_id(run_id: Optional[str]):
+    global _run_id
+    _run_id = run_id
+
+@contextmanager
+def log_context(**fields):
+    """在当前线程内为之后的日志附加上下文字段，退出时恢复"""
+    previous = getattr(_context, "fields", {})
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+def event(level: str, message: str, **fields):
+    """写一条结构化日志（未启用时忽略），值为None的字段省略"""
+    if _listener is None:
+        return
+    data = {"run_id": _run_id}
+    data.update(getattr(_context, "fields", {}))
+    data.update(fields)
+    data = {key: value for key, value in data.items() if value is not None}
+    _logger.log(LEVELS.get(level, logging.INFO), message, extra={"fields": data})
+
+@contextmanager
+def timed(message: str, **fields):
+    """
+    对一段处理计时，结束时写一条带duration_ms和outcome的日志
+
+    outcome默认为ok，异常时为error；调用方可修改yield出的字典设置outcome等字段
+    """
+    result: Dict = {"outcome": "ok"}
+    started = time.monotonic()
+    try:
+        yield result
+    except Exception as e:
+        result["outcome"] = "error"
+        result.setdefault("error", str(e)[:200])
+        raise
+    finally:
+        data = {**fields, **result}
+        event("error" if data["outcome"] in ("error", "failed") else "info", message,
+              duration_ms=round((time.monotonic() - started) * 1000, 1), **data)
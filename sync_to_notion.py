@@ -4,23 +4,31 @@ Chainbase TOPS → Notion 生产版同步脚本
 功能：
 ✅ 中文话题直接同步
 ✅ 英文话题翻译成中英对照格式（使用免费Google翻译）
-✅ 自动去重（检查话题ID是否已存在）
+✅ 自动去重（本地镜像增量刷新，检查话题ID是否已存在）
 ✅ 支持增量更新和全量同步
 ✅ 详细的日志输出
 
 翻译服务: Google Translate (完全免费，无需API Key)
 """
 
-import requests
 import json
 import os
 import sys
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import time
 
-# 免费翻译服务 - Google Translate
-from deep_translator import GoogleTranslator
+# 免费翻译服务 - Google Translate（带持久化翻译记忆）
+import translation
+
+# 共享HTTP客户端（连接复用）
+from http_client import chainbase, notion, stats_lines as http_stats_lines
+
+# Chainbase榜单条件请求（ETag / Last-Modified）
+from feed_cache import fetch_feed
+
+# Notion话题数据库本地镜像（去重不再全量分页查询）
+from story_index import story_index, FULL_RESYNC
 
 # ============ 配置区 ============
 
@@ -35,10 +43,10 @@ if not NOTION_API_KEY:
     print("   请设置: export NOTION_API_KEY=your_api_key")
     sys.exit(1)
 
-# Chainbase TOPS API
-CHAINBASE_API_ZH = "https://api.chainbase.com/tops/v1/stories?lang=zh"
-CHAINBASE_API_EN = "https://api.chainbase.com/tops/v1/stories?lang=en"
-CHAINBASE_API_REALTIME = "https://api.chainbase.com/tops/v1/realtime-mining"
+# Chainbase TOPS API（相对CHAINBASE_API_BASE的路径）
+CHAINBASE_API_ZH = "/tops/v1/stories?lang=zh"
+CHAINBASE_API_EN = "/tops/v1/stories?lang=en"
+CHAINBASE_API_REALTIME = "/tops/v1/realtime-mining"
 
 # 翻译配置 - 使用免费Google翻译，无需API Key
 TRANSLATOR_ENABLED = True  # 设置为False可禁用翻译
@@ -72,11 +80,9 @@ def get_chainbase_stories(lang: str = "zh") -> List[Dict]:
     """获取Chainbase TOPS热门话题"""
     url = CHAINBASE_API_ZH if lang == "zh" else CHAINBASE_API_EN
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        items = data.get("items", [])
-        log_info(f"获取{lang.upper()}数据: {len(items)} 个话题")
+        items, changed = fetch_feed(chainbase, url)
+        status = "" if changed else "（榜单无变化，复用上次结果）"
+        log_info(f"获取{lang.upper()}数据: {len(items)} 个话题{status}")
         return items
     except Exception as e:
         log_error(f"获取{lang.upper()}数据失败: {e}")
@@ -85,7 +91,7 @@ def get_chainbase_stories(lang: str = "zh") -> List[Dict]:
 def get_realtime_mining() -> Dict:
     """获取实时挖矿数据"""
     try:
-        response = requests.get(CHAINBASE_API_REALTIME, timeout=10)
+        response = chainbase.get(CHAINBASE_API_REALTIME)
         response.raise_for_status()
         data = response.json()
         return data.get("data", {})
@@ -99,9 +105,8 @@ def translate_text_to_chinese(text: str) -> str:
         return ""
 
     try:
-        # 使用GoogleTranslator进行翻译
-        translator = GoogleTranslator(source='auto', target='zh-CN')
-        translated_text = translator.translate(text)
+        # 使用GoogleTranslator进行翻译（优先命中翻译记忆，单次调用有硬性超时）
+        translated_text = translation.translate_with_deadline(text)
 
         if translated_text and translated_text.strip():
             return translated_text.strip()
@@ -115,58 +120,32 @@ def translate_text_to_chinese(text: str) -> str:
 
 # ============ Notion函数 ============
 
-def get_existing_story_ids(database_id: str) -> Set[str]:
-    """获取数据库中已存在的话题ID，用于去重"""
-    url = f"https://api.notion.com/v1/databases/{database_id}/query"
-
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-
-    existing_ids = set()
+def get_existing_story_ids(database_id: str) -> Optional[Set[str]]:
+    """
+    获取数据库中已存在的话题ID，用于去重（增量刷新本地镜像后本地读取）
 
+    刷新失败时沿用镜像中上次同步的结果；镜像为空时返回None，调用方应终止本次同步，
+    否则无法去重，会为每个话题重复创建页面
+    """
     try:
-        # 分页获取所有记录
-        has_more = True
-        while has_more:
-            payload = {"page_size": 100}
-            if existing_ids:
-                # 如果有下一页，使用cursor
-                pass
-
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            # 提取话题ID
-            for item in data.get("results", []):
-                story_id_props = item.get("properties", {}).get("话题ID", {})
-                if story_id_props.get("rich_text"):
-                    story_id = story_id_props["rich_text"][0]["text"]["content"]
-                    existing_ids.add(story_id)
-
-            has_more = data.get("has_more", False)
-
-        log_info(f"数据库中已有 {len(existing_ids)} 个话题")
+        result = story_index.refresh(notion, database_id, full=FULL_RESYNC)
+        mode = "全量" if result["mode"] == "full" else "增量"
+        log_info(f"本地镜像{mode}刷新: 查询到 {result['pages']} 个页面")
+    except Exception as e:
+        existing_ids = story_index.story_ids(database_id)
+        if not existing_ids:
+            log_error(f"获取已有话题ID失败，且本地镜像为空: {e}")
+            return None
+        log_warning(f"刷新本地镜像失败，沿用上次同步的 {len(existing_ids)} 个话题: {e}")
         return existing_ids
 
-    except Exception as e:
-        log_warning(f"获取已有话题ID失败: {e}")
-        return set()
+    existing_ids = story_index.story_ids(database_id)
+    log_info(f"数据库中已有 {len(existing_ids)} 个话题")
+    return existing_ids
 
 def add_item_to_notion(database_id: str, story: Dict, lang: str,
                       translated_summary: str = "") -> bool:
     """添加单个话题到Notion数据库"""
-    url = "https://api.notion.com/v1/pages"
-
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28"
-    }
-
     story_id = story.get("id", "")
     keyword = story.get("keyword", "")
     summary = story.get("summary", "")
@@ -231,8 +210,9 @@ def add_item_to_notion(database_id: str, story: Dict, lang: str,
     }
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = notion.post("/v1/pages", json=payload, timeout=10)
         response.raise_for_status()
+        story_index.put_page(database_id, response.json())
         return True
     except Exception as e:
         log_error(f"添加失败: {title[:30]}... - {str(e)[:50]}...")
@@ -273,6 +253,9 @@ def main():
     # 2. 获取已有话题ID（用于去重）
     print("\n🔍 检查已有话题...")
     existing_ids = get_existing_story_ids(NOTION_DATABASE_ID)
+    if existing_ids is None:
+        log_error("无法确认已有话题，为避免重复创建页面，本次同步终止")
+        return
 
     # 3. 获取中文热门话题
     print("\n🇨🇳 获取中文热门话题")
@@ -305,8 +288,6 @@ def main():
             else:
                 print("❌")
 
-            time.sleep(0.3)  # 避免API限流
-
     log_success(f"中文话题同步完成: {zh_count}/{zh_total}")
 
     # 6. 同步英文话题（带翻译）
@@ -332,8 +313,6 @@ def main():
             else:
                 print("❌")
 
-            time.sleep(1)  # 翻译API需要更长间隔
-
         log_success(f"英文话题同步完成: {en_count}/{en_total}")
     elif not TRANSLATOR_ENABLED and en_total > 0:
         log_warning(f"翻译功能已禁用，跳过 {en_total} 个英文话题")
@@ -350,6 +329,11 @@ def main():
     total_existing = len(existing_ids)
     total_now = total_existing + zh_count + en_count
     log_info(f"数据库总计: {total_now} 个话题")
+    translation_stats = translation.stats_line()
+    if translation_stats:
+        log_info(translation_stats)
+    for line in http_stats_lines():
+        log_info(line)
 
     print("\n" + "=" * 70)
     print("🎉 同步完成！")
@@ -0,0 +1,55 @@
+"""
+测试环境：在导入任何项目模块之前设置环境变量，并在进程内启动本地Notion API替身
+
+- 状态目录（镜像、运行日志、缓存）放在临时目录，不影响本地真实状态
+- NOTION_API_BASE指向替身；CHAINBASE_API_BASE指向不可达地址，测试不应访问Chainbase
+- 替身默认不限流，需要测试429的用例通过stub夹具设置限流
+"""
+
+import os
+import tempfile
+import threading
+import uuid
+
+import pytest
+
+_STATE_DIR = tempfile.mkdtemp(prefix="sync_state_test_")
+os.environ.update({
+    "SYNC_STATE_DIR": _STATE_DIR,
+    "NOTION_API_KEY": "test",
+    "NOTION_DATABASE_ID": "11111111111111111111111111111111",
+    "NOTION_PARENT_PAGE_ID": "22222222222222222222222222222222",
+    "CHAINBASE_API_BASE": "http://127.0.0.1:9",
+    "NOTION_RATE_LIMIT": "1000",
+    "SYNC_LOG_ENABLED": "0",
+    "METRICS_ENABLED": "0",
+    "CHAINBASE_CACHE_ENABLED": "0",
+    "TRANSLATION_MEMORY_ENABLED": "0",
+})
+
+from notion_stub_server import NotionStore, NotionStubServer, RateLimiter  # noqa: E402
+
+_server = NotionStubServer(("127.0.0.1", 0), rate_limit=0)
+threading.Thread(target=_server.serve_forever, name="notion-stub", daemon=True).start()
+os.environ["NOTION_API_BASE"] = f"http://127.0.0.1:{_server.server_address[1]}"
+
+@pytest.fixture
+def stub():
+    """本地Notion API替身：每个用例使用空白数据、不限流"""
+    with _server.lock:
+        _server.store = NotionStore()
+        _server.counts.clear()
+        _server.throttled = 0
+    _server.limiter = RateLimiter(0, 1)
+    yield _server
+    _server.limiter = RateLimiter(0, 1)
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    """每个用例使用独立的本地镜像数据库"""
+    from story_index import StoryIndex
+    import enhanced_sync
+
+    index = StoryIndex(f"story_index_{uuid.uuid4().hex}.sqlite3")
+    monkeypatch.setattr(enhanced_sync, "story_index", index)
+    return index
@@ -0,0 +1,81 @@
+import time
+import uuid
+
+import pytest
+import requests
+
+from detail_cache import CACHE_TTL, DetailCache
+
+@pytest.fixture
+def cache():
+    return DetailCache(f"chainbase_cache_{uuid.uuid4().hex}.sqlite3", ttl=60, stale_max_age=600,
+                       revalidate_timeout=3)
+
+def age(cache: DetailCache, story_id: str, endpoint: str, seconds: float):
+    """把缓存条目的获取时间往前拨seconds秒"""
+    cache._db().execute("UPDATE detail_cache SET fetched_at = fetched_at - ? "
+                        "WHERE story_id = ? AND endpoint = ?", (seconds, story_id, endpoint))
+
+class Fetcher:
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if self.error:
+            raise self.error
+        return self.value
+
+def test_default_ttl_is_shorter_than_the_scheduled_run_interval():
+    assert CACHE_TTL < 2 * 3600
+
+def test_fresh_entry_is_served_without_fetching(cache):
+    cache.put("s1", "timeline", [{"id": 1}])
+    fetcher = Fetcher([{"id": 2}])
+    assert cache.fetch("s1", "timeline", fetcher) == [{"id": 1}]
+    assert fetcher.timeouts == []
+    assert cache.stats()["hits"] == 1
+
+def test_miss_fetches_without_timeout_and_stores(cache):
+    fetcher = Fetcher([{"id": 1}])
+    assert cache.fetch("s1", "authors", fetcher) == [{"id": 1}]
+    assert fetcher.timeouts == [None]
+    assert cache.get("s1", "authors")[0] == [{"id": 1}]
+
+def test_miss_without_stale_copy_raises(cache):
+    with pytest.raises(requests.ConnectionError):
+        cache.fetch("s1", "authors", Fetcher(error=requests.ConnectionError()))
+
+def test_expired_entry_is_revalidated_with_a_short_timeout(cache):
+    cache.put("s1", "timeline", [{"id": 1}])
+    age(cache, "s1", "timeline", 120)
+    fetcher = Fetcher([{"id": 2}])
+    assert cache.fetch("s1", "timeline", fetcher) == [{"id": 2}]
+    assert fetcher.timeouts == [3]
+    assert cache.get("s1", "timeline")[1] < 60
+
+def test_stale_copy_is_served_when_revalidation_fails(cache):
+    cache.put("s1", "timeline", [{"id": 1}])
+    age(cache, "s1", "timeline", 120)
+    assert cache.fetch("s1", "timeline", Fetcher(error=requests.Timeout())) == [{"id": 1}]
+    assert cache.stats()["stale_served"] == 1
+
+def test_entries_past_stale_max_age_are_evicted(cache):
+    cache.put("old", "timeline", [1])
+    age(cache, "old", "timeline", 700)
+    cache.put("new", "timeline", [2])
+    assert cache.get("old", "timeline") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(cache):
+    cache.put("a", "timeline", ["x" * 100])
+    entry_size = cache._db().execute("SELECT size FROM detail_cache").fetchone()[0]
+    cache.max_bytes = entry_size * 2
+    cache.put("b", "timeline", ["y" * 100])
+    time.sleep(0.01)
+    cache.get("a", "timeline")
+    cache.put("c", "timeline", ["z" * 100])
+    assert cache.get("b", "timeline") is None
+    assert cache.get("a", "timeline") is not None
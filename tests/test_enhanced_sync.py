@@ -0,0 +1,272 @@
+import json
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pytest
+import requests
+
+import enhanced_sync
+import translation
+from enhanced_sync import (build_story_children, load_resumable_run, lookup_existing_page, record_page_written,
+                           translate_summary, upsert_story_page)
+from hedging import Hedger
+from journal import RunJournal
+
+DATABASE_ID = "55555555555555555555555555555555"
+STORY = {"id": "en1", "keyword": "ETF inflows", "summary": "Spot ETF inflows hit a record.",
+         "attention_score": 5}
+
+@pytest.fixture
+def run_journal(monkeypatch):
+    journal = RunJournal(f"run_journal_{uuid.uuid4().hex}.jsonl")
+    journal.start("r1")
+    monkeypatch.setattr(enhanced_sync, "journal", journal)
+    yield journal
+    journal.complete()
+
+@pytest.fixture
+def fallbacks(monkeypatch):
+    """每个用例独立的“翻译以原文兜底”记录"""
+    fallbacks = set()
+    monkeypatch.setattr(enhanced_sync, "_translation_fallbacks", fallbacks)
+    return fallbacks
+
+# ============ 运行日志 ============
+
+@pytest.mark.parametrize("action, journaled", [
+    ("created", True), ("updated", True), ("skipped", True), ("failed", False)])
+def test_only_successful_writes_are_journaled(run_journal, action, journaled):
+    record_page_written("en", STORY, ("page-1", action))
+    assert (("en", "en1") in run_journal.load()["pages"]) == journaled
+
+def test_interrupted_run_is_resumed_regardless_of_age(run_journal):
+    run_journal._file.close()
+    run_journal._file = None
+    with open(run_journal.path, encoding="utf-8") as f:
+        started = json.loads(f.readline())
+    started["time"] -= 24 * 3600
+    with open(run_journal.path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(started) + "\n")
+    assert load_resumable_run()["run_id"] == "r1"
+
+def test_run_resumed_too_often_starts_over(run_journal, monkeypatch):
+    monkeypatch.setattr(enhanced_sync, "SYNC_RESUME_MAX_ATTEMPTS", 2)
+    run_journal.resume("r1")
+    assert load_resumable_run()["run_id"] == "r1"
+    run_journal.resume("r1")
+    assert load_resumable_run() is None
+
+# ============ 翻译兜底不改写已有页面 ============
+
+def write_story(translated: str):
+    existing = lookup_existing_page(DATABASE_ID, STORY["id"])
+    children = build_story_children(STORY, "en", [], [], translated)
+    return upsert_story_page(DATABASE_ID, STORY, "en", [], [], translated,
+                             existing_page=existing, children=children)
+
+def page_text(stub, page_id):
+    with stub.lock:
+        blocks = stub.store.list_children(page_id, None, 100)["results"]
+    return "".join(part["plain_text"] for block in blocks
+                   for part in block[block["type"]].get("rich_text", []))
+
+def test_failed_translation_is_recorded_as_fallback(monkeypatch, fallbacks, run_journal):
+    def timeout(text):
+        raise TimeoutError("翻译超过 15 秒未返回")
+
+    monkeypatch.setattr(translation, "translate_with_deadline", timeout)
+    assert translate_summary(STORY) == STORY["summary"]
+    assert fallbacks == {"en1"}
+    assert run_journal.load()["translated"] == {}
+
+def test_fallback_run_keeps_existing_translated_content(stub, fresh_index, fallbacks):
+    page_id, action = write_story("现货ETF流入创新高。")
+    assert action == "created"
+
+    fallbacks.add(STORY["id"])
+    assert write_story(STORY["summary"]) == (page_id, "skipped")
+    assert "现货ETF流入创新高。" in page_text(stub, page_id)
+
+    fallbacks.clear()
+    assert write_story("现货ETF流入创新高。") == (page_id, "skipped")
+    assert write_story("现货ETF净流入创历史新高。") == (page_id, "updated")
+    assert "现货ETF净流入创历史新高。" in page_text(stub, page_id)
+
+def test_fallback_still_writes_a_known_empty_page(fresh_index, fallbacks):
+    fresh_index.put(DATABASE_ID, "en1", "p1", content_hash=enhanced_sync.hash_blocks([]))
+    fallbacks.add("en1")
+    assert not enhanced_sync.keep_existing_content("en1", fresh_index.get(DATABASE_ID, "en1"))
+    assert enhanced_sync.keep_existing_content("en1", None)
+
+# ============ 镜像中的页面已被归档 ============
+
+def test_backfill_into_an_archived_page_drops_it_from_the_mirror(stub, fresh_index):
+    page_id, _ = write_story("现货ETF流入创新高。")
+    assert enhanced_sync.notion.delete(f"/v1/blocks/{page_id}").status_code == 200
+
+    action = enhanced_sync.backfill_story_children(DATABASE_ID, STORY, "en", page_id, [], [], "新的译文。")
+
+    assert action == "failed"
+    assert fresh_index.get(DATABASE_ID, STORY["id"]) is None
+    assert lookup_existing_page(DATABASE_ID, STORY["id"]) is None
+
+def test_update_of_an_archived_page_recreates_it(stub, fresh_index):
+    page_id, _ = write_story("现货ETF流入创新高。")
+    assert enhanced_sync.notion.delete(f"/v1/blocks/{page_id}").status_code == 200
+
+    new_page_id, action = write_story("现货ETF净流入创历史新高。")
+
+    assert action == "created" and new_page_id != page_id
+    assert fresh_index.get(DATABASE_ID, STORY["id"])["page_id"] == new_page_id
+
+# ============ 幂等创建 ============
+
+class LostResponse:
+    """请求已被Notion接受，但客户端没有收到结果"""
+
+    def __init__(self, send, error):
+        self.send = send
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, payload):
+        self.calls += 1
+        future = Future()
+        if self.calls == 1:
+            if self.send:
+                self.real(payload).result()
+            future.set_exception(self.error)
+            return future
+        return self.real(payload)
+
+@pytest.fixture
+def create_requests(stub, monkeypatch):
+    monkeypatch.setattr(enhanced_sync, "CREATE_LOOKUP_DELAY", 0)
+    monkeypatch.setattr(enhanced_sync, "_create_intents", {})
+
+    def install(send: bool, error: Exception) -> LostResponse:
+        lost = LostResponse(send, error)
+        lost.real = enhanced_sync.notion_writes.create_page
+        monkeypatch.setattr(enhanced_sync.notion_writes, "create_page", lost)
+        return lost
+
+    return install
+
+def story_pages(stub, story_id):
+    with stub.lock:
+        return [page for page in stub.store.pages.values() if not page["archived"]
+                and page.get("properties", {}).get("话题ID", {}).get("rich_text", [{}])[0].get("plain_text") == story_id]
+
+def page_payload(story_id):
+    return {"parent": {"database_id": DATABASE_ID},
+            "properties": enhanced_sync.build_story_properties(DATABASE_ID, dict(STORY, id=story_id), "en")}
+
+def test_timed_out_create_that_reached_notion_is_not_repeated(stub, create_requests, run_journal):
+    lost = create_requests(send=True, error=requests.ReadTimeout("read timed out"))
+
+    page = enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+
+    assert lost.calls == 1
+    assert [p["id"] for p in story_pages(stub, "en1")] == [page["id"]]
+
+def test_create_that_never_reached_notion_is_retried(stub, create_requests, run_journal):
+    lost = create_requests(send=False, error=requests.ConnectionError("connection reset"))
+
+    page = enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+
+    assert lost.calls == 2
+    assert [p["id"] for p in story_pages(stub, "en1")] == [page["id"]]
+
+def test_lookup_without_marker_property_uses_story_id_and_created_time(stub, create_requests, monkeypatch):
+    schema = {name: prop for name, prop in enhanced_sync.get_database_schema(DATABASE_ID).items()
+              if name != enhanced_sync.SYNC_MARKER_PROPERTY}
+    monkeypatch.setitem(enhanced_sync._database_schemas, DATABASE_ID, schema)
+    lost = create_requests(send=True, error=requests.ReadTimeout("read timed out"))
+
+    page = enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+
+    assert lost.calls == 1
+    assert [p["id"] for p in story_pages(stub, "en1")] == [page["id"]]
+
+def test_non_ambiguous_failure_is_raised_without_lookup(stub, create_requests):
+    response = requests.Response()
+    response.status_code = 400
+    lost = create_requests(send=False, error=requests.HTTPError("bad request", response=response))
+    queries = stub.counts.get("POST /v1/databases/{id}/query", 0)
+
+    with pytest.raises(requests.HTTPError):
+        enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+    assert lost.calls == 1
+    assert stub.counts.get("POST /v1/databases/{id}/query", 0) == queries
+
+def test_resumed_intent_finds_the_page_created_before_the_crash(stub, create_requests, run_journal,
+                                                               monkeypatch):
+    lost = create_requests(send=True, error=requests.ReadTimeout("read timed out"))
+    attempts = enhanced_sync.CREATE_MAX_ATTEMPTS
+    monkeypatch.setattr(enhanced_sync, "CREATE_MAX_ATTEMPTS", 1)
+    with pytest.raises(requests.ReadTimeout):
+        enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+    monkeypatch.setattr(enhanced_sync, "CREATE_MAX_ATTEMPTS", attempts)
+    enhanced_sync._create_intents.update(run_journal.load()["intents"])
+
+    page = enhanced_sync.create_page_idempotent(DATABASE_ID, "en1", page_payload("en1"))
+
+    assert lost.calls == 1
+    assert [p["id"] for p in story_pages(stub, "en1")] == [page["id"]]
+
+# ============ 对冲请求 ============
+
+class FakeResponse:
+    elapsed = timedelta(milliseconds=20)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return []
+
+def test_revalidation_is_not_hedged(monkeypatch):
+    hedged = []
+    monkeypatch.setattr(enhanced_sync, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(enhanced_sync.hedger, "call",
+                        lambda endpoint, fetch, **kwargs: hedged.append(endpoint) or fetch())
+    monkeypatch.setattr(enhanced_sync.chainbase, "get", lambda path, **kwargs: FakeResponse())
+
+    enhanced_sync._fetch_story_detail("s1", "timeline", timeout=3)
+    assert hedged == []
+    enhanced_sync._fetch_story_detail("s1", "timeline")
+    assert hedged == ["timeline"]
+
+def test_hedger_samples_the_request_not_the_retry_backoff(monkeypatch):
+    hedger = Hedger(min_samples=1)
+    monkeypatch.setattr(enhanced_sync, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(enhanced_sync, "hedger", hedger)
+
+    def retried_get(path, **kwargs):
+        time.sleep(0.1)  # 重试前的退避等待
+        return FakeResponse()
+
+    monkeypatch.setattr(enhanced_sync.chainbase, "get", retried_get)
+    assert enhanced_sync._fetch_story_detail("s1", "timeline") == []
+    assert hedger.threshold("timeline") == 0.02
+
+# ============ 主流程 ============
+
+def test_pipeline_run_without_zh_stories_still_finishes(stub, run_journal, monkeypatch):
+    en_pages = [{"story": STORY, "page_id": "p1", "rank": 1, "lang": "en"}]
+    parent_updates, exported = [], []
+    monkeypatch.setattr(enhanced_sync, "SYNC_TWO_PHASE", False)
+    monkeypatch.setattr(enhanced_sync, "SYNC_RESUME", False)
+    monkeypatch.setattr(enhanced_sync, "sync_pipeline",
+                        lambda resumed, counts: ({"zh": [], "en": [STORY]}, en_pages, None))
+    monkeypatch.setattr(enhanced_sync, "update_parent_if_needed",
+                        lambda *args, **kwargs: parent_updates.append(args))
+    monkeypatch.setattr(enhanced_sync, "export_metrics", exported.append)
+
+    enhanced_sync.main()
+
+    assert parent_updates == []
+    assert len(exported) == 1
+    assert run_journal.load() is None
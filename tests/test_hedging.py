@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from hedging import Hedger
+
+def warmed(samples=(0.01,) * 20, **kwargs) -> Hedger:
+    hedger = Hedger(min_samples=len(samples), **kwargs)
+    for seconds in samples:
+        hedger._record("timeline", seconds)
+    return hedger
+
+class Backend:
+    """第一次调用慢（slow秒），之后的调用立即返回"""
+
+    def __init__(self, slow: float, error: Exception = None):
+        self.slow = slow
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(self.slow)
+            return "primary"
+        if self.error:
+            raise self.error
+        return "hedge"
+
+def test_no_hedging_until_enough_samples():
+    hedger = Hedger(min_samples=3)
+    backend = Backend(slow=0.05)
+    assert hedger.threshold("timeline") is None
+    assert hedger.call("timeline", backend) == "primary"
+    assert backend.calls == 1 and hedger.hedges == 0
+
+def test_threshold_is_the_p95_of_recent_samples():
+    hedger = warmed([i / 100 for i in range(1, 101)])
+    assert hedger.threshold("timeline") == 0.95
+    assert hedger.threshold("authors") is None
+
+def test_slow_request_is_hedged_and_the_faster_response_wins():
+    hedger = warmed(max_ratio=1)
+    backend = Backend(slow=0.3)
+    started = time.monotonic()
+    assert hedger.call("timeline", backend) == "hedge"
+    assert time.monotonic() - started < 0.2
+    assert hedger.hedges == 1 and hedger.hedge_wins == 1
+
+def test_fast_request_is_not_hedged():
+    hedger = warmed(samples=(0.5,) * 20, max_ratio=1)
+    backend = Backend(slow=0.01)
+    assert hedger.call("timeline", backend) == "primary"
+    assert backend.calls == 1 and hedger.hedges == 0
+
+def test_hedge_ratio_is_capped():
+    hedger = warmed(samples=(0.01,) * 100, max_ratio=0.5)
+    results = [hedger.call("timeline", Backend(slow=0.1)) for _ in range(4)]
+    assert hedger.hedges == 2
+    assert results.count("hedge") == 2
+
+def test_failed_hedge_falls_back_to_the_primary():
+    hedger = warmed(max_ratio=1)
+    backend = Backend(slow=0.1, error=requests.ConnectionError("reset"))
+    assert hedger.call("timeline", backend) == "primary"
+    assert hedger.hedge_wins == 0
+
+def test_error_is_raised_when_both_requests_fail():
+    hedger = warmed(max_ratio=1)
+
+    def broken():
+        time.sleep(0.05)
+        raise requests.ReadTimeout("timed out")
+
+    with pytest.raises(requests.ReadTimeout):
+        hedger.call("timeline", broken)
+
+def test_latency_samples_exclude_retry_backoff_and_failures():
+    hedger = Hedger(min_samples=1)
+
+    def retried():
+        time.sleep(0.1)  # 重试前的退避等待
+        return {"elapsed": 0.02}
+
+    def refused():
+        raise requests.ConnectionError("connection refused")
+
+    hedger.call("timeline", retried, latency=lambda result: result["elapsed"])
+    with pytest.raises(requests.ConnectionError):
+        hedger.call("timeline", refused)
+    assert hedger.threshold("timeline") == 0.02
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+import requests
+
+from http_client import HostClient, NOTION_VERSION
+from notion_stub_server import RateLimiter
+from retry_policy import CircuitBreaker, RetryPolicy
+
+def notion_client(**kwargs) -> HostClient:
+    return HostClient("notion-test", os.environ["NOTION_API_BASE"], headers={
+        "Authorization": "Bearer test", "Notion-Version": NOTION_VERSION}, **kwargs)
+
+def test_throttled_requests_are_retried_after_retry_after(stub):
+    stub.limiter = RateLimiter(rate=20, burst=1)
+    client = notion_client(rate_limit=1000)
+    for _ in range(3):
+        assert client.get("/v1/databases/11111111111111111111111111111111").status_code == 200
+    assert stub.throttled >= 1
+    assert client.limiter.stats()["throttled"] == stub.throttled
+    assert client.limiter.rate < 1000
+
+def test_retry_timeout_is_capped_by_the_clients_own_budget(stub, monkeypatch):
+    client = notion_client(timeout=60, retry_policy=RetryPolicy(max_retries=1, base_delay=0, budget=5))
+    timeouts = []
+    send = client.session.request
+
+    def flaky(method, url, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        if len(timeouts) == 1:
+            raise requests.ConnectTimeout("connect timed out")
+        return send(method, url, **kwargs)
+
+    monkeypatch.setattr(client.session, "request", flaky)
+    assert client.get("/v1/databases/11111111111111111111111111111111").status_code == 200
+    assert timeouts[0] == 60
+    assert timeouts[1] <= 5
+
+def test_unexpected_exception_releases_the_half_open_probe(stub, monkeypatch):
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    client = notion_client(breaker=breaker)
+    breaker.on_failure()
+
+    def broken(*args, **kwargs):
+        raise UnicodeError("bad header")
+
+    monkeypatch.setattr(client.session, "request", broken)
+    with pytest.raises(UnicodeError):
+        client.get("/v1/databases/11111111111111111111111111111111")
+    assert not breaker._probing
+
+    monkeypatch.undo()
+    assert client.get("/v1/databases/11111111111111111111111111111111").status_code == 200
+    assert breaker.state == "closed"
@@ -0,0 +1,77 @@
+import json
+import uuid
+
+import pytest
+
+from journal import RunJournal
+
+@pytest.fixture
+def run_journal():
+    journal = RunJournal(f"run_journal_{uuid.uuid4().hex}.jsonl")
+    yield journal
+    journal.complete()
+
+def write_torn_line(journal: RunJournal):
+    """模拟写到一半被中断的最后一行"""
+    journal._file.write('{"run_id": "r1", "step": "fet')
+    journal._file.flush()
+    journal._file.close()
+    journal._file = None
+
+def test_load_without_journal_returns_none(run_journal):
+    assert run_journal.load() is None
+
+def test_load_replays_completed_steps(run_journal):
+    run_journal.start("r1", stories={"zh": [{"id": "a"}]})
+    run_journal.record("selected", lang="en", stories=[{"id": "b"}])
+    run_journal.record("fetched", story_id="a")
+    run_journal.record("translated", story_id="b", text="译文")
+    run_journal.record("create_intent", story_id="a", marker="a:r1", time=1.0)
+    run_journal.record("page_written", lang="zh", story_id="a", page_id="p1", action="created")
+    run_journal.record("parent_updated")
+
+    state = run_journal.load()
+    assert state["run_id"] == "r1"
+    assert state["started"] > 0
+    assert state["stories"] == {"zh": [{"id": "a"}], "en": [{"id": "b"}]}
+    assert state["fetched"] == {"a"}
+    assert state["translated"] == {"b": "译文"}
+    assert state["pages"] == {("zh", "a"): "p1"}
+    assert state["intents"] == {}
+    assert state["parent_updated"]
+
+def test_completed_run_is_not_resumed(run_journal):
+    run_journal.start("r1")
+    run_journal.complete()
+    assert run_journal.load() is None
+
+def test_failed_page_write_is_not_treated_as_done(run_journal):
+    run_journal.start("r1")
+    run_journal.record("page_written", lang="en", story_id="a", page_id="p1", action="failed")
+    assert run_journal.load()["pages"] == {}
+
+def test_load_ignores_torn_final_line(run_journal):
+    run_journal.start("r1")
+    run_journal.record("fetched", story_id="a")
+    write_torn_line(run_journal)
+    assert run_journal.load()["fetched"] == {"a"}
+
+def test_resume_truncates_torn_line_before_appending(run_journal):
+    run_journal.start("r1")
+    run_journal.record("fetched", story_id="a")
+    write_torn_line(run_journal)
+
+    run_journal.resume("r1")
+    run_journal.record("fetched", story_id="b")
+
+    with open(run_journal.path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["step"] for record in records] == ["run_started", "fetched", "run_resumed", "fetched"]
+    assert run_journal.load()["fetched"] == {"a", "b"}
+
+def test_load_counts_resumes(run_journal):
+    run_journal.start("r1")
+    assert run_journal.load()["resumes"] == 0
+    run_journal.resume("r1")
+    run_journal.resume("r1")
+    assert run_journal.load()["resumes"] == 2
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from http_client import HostClient, NOTION_VERSION
+from metrics import Metrics, normalize_endpoint
+
+@pytest.mark.parametrize("url, endpoint", [
+    ("https://api.chainbase.com/tops/api/hotspot/12345/timeline?x=1", "/tops/api/hotspot/{id}/timeline"),
+    ("https://api.notion.com/v1/pages/2e67c8ad-0dbb-8137-8a90-ddd0133b5a94", "/v1/pages/{id}"),
+    ("https://api.notion.com/v1/blocks/abc/children", "/v1/blocks/{id}/children"),
+    ("https://api.notion.com/v1/databases/2e67c8ad0dbb81378a90ddd0133b5a94/query",
+     "/v1/databases/{id}/query"),
+    ("https://api.chainbase.com/tops/v1/stories", "/tops/v1/stories"),
+])
+def test_endpoint_ids_are_normalized(url, endpoint):
+    assert normalize_endpoint(url) == endpoint
+
+def observed() -> Metrics:
+    metrics = Metrics()
+    for i, status in enumerate((200, 200, 429, "ReadTimeout")):
+        metrics.observe_request("notion", "PATCH", f"https://api.notion.com/v1/blocks/{i:032d}/children",
+                                status, seconds=0.1 * (i + 1), bytes_out=100, bytes_in=50)
+    metrics.observe_request("chainbase", "GET", "https://api.chainbase.com/tops/api/hotspot/1/authors",
+                            200, seconds=0.2, bytes_in=1000)
+    metrics.observe_stage("父页面", 1.5)
+    metrics.observe_stage("父页面", 0.5)
+    return metrics
+
+def test_requests_are_aggregated_per_endpoint():
+    report = observed().report(extra={"run_id": "r1"})
+    entry = next(e for e in report["requests"] if e["host"] == "notion")
+    assert entry["endpoint"] == "/v1/blocks/{id}/children"
+    assert entry["count"] == 4
+    assert entry["status"] == {"200": 2, "429": 1, "ReadTimeout": 1}
+    assert entry["bytes_out"] == 400 and entry["bytes_in"] == 200
+    assert entry["latency_p50"] == 0.2 and entry["latency_max"] == 0.4
+    assert report["hosts"]["chainbase"]["bytes_in"] == 1000
+    assert report["stages"]["父页面"] == {"count": 2, "seconds": 2.0, "max": 1.5}
+    assert report["run_id"] == "r1"
+
+def test_stage_is_timed_even_when_it_fails():
+    metrics = Metrics()
+    with pytest.raises(RuntimeError):
+        with metrics.stage("写入"):
+            raise RuntimeError()
+    assert metrics.report()["stages"]["写入"]["count"] == 1
+
+def test_export_writes_json_and_prometheus_text(tmp_path):
+    paths = observed().export(str(tmp_path), extra={"pages": {"created": 3}})
+
+    assert sorted(os.path.basename(path) for path in paths) == ["sync_metrics.json", "sync_metrics.prom"]
+    with open(tmp_path / "sync_metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["pages"] == {"created": 3}
+    prom = (tmp_path / "sync_metrics.prom").read_text(encoding="utf-8")
+    assert ('tops_sync_requests_total{host="notion",endpoint="/v1/blocks/{id}/children",'
+            'method="PATCH",status="429"} 1') in prom
+    assert 'tops_sync_stage_seconds{stage="父页面"} 2.0' in prom
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_client_requests_are_recorded_with_status(stub, monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr("http_client.metrics", metrics)
+    client = HostClient("notion-test", os.environ["NOTION_API_BASE"], headers={
+        "Authorization": "Bearer test", "Notion-Version": NOTION_VERSION})
+
+    client.get("/v1/databases/11111111111111111111111111111111")
+    client.get("/v1/blocks/11111111111111111111111111111111/children", params={"page_size": 101})
+
+    statuses = {e["endpoint"]: e["status"] for e in metrics.report()["requests"]}
+    assert statuses == {"/v1/databases/{id}": {"200": 1}, "/v1/blocks/{id}/children": {"400": 1}}
@@ -0,0 +1,48 @@
+import os
+
+import requests
+
+from notion_stub_server import MAX_CHILDREN, RateLimiter
+
+HEADERS = {"Authorization": "Bearer test", "Notion-Version": "2022-06-28"}
+PAGE_ID = "77777777777777777777777777777777"
+
+def call(method: str, path: str, **kwargs) -> requests.Response:
+    return requests.request(method, os.environ["NOTION_API_BASE"] + path,
+                            headers=kwargs.pop("headers", HEADERS), timeout=5, **kwargs)
+
+def paragraph(text: str):
+    return {"object": "block", "type": "paragraph",
+            "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}}
+
+def test_unknown_parent_page_is_created_on_first_append(stub):
+    response = call("PATCH", f"/v1/blocks/{PAGE_ID}/children", json={"children": [paragraph("a")]})
+    assert response.status_code == 200
+    children = call("GET", f"/v1/blocks/{PAGE_ID}/children").json()["results"]
+    assert [block["paragraph"]["rich_text"][0]["plain_text"] for block in children] == ["a"]
+
+def test_requests_are_validated_like_the_real_api(stub):
+    too_many = [paragraph(str(i)) for i in range(MAX_CHILDREN + 1)]
+    response = call("PATCH", f"/v1/blocks/{PAGE_ID}/children", json={"children": too_many})
+    assert response.status_code == 400
+    assert response.json()["code"] == "validation_error"
+
+    response = call("GET", f"/v1/blocks/{PAGE_ID}/children", headers={"Notion-Version": "2022-06-28"})
+    assert response.status_code == 401
+
+def test_deleted_blocks_are_archived_and_hidden(stub):
+    created = call("PATCH", f"/v1/blocks/{PAGE_ID}/children",
+                   json={"children": [paragraph("a"), paragraph("b")]}).json()["results"]
+    assert call("DELETE", f"/v1/blocks/{created[0]['id']}").json()["archived"]
+
+    children = call("GET", f"/v1/blocks/{PAGE_ID}/children").json()["results"]
+    assert [block["id"] for block in children] == [created[1]["id"]]
+    assert call("DELETE", f"/v1/blocks/{created[0]['id']}").status_code == 400
+
+def test_rate_limit_returns_429_with_retry_after(stub):
+    stub.limiter = RateLimiter(rate=0.5, burst=1)
+    assert call("GET", f"/v1/blocks/{PAGE_ID}/children").status_code == 200
+    response = call("GET", f"/v1/blocks/{PAGE_ID}/children")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert call("GET", "/_stub/stats").json()["throttled"] == 1
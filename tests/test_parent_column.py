@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+import enhanced_sync
+from enhanced_sync import (block_record, create_news_column_notion_standard, diff_column,
+                           rebuild_parent_page, swap_parent_column_list, update_parent_page_with_news_list)
+from state_store import state_path
+
+PAGE_ID = "44444444444444444444444444444444"
+
+def news(lang: str, keywords):
+    return [{"story": {"id": f"{lang}{i}", "keyword": keyword, "attention_score": 10 - i},
+             "page_id": f"{i:032d}", "rank": i + 1, "lang": lang}
+            for i, keyword in enumerate(keywords)]
+
+def column(keywords, lang="zh"):
+    return create_news_column_notion_standard(news(lang, keywords), "中文热点", "🇨🇳")
+
+def block_text(block) -> str:
+    content = block[block["type"]]
+    return "".join(part.get("plain_text") or part["text"]["content"] for part in content.get("rich_text", []))
+
+def stub_children(stub, block_id):
+    with stub.lock:
+        return stub.store.list_children(block_id, None, 100)["results"]
+
+def write_column(blocks):
+    created = enhanced_sync.append_block_children(PAGE_ID, blocks)
+    return [block_record(block, item["id"]) for block, item in zip(blocks, created)]
+
+@pytest.fixture
+def op_counts():
+    return {"updated": 0, "inserted": 0, "deleted": 0}
+
+def assert_column_matches(stub, records, blocks):
+    children = stub_children(stub, PAGE_ID)
+    assert [child["id"] for child in children] == [record["id"] for record in records]
+    assert [(child["type"], block_text(child)) for child in children] == \
+           [(block["type"], block_text(block)) for block in blocks]
+
+def test_unchanged_column_sends_no_requests(stub, op_counts):
+    blocks = column(["a", "b", "c"])
+    records = write_column(blocks)
+    requests_before = sum(stub.counts.values())
+
+    assert diff_column(PAGE_ID, records, blocks, op_counts) == records
+    assert op_counts == {"updated": 0, "inserted": 0, "deleted": 0}
+    assert sum(stub.counts.values()) == requests_before
+
+def test_changed_blocks_are_patched_in_place(stub, op_counts):
+    records = write_column(column(["a", "b", "c", "d"]))
+    new_blocks = column(["a", "x", "c", "d"])
+
+    new_records = diff_column(PAGE_ID, records, new_blocks, op_counts)
+
+    assert op_counts == {"updated": 1, "inserted": 0, "deleted": 0}
+    assert [record["id"] for record in new_records] == [record["id"] for record in records]
+    assert_column_matches(stub, new_records, new_blocks)
+
+def test_longer_column_inserts_after_the_last_kept_block(stub, op_counts):
+    records = write_column(column(["a", "b"]))
+    new_blocks = column(["a", "b", "c", "d", "e"])
+
+    new_records = diff_column(PAGE_ID, records, new_blocks, op_counts)
+
+    assert op_counts["inserted"] == len(new_blocks) - len(records)
+    assert stub.counts["PATCH /v1/blocks/{id}/children"] == 2  # 初始写入 + 一次合并插入
+    assert_column_matches(stub, new_records, new_blocks)
+
+def test_shorter_column_deletes_surplus_blocks(stub, op_counts):
+    records = write_column(column(["a", "b", "c", "d", "e"]))
+    new_blocks = column(["a", "b"])
+
+    new_records = diff_column(PAGE_ID, records, new_blocks, op_counts)
+
+    assert op_counts["deleted"] == len(records) - len(new_blocks)
+    assert_column_matches(stub, new_records, new_blocks)
+
+def test_type_change_replaces_the_block(stub, op_counts):
+    blocks = column(["a", "b"])
+    records = write_column(blocks)
+    new_blocks = list(blocks)
+    new_blocks[1] = {"object": "block", "type": "paragraph",
+                     "paragraph": {"rich_text": [{"type": "text", "text": {"content": "段落"}}]}}
+
+    new_records = diff_column(PAGE_ID, records, new_blocks, op_counts)
+
+    assert op_counts["deleted"] == 1 and op_counts["inserted"] == 1
+    assert_column_matches(stub, new_records, new_blocks)
+
+@pytest.fixture
+def parent_page(stub, monkeypatch):
+    monkeypatch.setattr(enhanced_sync, "NOTION_PARENT_PAGE_ID", PAGE_ID)
+    path = state_path(enhanced_sync.PARENT_STATE_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    return PAGE_ID
+
+def column_texts(stub, column_id):
+    return [block_text(block) for block in stub_children(stub, column_id)]
+
+def test_swap_replaces_the_column_list_in_one_step(stub, parent_page):
+    old_columns = {"zh": column(["a", "b"]), "en": column(["x"], lang="en")}
+    state = rebuild_parent_page(3, old_columns)
+    new_columns = {"zh": column(["c", "d", "e"]), "en": column(["y", "z"], lang="en")}
+
+    new_state = swap_parent_column_list(state, 5, new_columns)
+
+    top_level = stub_children(stub, parent_page)
+    assert top_level[-1]["id"] == new_state["column_list_id"] != state["column_list_id"]
+    assert state["column_list_id"] not in [block["id"] for block in top_level]
+    assert new_state["pending_deletes"] == []
+    for lang in ("zh", "en"):
+        column_state = new_state["columns"][lang]
+        assert column_texts(stub, column_state["id"]) == [block_text(b) for b in new_columns[lang]]
+        assert [record["id"] for record in column_state["blocks"]] == \
+               [block["id"] for block in stub_children(stub, column_state["id"])]
+
+def test_parent_update_reuses_recorded_blocks_on_the_next_run(stub, parent_page):
+    assert update_parent_page_with_news_list(news("zh", ["a", "b"]) + news("en", ["x"]))
+    first = enhanced_sync.load_parent_state()
+
+    assert update_parent_page_with_news_list(news("zh", ["a", "c"]) + news("en", ["x"]))
+    second = enhanced_sync.load_parent_state()
+
+    assert second["column_list_id"] == first["column_list_id"]
+    zh_column = second["columns"]["zh"]["id"]
+    assert any("c" in text for text in column_texts(stub, zh_column))
+    assert not any(text.endswith(" b") for text in column_texts(stub, zh_column))
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline
+
+def passthrough(item, emit):
+    emit(item)
+
+def test_items_flow_through_every_stage():
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage("split", lambda n, emit: [emit(n * 10 + i) for i in range(2)], workers=2)
+    pipeline.add_stage("double", lambda n, emit: emit(n * 2), workers=3)
+    assert sorted(pipeline.run(range(5))) == sorted(2 * (n * 10 + i) for n in range(5) for i in range(2))
+    assert [s["items"] for s in pipeline.stats()] == [5, 10]
+
+def test_failed_items_are_counted_and_dropped():
+    def fail_on_odd(n, emit):
+        if n % 2:
+            raise ValueError(n)
+        emit(n)
+
+    pipeline = Pipeline()
+    stage = pipeline.add_stage("check", fail_on_odd, workers=2)
+    assert sorted(pipeline.run(range(6))) == [0, 2, 4]
+    assert stage.errors == 3 and isinstance(stage.first_error, ValueError)
+
+def test_bounded_queues_apply_backpressure():
+    in_flight = []
+    lock = threading.Lock()
+    produced = [0]
+
+    def produce(n, emit):
+        with lock:
+            produced[0] += 1
+        emit(n)
+
+    def consume(n, emit):
+        with lock:
+            in_flight.append(produced[0] - n)
+        time.sleep(0.01)
+        emit(n)
+
+    pipeline = Pipeline(queue_size=2)
+    pipeline.add_stage("produce", produce)
+    pipeline.add_stage("consume", consume)
+    pipeline.run(range(20))
+    # 生产者最多领先：下游队列容量 + 正在处理的1条 + 生产者手里的1条
+    assert max(in_flight) <= 2 + 2
+    assert pipeline.stats()[0]["blocked"] > 0
+
+def test_busy_time_excludes_only_each_workers_own_blocked_time():
+    work = 0.05
+    pipeline = Pipeline(queue_size=1)
+    pipeline.add_stage("work", lambda n, emit: (time.sleep(work), emit(n)), workers=4)
+    pipeline.add_stage("sink", lambda n, emit: (time.sleep(work), emit(n)))
+    pipeline.run(range(12))
+
+    stats = pipeline.stats()[0]
+    assert stats["blocked"] > work * 4
+    assert stats["busy"] == pytest.approx(12 * work, rel=0.3)
+    assert 0 < stats["utilization"] < 1
@@ -0,0 +1,57 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from rate_limit import DEFAULT_RETRY_AFTER, TokenBucket, parse_retry_after
+
+@pytest.mark.parametrize("value, expected", [
+    ("3", 3.0),
+    (" 1.5 ", 1.5),
+    ("-2", 0.0),
+    (None, DEFAULT_RETRY_AFTER),
+    ("", DEFAULT_RETRY_AFTER),
+    ("soon", DEFAULT_RETRY_AFTER),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+def test_parse_retry_after_date_in_the_past():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=20, burst=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    started = time.monotonic()
+    waited = bucket.acquire()
+    assert waited > 0
+    assert time.monotonic() - started >= 0.04
+
+def test_token_bucket_throttle_blocks_and_halves_rate():
+    bucket = TokenBucket(rate=100)
+    bucket.on_throttled(0.1)
+    assert bucket.rate == 50
+    assert bucket.stats()["throttled"] == 1
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+def test_token_bucket_rate_never_drops_below_min_rate():
+    bucket = TokenBucket(rate=10, min_rate=4)
+    for _ in range(5):
+        bucket.on_throttled(0)
+    assert bucket.rate == 4
+
+def test_token_bucket_recovers_additively_up_to_max_rate():
+    bucket = TokenBucket(rate=1)
+    bucket.on_throttled(0)
+    assert bucket.rate == 0.5
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 1
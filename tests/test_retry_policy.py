@@ -0,0 +1,72 @@
+import time
+
+import pytest
+import requests
+
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable_error, is_retryable_status
+
+def test_backoff_is_bounded_and_respects_retry_after():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2)
+    for retry in range(10):
+        assert 0 <= policy.backoff(retry) <= 2
+    assert policy.backoff(0, retry_after=5) == 5
+
+def test_next_delay_stops_after_max_retries():
+    policy = RetryPolicy(max_retries=2, base_delay=0)
+    started = time.monotonic()
+    assert policy.next_delay(0, started) is not None
+    assert policy.next_delay(1, started) is not None
+    assert policy.next_delay(2, started) is None
+
+def test_next_delay_stops_when_budget_is_spent():
+    policy = RetryPolicy(max_retries=5, base_delay=0, budget=10)
+    assert policy.next_delay(0, time.monotonic() - 11) is None
+    assert policy.next_delay(0, time.monotonic(), retry_after=20) is None
+
+def test_retryable_classification():
+    assert is_retryable_status(503)
+    assert not is_retryable_status(429)
+    assert not is_retryable_status(400)
+    assert is_retryable_error(requests.ConnectTimeout(), idempotent=False)
+    assert is_retryable_error(requests.ReadTimeout(), idempotent=True)
+    assert not is_retryable_error(requests.ReadTimeout(), idempotent=False)
+    assert not is_retryable_error(CircuitOpenError(), idempotent=True)
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(3):
+        breaker.before_request()
+        breaker.on_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    assert breaker.stats() == {"state": "open", "trips": 1, "fast_failures": 1}
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(threshold=2)
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+    assert breaker.state == "closed"
+
+def test_breaker_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.on_failure()
+    breaker.before_request()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.on_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.on_failure()
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.on_failure()
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
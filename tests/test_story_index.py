@@ -0,0 +1,95 @@
+import uuid
+
+import pytest
+
+from http_client import notion
+from story_index import StoryIndex, hash_blocks
+
+DATABASE_ID = "33333333333333333333333333333333"
+
+def paragraph(text: str):
+    return {"object": "block", "type": "paragraph",
+            "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}}
+
+def add_page(stub, story_id: str, lang: str = "中文"):
+    with stub.lock:
+        return stub.store.create_page({
+            "parent": {"database_id": DATABASE_ID},
+            "properties": {
+                "Name": {"title": [{"text": {"content": f"story {story_id}"}}]},
+                "话题ID": {"rich_text": [{"text": {"content": story_id}}]},
+                "语言": {"select": {"name": lang}},
+            }})
+
+@pytest.fixture
+def index():
+    return StoryIndex(f"story_index_{uuid.uuid4().hex}.sqlite3")
+
+def test_hash_blocks_ignores_key_order_but_not_content():
+    block = paragraph("hello")
+    reordered = {"paragraph": block["paragraph"], "type": "paragraph", "object": "block"}
+    assert hash_blocks([block]) == hash_blocks([reordered])
+    assert hash_blocks([block]) != hash_blocks([paragraph("hello!")])
+    assert hash_blocks([block, paragraph("x")]) != hash_blocks([paragraph("x"), block])
+
+def test_full_refresh_pages_through_every_result(stub, index):
+    for i in range(130):
+        add_page(stub, f"s{i}")
+
+    result = index.refresh(notion, DATABASE_ID)
+
+    assert result == {"mode": "full", "pages": 130}
+    assert index.story_ids(DATABASE_ID) == {f"s{i}" for i in range(130)}
+    assert stub.counts["POST /v1/databases/{id}/query"] == 2
+    row = index.get(DATABASE_ID, "s7")
+    assert row["lang"] == "zh"
+    assert row["properties"]["话题ID"]["rich_text"][0]["plain_text"] == "s7"
+
+def test_incremental_refresh_picks_up_new_pages(stub, index):
+    add_page(stub, "a")
+    index.refresh(notion, DATABASE_ID)
+    page = add_page(stub, "b", lang="英文")
+
+    result = index.refresh(notion, DATABASE_ID)
+
+    assert result["mode"] == "incremental"
+    assert index.story_ids(DATABASE_ID) == {"a", "b"}
+    assert index.get(DATABASE_ID, "b")["page_id"] == page["id"]
+
+def test_full_refresh_drops_archived_pages(stub, index):
+    add_page(stub, "a")
+    page = add_page(stub, "b")
+    index.refresh(notion, DATABASE_ID)
+    assert notion.delete(f"/v1/blocks/{page['id']}").status_code == 200
+
+    index.refresh(notion, DATABASE_ID, full=True)
+
+    assert index.story_ids(DATABASE_ID) == {"a"}
+
+def test_put_keeps_content_hash_only_for_the_same_page(index):
+    index.put(DATABASE_ID, "a", "p1", content_hash="h1")
+    index.put(DATABASE_ID, "a", "p1", lang="zh")
+    assert index.get(DATABASE_ID, "a")["content_hash"] == "h1"
+    index.put(DATABASE_ID, "a", "p2")
+    assert index.get(DATABASE_ID, "a")["content_hash"] is None
+
+def test_stale_full_sync_triggers_a_full_refresh_that_drops_archived_pages(stub, index):
+    add_page(stub, "a")
+    page = add_page(stub, "b")
+    index.refresh(notion, DATABASE_ID)
+    assert notion.delete(f"/v1/blocks/{page['id']}").status_code == 200
+
+    assert index.refresh(notion, DATABASE_ID)["mode"] == "incremental"
+    assert index.story_ids(DATABASE_ID) == {"a", "b"}
+
+    index._db().execute("UPDATE mirror_meta SET last_full_sync = last_full_sync - ?",
+                        (index.full_resync_max_age + 1,))
+    assert index.refresh(notion, DATABASE_ID)["mode"] == "full"
+    assert index.story_ids(DATABASE_ID) == {"a"}
+
+def test_clear_forgets_pages_and_sync_progress(stub, index):
+    add_page(stub, "a")
+    index.refresh(notion, DATABASE_ID)
+    index.clear(DATABASE_ID)
+    assert index.story_ids(DATABASE_ID) == set()
+    assert index.refresh(notion, DATABASE_ID)["mode"] == "full"
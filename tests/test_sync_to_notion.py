@@ -0,0 +1,34 @@
+import uuid
+
+import pytest
+import requests
+
+import sync_to_notion
+from story_index import StoryIndex
+
+DATABASE_ID = "66666666666666666666666666666666"
+
+@pytest.fixture
+def index(monkeypatch):
+    index = StoryIndex(f"story_index_{uuid.uuid4().hex}.sqlite3")
+    monkeypatch.setattr(sync_to_notion, "story_index", index)
+    return index
+
+def fail_refresh(*args, **kwargs):
+    raise requests.ConnectionError("Notion unreachable")
+
+def test_existing_ids_come_from_a_refreshed_mirror(stub, index):
+    with stub.lock:
+        stub.store.create_page({"parent": {"database_id": DATABASE_ID},
+                                "properties": {"话题ID": {"rich_text": [{"text": {"content": "a"}}]}}})
+    assert sync_to_notion.get_existing_story_ids(DATABASE_ID) == {"a"}
+
+def test_failed_refresh_falls_back_to_the_last_mirror(index, monkeypatch):
+    index.put(DATABASE_ID, "a", "p1")
+    index.put(DATABASE_ID, "b", "p2")
+    monkeypatch.setattr(index, "refresh", fail_refresh)
+    assert sync_to_notion.get_existing_story_ids(DATABASE_ID) == {"a", "b"}
+
+def test_failed_refresh_with_empty_mirror_aborts(index, monkeypatch):
+    monkeypatch.setattr(index, "refresh", fail_refresh)
+    assert sync_to_notion.get_existing_story_ids(DATABASE_ID) is None
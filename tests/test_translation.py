@@ -0,0 +1,33 @@
+import pytest
+
+from translation import split_segments
+
+def rejoin(segments):
+    return "".join(sentence + separator for sentence, separator in segments)
+
+@pytest.mark.parametrize("text", [
+    "Bitcoin rallied. ETH followed! Is SOL next? 3 tokens moved.",
+    "第一句。第二句！第三句？",
+    "Line one\nLine two\n\nLine four",
+    "No terminal punctuation",
+    "",
+])
+def test_segments_rejoin_to_the_original_text(text):
+    assert rejoin(split_segments(text)) == text
+
+def test_sentences_are_split_on_terminal_punctuation():
+    sentences = [sentence for sentence, _ in split_segments("Bitcoin rallied. ETH followed! Is SOL next?")]
+    assert sentences == ["Bitcoin rallied.", "ETH followed!", "Is SOL next?"]
+
+def test_abbreviation_followed_by_lowercase_is_not_split():
+    assert len(split_segments("Prices rose approx. ten percent today.")) == 1
+
+def test_long_sentences_are_chunked_to_max_chars():
+    text = " ".join(["word"] * 50)
+    segments = split_segments(text, max_chars=40)
+    assert all(len(sentence) <= 40 for sentence, _ in segments)
+    assert rejoin(segments) == text
+
+def test_long_sentence_without_spaces_is_hard_cut():
+    segments = split_segments("x" * 95, max_chars=40)
+    assert [len(sentence) for sentence, _ in segments] == [40, 40, 15]
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from http_client import HTTP_POOL_MAXSIZE, HostClient, NOTION_VERSION
+from write_queue import WriteQueue
+
+PAGE_ID = "88888888888888888888888888888888"
+
+def notion_client(**kwargs) -> HostClient:
+    return HostClient("notion-test", os.environ["NOTION_API_BASE"], headers={
+        "Authorization": "Bearer test", "Notion-Version": NOTION_VERSION}, **kwargs)
+
+def paragraph(text: str):
+    return {"object": "block", "type": "paragraph",
+            "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}}
+
+class SlowClient:
+    """记录同时在途请求数的假客户端"""
+
+    name = "slow"
+    limiter = None
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, path, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        if path.endswith("/boom"):
+            raise requests.ConnectionError("connection reset")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+def test_default_concurrency_follows_the_rate_limit():
+    assert WriteQueue(notion_client(rate_limit=3)).max_in_flight == 3
+    assert WriteQueue(notion_client(rate_limit=2.5)).max_in_flight == 3
+    assert WriteQueue(notion_client(rate_limit=1000)).max_in_flight == HTTP_POOL_MAXSIZE
+
+def test_in_flight_requests_are_bounded():
+    client = SlowClient()
+    queue = WriteQueue(client, max_in_flight=2)
+    futures = [queue.delete_block(str(i)) for i in range(8)]
+    assert all(future.result().status_code == 200 for future in futures)
+    assert client.peak == 2
+
+def test_results_are_collected_in_submission_order(stub):
+    queue = WriteQueue(notion_client(rate_limit=1000), max_in_flight=4)
+    futures = [queue.append_children(PAGE_ID, [paragraph(str(i))]) for i in range(10)]
+    created = [future.result().json()["results"][0]["id"] for future in futures]
+    with stub.lock:
+        children = stub.store.list_children(PAGE_ID, None, 100)["results"]
+    assert sorted(created) == sorted(child["id"] for child in children)
+    texts = {child["id"]: child["paragraph"]["rich_text"][0]["plain_text"] for child in children}
+    assert [texts[block_id] for block_id in created] == [str(i) for i in range(10)]
+
+def test_error_responses_are_returned_and_counted(stub):
+    queue = WriteQueue(notion_client(rate_limit=1000), max_in_flight=2)
+    block_id = queue.append_children(PAGE_ID, [paragraph("a")]).result().json()["results"][0]["id"]
+    assert queue.delete_block(block_id).result().status_code == 200
+    assert queue.delete_block(block_id).result().status_code == 400
+
+    stats = queue.stats()
+    assert stats["delete"]["count"] == 2 and stats["delete"]["failed"] == 1
+    assert stats["append"]["failed"] == 0
+    assert "update" not in stats
+
+def test_network_errors_surface_through_the_future():
+    queue = WriteQueue(SlowClient(), max_in_flight=1)
+    with pytest.raises(requests.ConnectionError):
+        queue.delete_block("boom").result()
+    assert queue.stats()["delete"]["failed"] == 1
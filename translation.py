@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+翻译服务 + 持久化翻译记忆
+功能：
+✅ 免费Google翻译（deep-translator，无需API Key）
+✅ 按句切分，逐句缓存，只翻译新增/修改的句子
+✅ 按 原文哈希 + 语言对 + 翻译后端 缓存译文（SQLite）
+✅ 按最近使用时间淘汰（LRU + 最大保留时长）
+✅ 统计命中率和节省的翻译耗时
+✅ 超过单次请求字符上限的文本分块并发翻译
+✅ 批量翻译阶段：有限并发 + 每次调用硬性超时，超时回退原文
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 免费翻译服务 - Google Translate
+from deep_translator import GoogleTranslator
+
+from metrics import metrics
+from state_store import open_sqlite
+
+# ============ 配置区 ============
+
+TRANSLATION_BACKEND = "google"
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY_ENABLED", "1") != "0"
+# 最多保留的译文条数（超出按最近使用时间淘汰）
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "20000"))
+# 译文最长保留时间（秒，按最近使用时间计算），默认30天
+TRANSLATION_MEMORY_MAX_AGE = float(os.getenv("TRANSLATION_MEMORY_MAX_AGE", str(30 * 24 * 3600)))
+# 批量翻译并发数
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "4"))
+# 单次翻译调用的硬性超时（秒）
+TRANSLATION_DEADLINE = float(os.getenv("TRANSLATION_DEADLINE", "15"))
+# 单次翻译请求的字符上限（Google免费接口上限5000）
+TRANSLATION_MAX_CHARS = int(os.getenv("TRANSLATION_MAX_CHARS", "4500"))
+
+# 句子切分：句末标点（英文需后接空白+大写/数字/引号）、中文句末标点或换行
+_SENTENCE_RE = re.compile(
+    r"(.*?(?:[.!?][\"'”’)\]]*(?=\s+[A-Z0-9\"'“‘(\[])|[。！？]+|(?=\n)|$))(\s*)",
+    re.S)
+
+def memory_key(text: str, source: str, target: str, backend: str = TRANSLATION_BACKEND) -> str:
+    raw = "\x1f".join([backend, source, target, text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class TranslationMemory:
+    """原文 → 译文的持久化缓存"""
+
+    def __init__(self, db_name: str = "translation_memory.sqlite3",
+                 max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES,
+                 max_age: float = TRANSLATION_MEMORY_MAX_AGE):
+        self.db_name = db_name
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.seconds_spent = 0.0
+
+        self._conn = None
+        self._evicted = False
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_sqlite(self.db_name)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translation_memory (
+                    key TEXT PRIMARY KEY,
+                    backend TEXT NOT NULL,
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            db = self._db()
+            if not self._evicted:
+                self._evict()
+                self._evicted = True
+            row = db.execute("SELECT translated, seconds FROM translation_memory WHERE key = ?",
+                             (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE translation_memory SET used_at = ? WHERE key = ?",
+                       (time.time(), key))
+            self.hits += 1
+            self.seconds_saved += row[1]
+            return row[0]
+
+    def put(self, key: str, translated: str, seconds: float,
+            source: str, target: str, backend: str = TRANSLATION_BACKEND):
+        now = time.time()
+        with self._lock:
+            self.seconds_spent += seconds
+            self._db().execute(
+                "INSERT OR REPLACE INTO translation_memory VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, backend, source, target, translated, seconds, now, now))
+
+    def _evict(self):
+        """删除长期未使用的译文，再按LRU淘汰到条数上限以内"""
+        db = self._db()
+        db.execute("DELETE FROM translation_memory WHERE used_at < ?",
+                   (time.time() - self.max_age,))
+        db.execute("""
+            DELETE FROM translation_memory WHERE key IN (
+                SELECT key FROM translation_memory ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "seconds_saved": self.seconds_saved,
+            "seconds_spent": self.seconds_spent,
+        }
+
+translation_memory = TranslationMemory()
+
+def split_segments(text: str, max_chars: int = TRANSLATION_MAX_CHARS) -> List[Tuple[str, str]]:
+    """
+    把文本切分为句子，返回 [(句子, 句后分隔符), ...]
+
+    - 按英文句末标点（后接空白和大写/数字/引号）、中文句末标点和换行切分
+    - 超过max_chars的长句再按空白切成不超过max_chars的片段
+    - 所有句子与分隔符拼接后等于原文
+    """
+    segments = []
+    for match in _SENTENCE_RE.finditer(text):
+        sentence, separator = match.group(1), match.group(2)
+        if not sentence and not separator:
+            continue
+        if len(sentence) <= max_chars:
+            segments.append((sentence, separator))
+            continue
+
+        # 超长句子：按空白切块，实在没有空白时硬切
+        pieces = []
+        rest = sentence
+        while len(rest) > max_chars:
+            cut = rest.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append((rest[:cut], " " if rest[cut:cut + 1] == " " else ""))
+            rest = rest[cut:].lstrip(" ")
+        pieces.append((rest, separator))
+        segments.extend(pieces)
+    return segments
+
+def _join_separator(separator: str, target: str) -> str:
+    """译文中的分隔符：保留换行；中日文译文句间不加空格"""
+    if "\n" in separator:
+        return "\n" * separator.count("\n")
+    if target.split("-")[0] in ("zh", "ja"):
+        return ""
+    return separator
+
+def _parallel_map(fn: Callable, items: List, workers: int) -> List:
+    """
+    用守护线程并发执行fn，返回与输入顺序一致的结果
+
+    不使用ThreadPoolExecutor：它的工作线程在解释器退出时会被join，
+    卡住的翻译请求会让进程无法退出。任一调用失败时重新抛出异常。
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+
+    results = [None] * len(items)
+    errors = []
+    next_index = iter(range(len(items)))
+    index_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            try:
+                results[i] = fn(items[i])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, name="translate-chunk", daemon=True)
+               for _ in range(max(1, min(workers, len(items))))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results
+
+def _google_translate(translator: GoogleTranslator, text: str) -> str:
+    """调用一次翻译接口，记入运行指标"""
+    started = time.monotonic()
+    status = "ok"
+    translated = ""
+    try:
+        translated = translator.translate(text) or ""
+        return translated
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        metrics.observe_request("google-translate", "GET", "/translate", status,
+                                time.monotonic() - started,
+                                bytes_out=len(text.encode("utf-8")),
+                                bytes_in=len(translated.encode("utf-8")))
+
+def _translate_chunk(sentences: List[str], source: str, target: str) -> List[str]:
+    """
+    一次请求翻译多句（以换行连接），按换行拆回；
+    行数对不上时退回逐句翻译
+    """
+    translator = GoogleTranslator(source=source, target=target)
+    if len(sentences) > 1:
+        translated = _google_translate(translator, "\n".join(sentences))
+        lines = [line.strip() for line in translated.split("\n") if line.strip()]
+        if len(lines) == len(sentences):
+            return lines
+    return [_google_translate(translator, sentence).strip() for sentence in sentences]
+
+def _chunk_sentences(sentences: List[str], max_chars: int) -> List[List[str]]:
+    """把待翻译句子装箱为总长度不超过max_chars的请求"""
+    chunks = []
+    current = []
+    size = 0
+    for sentence in sentences:
+        if current and size + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+def translate(text: str, source: str = "auto", target: str = "zh-CN") -> str:
+    """
+    按句翻译文本，只翻译翻译记忆中没有的句子
+
+    1. 切分为句子，逐句查翻译记忆
+    2. 未命中的句子装箱为不超过单次请求字符上限的块，并发翻译
+    3. 译文写入翻译记忆，按原顺序拼接
+
+    摘要只追加/修改了一句时，只有这一句会被发送给翻译服务。
+    翻译失败时抛出异常，由调用方决定兜底策略；空结果不写入记忆。
+    """
+    segments = split_segments(text)
+    translations: Dict[str, str] = {}
+    missing = []
+
+    for sentence, _ in segments:
+        if not sentence.strip() or sentence in translations or sentence in missing:
+            continue
+        cached = None
+        if TRANSLATION_MEMORY_ENABLED:
+            cached = translation_memory.get(memory_key(sentence, source, target))
+        if cached is not None:
+            translations[sentence] = cached
+        else:
+            missing.append(sentence)
+
+    def run(chunk: List[str]) -> List[str]:
+        start = time.time()
+        translated = _translate_chunk(chunk, source, target)
+        elapsed = (time.time() - start) / len(chunk)
+        for sentence, translated_sentence in zip(chunk, translated):
+            if TRANSLATION_MEMORY_ENABLED and translated_sentence:
+                translation_memory.put(memory_key(sentence, source, target),
+                                       translated_sentence, elapsed, source, target)
+        return translated
+
+    chunks = _chunk_sentences(missing, TRANSLATION_MAX_CHARS)
+    for chunk, translated in zip(chunks, _parallel_map(run, chunks, TRANSLATION_WORKERS)):
+        translations.update(zip(chunk, translated))
+
+    parts = []
+    for sentence, separator in segments:
+        if sentence.strip():
+            parts.append(translations.get(sentence) or sentence)
+        else:
+            parts.append(sentence)
+        parts.append(_join_separator(separator, target))
+    return "".join(parts).strip()
+
+# 超过硬性超时的翻译调用次数
+deadline_misses = 0
+_deadline_lock = threading.Lock()
+
+def translate_with_deadline(text: str, deadline: float = TRANSLATION_DEADLINE,
+                            source: str = "auto", target: str = "zh-CN") -> str:
+    """
+    带硬性超时的翻译
+
+    deep-translator的Google后端请求没有超时参数，卡住时会无限等待。
+    这里在守护线程中执行翻译，超时后放弃等待并抛出TimeoutError；
+    被放弃的线程若稍后完成，译文仍会写入翻译记忆供下次使用。
+    """
+    global deadline_misses
+    result = {}
+
+    def run():
+        try:
+            result["value"] = translate(text, source, target)
+        except Exception as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=run, name="translate", daemon=True)
+    worker.start()
+    worker.join(deadline)
+    if worker.is_alive():
+        with _deadline_lock:
+            deadline_misses += 1
+        raise TimeoutError(f"翻译超过 {deadline:.0f} 秒未返回")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+def translate_many(texts: List[str], deadline: float = TRANSLATION_DEADLINE,
+                   workers: int = TRANSLATION_WORKERS) -> List[Optional[str]]:
+    """
+    批量翻译，返回与输入顺序一致的译文列表（失败或超时的位置为None）
+
+    deep-translator的Google后端translate_batch只是逐条串行调用，
+    因此这里用有限大小的线程池并发调用，每次调用都有硬性超时。
+    """
+    if not texts:
+        return []
+
+    def run(text: str) -> Optional[str]:
+        try:
+            translated_text = translate_with_deadline(text, deadline)
+        except Exception:
+            return None
+        if translated_text and translated_text.strip():
+            return translated_text.strip()
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(texts)))) as executor:
+        return list(executor.map(run, texts))
+
+def stats_line() -> Optional[str]:
+    """运行结束时输出的翻译记忆统计"""
+    if not TRANSLATION_MEMORY_ENABLED:
+        return None
+    stats = translation_memory.stats()
+    if not stats["hits"] and not stats["misses"]:
+        return None
+    line = (f"翻译记忆: 命中 {stats['hits']} / 未命中 {stats['misses']} "
+            f"(命中率 {stats['hit_rate']:.0%}) / 节省约 {stats['seconds_saved']:.1f} 秒 / "
+            f"实际翻译耗时 {stats['seconds_spent']:.1f} 秒")
+    if deadline_misses:
+        line += f" / 超时 {deadline_misses} 次"
+    return line
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Notion写入队列
+功能：
+✅ 接收创建页面、追加子块、更新块/页面、删除块四类写入任务
+✅ 在途请求数有上限，默认与Notion限流速率挂钩（每秒几次就允许几个并发）
+✅ 提交后立即返回Future，调用方可按排名顺序收集结果
+✅ 统计每类任务的排队等待与请求耗时（p50 / p95 / 最大值），用于调整并发数
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from http_client import HostClient, notion, HTTP_POOL_MAXSIZE
+
+# 在途写入请求上限，0表示按限流速率自动确定（不超过连接池大小）
+NOTION_WRITE_CONCURRENCY = int(os.getenv("NOTION_WRITE_CONCURRENCY", "0"))
+
+JOB_KINDS = ("create", "append", "update", "delete")
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+
+class WriteQueue:
+    """
+    有界并发的Notion写入队列
+
+    任务的结果是requests.Response（不检查状态码，由调用方决定如何处理），
+    网络异常通过Future抛出。请求本身仍经过HostClient的令牌桶限流。
+    """
+
+    def __init__(self, client: HostClient, max_in_flight: Optional[int] = None):
+        if not max_in_flight:
+            rate = client.limiter.max_rate if client.limiter else 1
+            max_in_flight = min(HTTP_POOL_MAXSIZE, max(1, math.ceil(rate)))
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight,
+                                            thread_name_prefix=f"{client.name}-write")
+        self._lock = threading.Lock()
+        self._latencies = {kind: [] for kind in JOB_KINDS}
+        self._waits = {kind: [] for kind in JOB_KINDS}
+        self._failed = {kind: 0 for kind in JOB_KINDS}
+
+    def submit(self, kind: str, method: str, path: str, **kwargs) -> "Future[requests.Response]":
+        submitted = time.monotonic()
+
+        def run():
+            started = time.monotonic()
+            failed = True
+            try:
+                response = self.client.request(method, path, **kwargs)
+                failed = response.status_code >= 400
+                return response
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    self._waits[kind].append(started - submitted)
+                    self._latencies[kind].append(finished - started)
+                    if failed:
+                        self._failed[kind] += 1
+
+        return self._executor.submit(run)
+
+    # ============ 任务类型 ============
+
+    def create_page(self, payload: Dict) -> "Future[requests.Response]":
+        return self.submit("create", "POST", "/v1/pages", json=payload, timeout=30)
+
+    def append_children(self, block_id: str, children: List[Dict],
+                        after: Optional[str] = None) -> "Future[requests.Response]":
+        payload = {"children": children}
+        if after:
+            payload["after"] = after
+        return self.submit("append", "PATCH", f"/v1/blocks/{block_id}/children",
+                           json=payload, timeout=30)
+
+    def update_block(self, block_id: str, payload: Dict) -> "Future[requests.Response]":
+        return self.submit("update", "PATCH", f"/v1/blocks/{block_id}", json=payload,
+                           timeout=30, idempotent=True)
+
+    def update_page(self, page_id: str, payload: Dict) -> "Future[requests.Response]":
+        return self.submit("update", "PATCH", f"/v1/pages/{page_id}", json=payload,
+                           timeout=30, idempotent=True)
+
+    def delete_block(self, block_id: str) -> "Future[requests.Response]":
+        return self.submit("delete", "DELETE", f"/v1/blocks/{block_id}", timeout=30)
+
+    # ============ 统计 ============
+
+    def stats(self) -> Dict[str, Dict]:
+        """按任务类型统计：次数、失败数、排队等待均值、请求耗时p50/p95/最大值（秒）"""
+        result = {}
+        with self._lock:
+            for kind in JOB_KINDS:
+                latencies = self._latencies[kind]
+                if not latencies:
+                    continue
+                waits = self._waits[kind]
+                result[kind] = {
+                    "count": len(latencies),
+                    "failed": self._failed[kind],
+                    "wait_avg": sum(waits) / len(waits),
+                    "p50": _percentile(latencies, 0.50),
+                    "p95": _percentile(latencies, 0.95),
+                    "max": max(latencies),
+                }
+        return result
+
+    def stats_lines(self) -> List[str]:
+        names = {"create": "创建页面", "append": "追加子块", "update": "更新", "delete": "删除"}
+        lines = []
+        for kind, s in self.stats().items():
+            lines.append(f"Notion写入 {names[kind]}: {s['count']} 次 (失败 {s['failed']}) / "
+                         f"排队 {s['wait_avg'] * 1000:.0f}ms / "
+                         f"耗时 p50 {s['p50'] * 1000:.0f}ms p95 {s['p95'] * 1000:.0f}ms "
+                         f"max {s['max'] * 1000:.0f}ms / 并发上限 {self.max_in_flight}")
+        return lines
+
+notion_writes = WriteQueue(notion, NOTION_WRITE_CONCURRENCY)